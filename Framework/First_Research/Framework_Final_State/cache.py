@@ -1,4 +1,14 @@
 from .constraints import TimeConstraint
+from .rating_index import RatingIndex
+from .corrs_cache import LRUCorrsCache
+from .spilling_corrs import CorrsSpillBudget, SpillingCorrs
+from .corrs_store import CorrsStore
+from .shared_arrays import SharedArrays, attach_attributes
+import mmap
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from collections.abc import MutableMapping
 
 
 class Cache:
@@ -38,16 +48,39 @@ class Cache:
 
         self.use_avg_ratings_cache = use_avg_ratings_cache    # on average 10 fold performance gain
         if self.use_avg_ratings_cache:
-            self.avg_user_ratings = self.create_user_avg_rating_cache()
+            self.avg_user_rating_array = self.create_user_avg_rating_array()
+            self.avg_user_ratings = self._to_avg_user_ratings_frame(self.avg_user_rating_array)
         else:
+            self.avg_user_rating_array = None
             self.avg_user_ratings = None
 
+        self.shared_arrays = None   # SharedArrays, owner of the shared memory segments after share_memory()
+        self.shared = dict()        # id of a shared value -> (shared value, handle)
+
     def create_user_avg_rating_cache(self):
-        if self.is_ratings_cached:
-            data = self.ratings
-        else:
-            data = self.movie_ratings               
-        return data.groupby('user_id')[['rating']].mean()
+        """
+        :return: average ratings DataFrame with index of 'user_id' and column of 'rating'
+        """
+        return self._to_avg_user_ratings_frame(self.create_user_avg_rating_array())
+
+    def create_user_avg_rating_array(self):
+        """
+        :return: array of average ratings indexed by the positions of user_mapping
+        """
+        data = self.get_rating_data()
+        user_positions = self.user_mapping.to_positions(data['user_id'].to_numpy())
+        n_users = len(self.user_mapping)
+        rating_sums = np.bincount(user_positions, weights=data['rating'].to_numpy(), minlength=n_users)
+        return rating_sums / np.bincount(user_positions, minlength=n_users)
+
+    def _to_avg_user_ratings_frame(self, avg_user_rating_array):
+        return pd.DataFrame({'rating': avg_user_rating_array}, index=pd.Index(self.user_mapping.ids, name='user_id'))
+
+    def get_rating_data(self):
+        """
+        :return: ratings if they are cached, else movie_ratings
+        """
+        return self.ratings if self.is_ratings_cached else self.movie_ratings
 
     def get_user_corrs(self, min_common_elements, time_constraint=None):
         """
@@ -61,6 +94,62 @@ class Cache:
                 return self.user_correlations
         return None
 
+    def share_memory(self) -> dict:
+        """
+        Move the rating index, the average ratings and the user correlations into named shared memory. Workers forked
+        afterwards share a single copy of them, copy on write never duplicates them. Other workers attach to them by
+        attach_shared_memory. Keep this cache alive while the workers run, the segments are removed with it.
+
+        :return: picklable handles of the shared data
+        """
+        if self.shared_arrays is None:
+            self.shared_arrays = SharedArrays()
+        handles = dict()
+        self._rating_index, handles['rating_index'] = self._share(
+            self.rating_index, lambda rating_index: (rating_index, self.shared_arrays.publish_attributes(rating_index)))
+        if self.avg_user_rating_array is not None:
+            self.avg_user_rating_array, handles['avg_user_rating_array'] = self._share(self.avg_user_rating_array,
+                                                                                       self.shared_arrays.publish)
+        self.user_correlations, handles['user_correlations'] = self.share_user_corrs(self.user_correlations)
+        return handles
+
+    def attach_shared_memory(self, handles: dict):
+        """
+        Use the data shared by share_memory of the cache of another process, read-only
+        """
+        self._rating_index = attach_attributes(RatingIndex.__new__(RatingIndex), handles['rating_index'])
+        if 'avg_user_rating_array' in handles:
+            self.avg_user_rating_array = handles['avg_user_rating_array'].attach()
+            self.avg_user_ratings = self._to_avg_user_ratings_frame(self.avg_user_rating_array)
+        if handles['user_correlations'] is not None:
+            self.user_correlations = handles['user_correlations'].attach()
+
+    def share_user_corrs(self, user_corrs):
+        """
+        :return: (user correlations on shared memory, handle), the same user correlations and None if they are not a
+                 DataFrame or are already memory mapped from disk
+        """
+        if not isinstance(user_corrs, pd.DataFrame):
+            return user_corrs, None
+        if id(user_corrs) not in self.shared and Cache._is_mapped(user_corrs.to_numpy()):
+            return user_corrs, None
+        return self._share(user_corrs, self.shared_arrays.publish_corrs)
+
+    def _share(self, value, publish):
+        if id(value) not in self.shared:
+            shared_value, handle = publish(value)
+            self.shared[id(shared_value)] = (shared_value, handle)
+            return shared_value, handle
+        return self.shared[id(value)]
+
+    @staticmethod
+    def _is_mapped(array):
+        while isinstance(array, np.ndarray):
+            if isinstance(array, np.memmap):
+                return True
+            array = array.base
+        return isinstance(array, (mmap.mmap, memoryview))
+
     # Properties
     @property
     def ratings(self):
@@ -69,6 +158,7 @@ class Cache:
     @ratings.setter
     def ratings(self, value):
         self._ratings = value
+        self._rating_index = None
 
     @property
     def movies(self):
@@ -85,6 +175,40 @@ class Cache:
     @movie_ratings.setter
     def movie_ratings(self, value):
         self._movie_ratings = value
+        self._rating_index = None
+        self._movie_ratings_fingerprint = None
+
+    @property
+    def movie_ratings_fingerprint(self):
+        """
+        Content hash of movie_ratings, computed on first use
+        """
+        if self._movie_ratings_fingerprint is None:
+            self._movie_ratings_fingerprint = CorrsStore.get_fingerprint(self.movie_ratings)
+        return self._movie_ratings_fingerprint
+
+    @property
+    def rating_index(self):
+        """
+        User-major and item-major index over the rows of get_rating_data(), built on first use
+        """
+        if self._rating_index is None:
+            self._rating_index = RatingIndex.from_ratings(self.get_rating_data())
+        return self._rating_index
+
+    @property
+    def user_mapping(self):
+        """
+        Mapping of the 'user_id's to contiguous positions, use it to index user based arrays
+        """
+        return self.rating_index.user_mapping
+
+    @property
+    def item_mapping(self):
+        """
+        Mapping of the 'item_id's to contiguous positions, use it to index item based arrays
+        """
+        return self.rating_index.item_mapping
 
     @property
     def user_movie_matrix(self):
@@ -127,7 +251,23 @@ class TemporalCache(Cache):
                  user_correlations=None,
                  min_common_elements=5,
                  use_avg_ratings_cache=True,
-                 use_bulk_corr_cache=True):
+                 use_bulk_corr_cache=True,
+                 tiled_corrs=None,
+                 parallel_builder=None,
+                 corrs_cache_memory_budget=1 << 31,
+                 bulk_corrs_memory_budget=None,
+                 spill_dir=None,
+                 corrs_store=None):
+        """
+        :param tiled_corrs: TiledCorrs, when given user correlations are created in memory bounded tiles and reduced
+                            to top k or thresholded correlations on disk instead of full user x user DataFrames
+        :param parallel_builder: ParallelCorrsBuilder, when given bulk user correlations are created in worker processes
+        :param corrs_cache_memory_budget: bytes of user correlations kept for the most recently used time constraints
+        :param bulk_corrs_memory_budget: bytes of user_corrs_in_bulk kept in memory, least recently used correlations
+                                         beyond it are spilled to memory mapped files. Unlimited if None
+        :param spill_dir: directory of the spilled user_corrs_in_bulk, a temporary directory if None
+        :param corrs_store: CorrsStore, when given user correlations are kept on disk and reused by later runs
+        """
 
         super().__init__(is_ratings_cached=is_ratings_cached,
                          ratings=ratings,
@@ -143,8 +283,18 @@ class TemporalCache(Cache):
                          use_avg_ratings_cache=use_avg_ratings_cache)
 
         self.time_constraint = time_constraint
+        self.corrs_cache = LRUCorrsCache(corrs_cache_memory_budget)
+        if is_user_correlations_cached and user_correlations is not None:
+            self.corrs_cache.put(user_correlations, time_constraint, min_common_elements)
         self.use_bulk_corr_cache = use_bulk_corr_cache
+        self.bulk_spill_budget = None
+        if bulk_corrs_memory_budget is not None:
+            self.bulk_spill_budget = CorrsSpillBudget(bulk_corrs_memory_budget, spill_dir)
         self.user_corrs_in_bulk = None
+        self.time_bin_pearson = None    # TimeBinPearson, answers time bins missing from user_corrs_in_bulk
+        self.tiled_corrs = tiled_corrs
+        self.parallel_builder = parallel_builder
+        self.corrs_store = corrs_store
 
     def is_temporal_cache_valid(self):
         if self._time_constraint is None:   # No TimeConstraint, valid
@@ -154,6 +304,23 @@ class TemporalCache(Cache):
             return True
         return False  # Else, Not Valid
 
+    def new_bulk_corrs(self):
+        """
+        :return: empty dict for user_corrs_in_bulk, spilling to disk when bulk_corrs_memory_budget is given
+        """
+        if self.bulk_spill_budget is None:
+            return dict()
+        return SpillingCorrs(self.bulk_spill_budget)
+
+    def reset_user_corrs_in_bulk(self):
+        """
+        Invalidate the bulk cache, spilled user correlations are removed from disk
+        """
+        if self.bulk_spill_budget is not None:
+            self.bulk_spill_budget.clear()
+        self.user_corrs_in_bulk = self.new_bulk_corrs()
+        self.time_bin_pearson = None
+
     def get_user_corrs_from_bulk(self, min_common_elements, time_constraint, bin_size):
         """
         Get the temporal user correlations from bulk cache.
@@ -169,8 +336,87 @@ class TemporalCache(Cache):
             return None
 
         bins = self.user_corrs_in_bulk.get(bin_size)
-        if bins is not None:
-            return bins.get(time_constraint.start_dt.year)
+        if bins is None:
+            return None
+
+        start_year = time_constraint.start_dt.year
+        if (start_year not in bins and self.time_bin_pearson is not None
+                and time_constraint.start_dt == datetime(start_year, 1, 1)
+                and time_constraint.end_dt == datetime(start_year + bin_size, 1, 1)):
+            user_corrs = self.load_stored_user_corrs(time_constraint, min_common_elements)
+            if user_corrs is None:
+                # Sum the per year pair statistics of the bin once, later queries of the bin are a dict lookup
+                user_corrs = self.time_bin_pearson.get_user_corrs(start_year, start_year + bin_size)
+                self.store_user_corrs(user_corrs, time_constraint, min_common_elements)
+            bins[start_year] = user_corrs
+        return bins.get(start_year)
+
+    def load_stored_user_corrs(self, time_constraint, min_common_elements):
+        """
+        :return: user correlations saved to corrs_store by this or an earlier run, None if not found
+        """
+        if self.corrs_store is None:
+            return None
+        from .similarity import TemporalPearson
+        return self.corrs_store.load(self.movie_ratings_fingerprint,
+                                     TemporalPearson.get_user_corrs_name(time_constraint, min_common_elements))
+
+    def store_user_corrs(self, user_corrs, time_constraint, min_common_elements):
+        """
+        Save user correlations to corrs_store, tiled correlations are already on disk and not saved again
+        """
+        if self.corrs_store is None or not isinstance(user_corrs, pd.DataFrame):
+            return
+        from .similarity import TemporalPearson
+        self.corrs_store.save(self.movie_ratings_fingerprint,
+                              TemporalPearson.get_user_corrs_name(time_constraint, min_common_elements), user_corrs)
+
+    def share_memory(self) -> dict:
+        """
+        Also moves the cached and bulk user correlations into shared memory, see Cache.share_memory
+        """
+        handles = super().share_memory()
+        handles['corrs_cache'] = list()
+        for key, (user_corrs, size) in list(self.corrs_cache.entries.items()):
+            user_corrs, handle = self.share_user_corrs(user_corrs)
+            self.corrs_cache.entries[key] = (user_corrs, size)
+            if handle is not None:
+                handles['corrs_cache'].append((key, handle))
+
+        handles['user_corrs_in_bulk'] = None
+        if self.user_corrs_in_bulk is not None:
+            handles['user_corrs_in_bulk'] = self._share_bulk(self.user_corrs_in_bulk)
+        return handles
+
+    def attach_shared_memory(self, handles: dict):
+        """
+        Correlations which were not shared, tiled or memory mapped ones, are created again when needed
+        """
+        super().attach_shared_memory(handles)
+        for key, handle in handles['corrs_cache']:
+            self.corrs_cache.put(handle.attach(), *key)
+        if handles['user_corrs_in_bulk'] is not None:
+            self.user_corrs_in_bulk = self.new_bulk_corrs()
+            self._attach_bulk(self.user_corrs_in_bulk, handles['user_corrs_in_bulk'])
+
+    def _share_bulk(self, bulk_corrs):
+        handles = dict()
+        for key, value in list(bulk_corrs.items()):
+            if isinstance(value, MutableMapping):
+                handles[key] = self._share_bulk(value)
+                continue
+            bulk_corrs[key], handle = self.share_user_corrs(value)
+            if handle is not None:
+                handles[key] = handle
+        return handles
+
+    def _attach_bulk(self, bulk_corrs, handles):
+        for key, handle in handles.items():
+            if isinstance(handle, dict):
+                bulk_corrs[key] = self.new_bulk_corrs()
+                self._attach_bulk(bulk_corrs[key], handle)
+            else:
+                bulk_corrs[key] = handle.attach()
 
     def get_user_corrs(self, min_common_elements, time_constraint=None):
         """
@@ -181,8 +427,7 @@ class TemporalCache(Cache):
         :return: user correlation matrix if cache found, else None
         """
         if self.is_user_correlations_cached:
-            if self.time_constraint == time_constraint and self.min_common_elements == min_common_elements:
-                return self.user_correlations
+            return self.corrs_cache.get(time_constraint, min_common_elements)
         return None
 
     def set_user_corrs(self, user_corrs, min_common_elements, time_constraint):
@@ -191,6 +436,7 @@ class TemporalCache(Cache):
             self._time_constraint = time_constraint
             self.min_common_elements = min_common_elements
             self.user_correlations = user_corrs
+            self.corrs_cache.put(user_corrs, time_constraint, min_common_elements)
 
     @property
     def time_constraint(self):
@@ -199,4 +445,3 @@ class TemporalCache(Cache):
     @time_constraint.setter
     def time_constraint(self, value):
         self._time_constraint = value
-
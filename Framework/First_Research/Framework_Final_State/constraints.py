@@ -48,6 +48,13 @@ class TimeConstraint:
             return False
         return self._start_dt != other.start_dt or self._end_dt != other.end_dt
 
+    def __hash__(self):
+        # TimeConstraints are mutable, only use copies that are never changed as dict keys
+        return hash((self._start_dt, self._end_dt))
+
+    def copy(self):
+        return TimeConstraint(end_dt=self._end_dt, start_dt=self._start_dt)
+
     # Properties
 
     @property
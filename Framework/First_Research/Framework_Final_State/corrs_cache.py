@@ -0,0 +1,73 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .constraints import TimeConstraint
+
+
+class LRUCorrsCache:
+    """
+    Least recently used cache of user correlations, keyed by (time constraint, min_common_elements).
+
+    Correlations are kept until their total size exceeds memory_budget, then the least recently used ones are evicted.
+    Correlations larger than the whole budget are never cached.
+    """
+
+    def __init__(self, memory_budget=1 << 31):
+        """
+        :param memory_budget: upper bound of the total size of the cached correlations, in bytes
+        """
+        self.memory_budget = memory_budget
+        self.entries = OrderedDict()    # key -> (user correlations, size)
+        self.size = 0
+
+    def get(self, time_constraint: TimeConstraint, min_common_elements):
+        """
+        :return: cached user correlations, None if not found
+        """
+        key = LRUCorrsCache.get_key(time_constraint, min_common_elements)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, user_corrs, time_constraint: TimeConstraint, min_common_elements):
+        key = LRUCorrsCache.get_key(time_constraint, min_common_elements)
+        self.remove(key)
+        size = LRUCorrsCache.get_size(user_corrs)
+        if size > self.memory_budget:
+            return
+        while self.size + size > self.memory_budget:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+        self.entries[key] = (user_corrs, size)
+        self.size += size
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def get_key(time_constraint: TimeConstraint, min_common_elements):
+        # Copy, callers keep changing the dates of their time constraints
+        return None if time_constraint is None else time_constraint.copy(), min_common_elements
+
+    @staticmethod
+    def get_size(user_corrs):
+        """
+        :return: bytes held in memory by the user correlations, memory mapped arrays of tiled results are not counted
+        """
+        if isinstance(user_corrs, pd.DataFrame):
+            return int(user_corrs.memory_usage(index=True, deep=False).sum())
+        return sum(value.nbytes for value in vars(user_corrs).values()
+                   if isinstance(value, np.ndarray) and not isinstance(value, np.memmap))
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+class CorrsStore:
+    """
+    Persistent cache of user correlations that outlives the process.
+
+    Entries are directories under store_dir/<method>/<ratings fingerprint>/<name>, where name is unique for each
+    time constraint and min_common_elements. Correlations are written as .npy files and memory mapped on load, so an
+    evaluation run or notebook restart reads correlations computed by an earlier run in milliseconds.
+    """
+
+    format_version = 1
+
+    def __init__(self, store_dir, method='pearson'):
+        """
+        :param store_dir: root directory of the store, shared by all datasets
+        :param method: similarity method that created the correlations
+        """
+        self.store_dir = store_dir
+        self.method = method
+
+    def load(self, fingerprint, name):
+        """
+        :return: stored user correlations, None if not stored yet
+        """
+        path = self.get_path(fingerprint, name)
+        if not os.path.isfile(os.path.join(path, 'meta.json')):
+            return None
+        user_ids = pd.Index(np.load(os.path.join(path, 'user_ids.npy')), name='user_id')
+        corrs = np.load(os.path.join(path, 'corrs.npy'), mmap_mode='r')
+        return pd.DataFrame(corrs, index=user_ids, columns=user_ids.copy(), copy=False)
+
+    def save(self, fingerprint, name, user_corrs: pd.DataFrame):
+        path = self.get_path(fingerprint, name)
+        if os.path.isdir(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written into a temporary directory first, readers never see half written entries
+        temp_path = tempfile.mkdtemp(dir=os.path.dirname(path))
+        np.save(os.path.join(temp_path, 'user_ids.npy'), user_corrs.columns.to_numpy())
+        np.save(os.path.join(temp_path, 'corrs.npy'), user_corrs.to_numpy(dtype=np.float64))
+        with open(os.path.join(temp_path, 'meta.json'), 'w') as meta_file:
+            json.dump({'format_version': CorrsStore.format_version}, meta_file)
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)  # Saved by another process in the meantime
+
+    def get_path(self, fingerprint, name):
+        return os.path.join(self.store_dir, self.method, f"v{CorrsStore.format_version}_{fingerprint}", name)
+
+    @staticmethod
+    def get_fingerprint(movie_ratings: pd.DataFrame):
+        """
+        :return: hash of the 'user_id', 'item_id', 'rating' and 'timestamp' columns of the ratings
+        """
+        digest = hashlib.sha1()
+        for column in ('user_id', 'item_id', 'rating', 'timestamp'):
+            values = np.ascontiguousarray(movie_ratings[column].to_numpy())
+            digest.update(f"{column}|{values.dtype.str}|{len(values)}".encode('utf-8'))
+            digest.update(values.view(np.uint8))
+        return digest.hexdigest()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from .snapshot import Snapshot
 import pandas as pd
 import os
 
@@ -18,22 +19,32 @@ class MovieLensDataset(Dataset):
                  movies_col_names=('item_id', 'title', 'genres'),
                  movies_path=r'C:\Users\Yukawa\datasets\ml-latest-small\movies.csv',
                  is_ratings_cached=True,
-                 is_movies_cached=True):
+                 is_movies_cached=True,
+                 snapshot_dir=None):
         Dataset.__init__(self)
         # In case we dont want to use Cache class, we can cache movies and ratings here as well.
         self.is_ratings_cached = is_ratings_cached
         self.is_movies_cached = is_movies_cached
-        self.ratings = MovieLensDataset.load_ratings(ratings_path,
-                                                     ratings_col_names) if self.is_ratings_cached else None
-        self.movies = MovieLensDataset.load_movies(movies_path,
-                                                   movies_col_names) if self.is_movies_cached else None
+        self.ratings = MovieLensDataset.load_ratings(ratings_path, ratings_col_names,
+                                                     snapshot_dir) if self.is_ratings_cached else None
+        self.movies = MovieLensDataset.load_movies(movies_path, movies_col_names,
+                                                   snapshot_dir) if self.is_movies_cached else None
 
     @staticmethod
     def load_movies(movies_path,
-                    movies_col_names=('item_id', 'title', 'genres')):
+                    movies_col_names=('item_id', 'title', 'genres'),
+                    snapshot_dir=None):
+        """
+        :param snapshot_dir: When given, parsed movies are saved into and later loaded from a binary snapshot here.
+        """
         if not os.path.isfile(movies_path) or not movies_col_names:
             return None
 
+        if snapshot_dir is not None:
+            return Snapshot(snapshot_dir).load_or_create(
+                movies_path, 'movies_' + '_'.join(movies_col_names),
+                lambda: MovieLensDataset.load_movies(movies_path, movies_col_names))
+
         # read movies
         movies = pd.read_csv(movies_path, sep=',', header=1, names=movies_col_names)
 
@@ -49,10 +60,19 @@ class MovieLensDataset(Dataset):
 
     @staticmethod
     def load_ratings(ratings_path,
-                     ratings_col_names=('user_id', 'item_id', 'rating', 'timestamp')):
+                     ratings_col_names=('user_id', 'item_id', 'rating', 'timestamp'),
+                     snapshot_dir=None):
+        """
+        :param snapshot_dir: When given, parsed ratings are saved into and later loaded from a binary snapshot here.
+        """
         if not os.path.isfile(ratings_path) or not ratings_col_names:
             return None
 
+        if snapshot_dir is not None:
+            return Snapshot(snapshot_dir).load_or_create(
+                ratings_path, 'ratings_' + '_'.join(ratings_col_names),
+                lambda: MovieLensDataset.load_ratings(ratings_path, ratings_col_names))
+
         # read ratings
         ratings = pd.read_csv(ratings_path, sep=',', header=1, names=ratings_col_names)
 
@@ -69,12 +89,15 @@ class MovieLensDataset(Dataset):
     def load(ratings_col_names=('user_id', 'item_id', 'rating', 'timestamp'),
              ratings_path=r'C:\Users\Yukawa\datasets\ml-latest-small\ratings.csv',
              movies_col_names=('item_id', 'title', 'genres'),
-             movies_path=r'C:\Users\Yukawa\datasets\ml-latest-small\movies.csv'
+             movies_path=r'C:\Users\Yukawa\datasets\ml-latest-small\movies.csv',
+             snapshot_dir=None
              ):
         # Load movies
-        movies = MovieLensDataset.load_movies(movies_path=movies_path, movies_col_names=movies_col_names)
+        movies = MovieLensDataset.load_movies(movies_path=movies_path, movies_col_names=movies_col_names,
+                                              snapshot_dir=snapshot_dir)
         # Load ratings
-        ratings = MovieLensDataset.load_ratings(ratings_path=ratings_path, ratings_col_names=ratings_col_names)
+        ratings = MovieLensDataset.load_ratings(ratings_path=ratings_path, ratings_col_names=ratings_col_names,
+                                                snapshot_dir=snapshot_dir)
 
         # Merge the ratings and movies
         movie_ratings = pd.merge(ratings, movies, on='item_id')
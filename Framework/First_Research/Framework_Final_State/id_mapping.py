@@ -0,0 +1,58 @@
+import numpy as np
+
+
+class IdMapping:
+    """
+    Bidirectional mapping between external ids ('user_id', 'item_id') and contiguous 0..n-1 positions.
+
+    Positions follow the sorted order of the ids. Non-negative integer ids are translated with a lookup table,
+    other ids with a binary search. Ids that are not in the mapping are translated to -1.
+    """
+
+    max_lookup_table_size = 1 << 26
+
+    def __init__(self, ids):
+        """
+        :param ids: external ids, may contain duplicates
+        """
+        self.ids = np.unique(np.asarray(ids))
+        self.lookup_table = None
+        if (len(self.ids) > 0 and self.ids.dtype.kind in 'iu'
+                and self.ids[0] >= 0 and self.ids[-1] < IdMapping.max_lookup_table_size):
+            self.lookup_table = np.full(int(self.ids[-1]) + 1, -1, dtype=np.int32)
+            self.lookup_table[self.ids] = np.arange(len(self.ids))
+
+    def to_position(self, external_id):
+        """
+        :return: position of the id, -1 if the id is not in the mapping
+        """
+        if self.lookup_table is not None and isinstance(external_id, (int, np.integer)):
+            return int(self.lookup_table[external_id]) if 0 <= external_id < len(self.lookup_table) else -1
+        return int(self.to_positions(np.asarray([external_id]))[0])
+
+    def to_positions(self, external_ids):
+        """
+        :return: array of positions of the ids, -1 for the ids that are not in the mapping
+        """
+        external_ids = np.asarray(external_ids)
+        if self.lookup_table is not None and external_ids.dtype.kind in 'iu':
+            in_table = (external_ids >= 0) & (external_ids < len(self.lookup_table))
+            positions = np.full(len(external_ids), -1, dtype=np.int64)
+            positions[in_table] = self.lookup_table[external_ids[in_table]]
+            return positions
+        positions = np.searchsorted(self.ids, external_ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == external_ids[found]
+        return np.where(found, positions, -1)
+
+    def to_id(self, position):
+        return self.ids[position]
+
+    def to_ids(self, positions):
+        return self.ids[np.asarray(positions, dtype=np.int64)]
+
+    def __contains__(self, external_id):
+        return self.to_position(external_id) >= 0
+
+    def __len__(self):
+        return len(self.ids)
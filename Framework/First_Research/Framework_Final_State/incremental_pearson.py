@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sparse
+
+from .id_mapping import IdMapping
+from .sparse_pearson import SparsePearson
+
+
+class IncrementalPearson:
+    """
+    User-user pearson correlations of a growing ratings set, kept up to date with running pair sums.
+
+    For each pair of users the number of co-rated items, the rating sums, the sums of squares and the sum of products
+    over the co-rated items are kept. Adding a batch of ratings only folds in the pairs that involve the new ratings,
+    so correlations of every prefix of a time ordered ratings set cost about one pass over the ratings in total.
+    """
+
+    def __init__(self, movie_ratings: pd.DataFrame, min_common_elements):
+        """
+        :param movie_ratings: all ratings that may be added later, defines the users and items
+        :param min_common_elements: min common elements in between users in order to correlate them
+        """
+        self.min_common_elements = min_common_elements
+        self.user_mapping = IdMapping(movie_ratings['user_id'].to_numpy())
+        self.item_mapping = IdMapping(movie_ratings['item_id'].to_numpy())
+        n_users, n_items = len(self.user_mapping), len(self.item_mapping)
+        self.shape = (n_items, n_users)
+
+        # Ratings added so far
+        self.ratings = sparse.csc_matrix(self.shape)
+        self.squared_ratings = sparse.csc_matrix(self.shape)
+        self.is_rated = sparse.csc_matrix(self.shape)
+        self.has_ratings = np.zeros(n_users, dtype=bool)
+
+        # Running sums of each (user, other user) pair over the co-rated items, sums of the other user are transposes
+        self.n = np.zeros((n_users, n_users))
+        self.sum_x = np.zeros((n_users, n_users))
+        self.sum_xx = np.zeros((n_users, n_users))
+        self.sum_xy = np.zeros((n_users, n_users))
+
+    def add_ratings(self, new_ratings: pd.DataFrame):
+        """
+        Fold new ratings into the pair sums. Each (user, item) rating must be added only once.
+
+        :param new_ratings: DataFrame with 'user_id', 'item_id' and 'rating' columns
+        """
+        cols = self.user_mapping.to_positions(new_ratings['user_id'].to_numpy())
+        rows = self.item_mapping.to_positions(new_ratings['item_id'].to_numpy())
+        values = new_ratings['rating'].to_numpy(dtype=np.float64)
+        delta = sparse.csc_matrix((values, (rows, cols)), shape=self.shape)
+        delta_squared = sparse.csc_matrix((values * values, (rows, cols)), shape=self.shape)
+        delta_is_rated = sparse.csc_matrix((np.ones(len(values)), (rows, cols)), shape=self.shape)
+
+        self.ratings = self.ratings + delta
+        self.squared_ratings = self.squared_ratings + delta_squared
+        self.is_rated = self.is_rated + delta_is_rated
+        self.has_ratings[cols] = True
+
+        # (A + D)^T (B + E) - A^T B = D^T (B + E) + (A + D)^T E - D^T E, with A, B old and D, E new ratings
+        self.n += IncrementalPearson._get_delta(delta_is_rated, self.is_rated, self.is_rated, delta_is_rated)
+        self.sum_x += IncrementalPearson._get_delta(delta, self.is_rated, self.ratings, delta_is_rated)
+        self.sum_xx += IncrementalPearson._get_delta(delta_squared, self.is_rated,
+                                                     self.squared_ratings, delta_is_rated)
+        self.sum_xy += IncrementalPearson._get_delta(delta, self.ratings, self.ratings, delta)
+
+    def get_user_corrs(self) -> pd.DataFrame:
+        """
+        :return: correlations of the ratings added so far, indexed by the 'user_id's which have ratings
+        """
+        users = np.flatnonzero(self.has_ratings)
+        pairs = np.ix_(users, users)
+        n, sum_x, sum_xx = self.n[pairs], self.sum_x[pairs], self.sum_xx[pairs]
+        corrs = SparsePearson.corrs_from_sums(n, sum_x, sum_x.T, sum_xx, sum_xx.T, self.sum_xy[pairs],
+                                              self.min_common_elements)
+        user_ids = pd.Index(self.user_mapping.to_ids(users), name='user_id')
+        return pd.DataFrame(corrs, index=user_ids, columns=user_ids.copy())
+
+    @staticmethod
+    def _get_delta(new_x, all_y, all_x, new_y):
+        return (new_x.T @ all_y + all_x.T @ new_y - new_x.T @ new_y).toarray()
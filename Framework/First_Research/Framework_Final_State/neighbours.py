@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from .id_mapping import IdMapping
+from .sparse_pearson import TiledCorrs
+
+
+class NeighbourIndex:
+    """
+    Top K neighbours of each user stored in fixed width arrays, sorted by descending correlation.
+
+    Neighbours are selected once with a partial selection (argpartition) instead of sorting the whole correlation
+    column on each query, so memory is O(N.K) and queries are O(k). Users are never neighbours of themselves.
+    """
+
+    def __init__(self, user_ids, neighbours, corrs):
+        """
+        :param user_ids: sorted 'user_id's
+        :param neighbours: N x K array of neighbour positions, -1 when there are less than K neighbours
+        :param corrs: N x K array of the neighbour correlations, NaN when there are less than K neighbours
+        """
+        # Neighbours are positions of the sorted 'user_id's of the IdMapping, rows have to be in that order as well
+        if np.any(user_ids[1:] <= user_ids[:-1]):
+            raise Exception("'user_id's of the neighbour index have to be sorted!")
+        self.user_mapping = IdMapping(user_ids)
+        self.neighbours = neighbours
+        self.corrs = corrs
+
+    @staticmethod
+    def from_user_corrs(user_corrs: pd.DataFrame, k):
+        """
+        :param user_corrs: user x user correlation DataFrame
+        :param k: number of neighbours to keep for each user
+        """
+        if not (user_corrs.index.is_monotonic_increasing and user_corrs.columns.is_monotonic_increasing):
+            user_corrs = user_corrs.sort_index().sort_index(axis=1)
+        if not user_corrs.index.equals(user_corrs.columns):
+            raise Exception("Rows and columns of the user correlations have to be the same users!")
+        corrs = user_corrs.to_numpy(dtype=np.float64, copy=True)
+        np.fill_diagonal(corrs, np.nan)
+        neighbours, corrs = TiledCorrs.select_top_k(corrs, min(k, corrs.shape[1]))
+        return NeighbourIndex(user_corrs.columns.to_numpy(), neighbours, corrs)
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    def get_k_neighbours(self, user_id, k=None):
+        """
+        :return: DataFrame of the k neighbours with 'correlation' column and 'user_id' index, None if user not found
+        """
+        u = self.user_mapping.to_position(user_id)
+        if u < 0:
+            return None
+        neighbours = self.neighbours[u, :k]
+        found = neighbours >= 0
+        return pd.DataFrame({'correlation': self.corrs[u, :k][found]},
+                            index=pd.Index(self.user_mapping.to_ids(neighbours[found]), name='user_id'))
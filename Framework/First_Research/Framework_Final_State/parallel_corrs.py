@@ -0,0 +1,171 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .constraints import TimeConstraint
+from .sparse_pearson import SparsePearson, TiledCorrs
+
+# Shared ratings of a worker process, attached once by the pool initializer
+_worker_ratings = None
+
+
+class ParallelCorrsBuilder:
+    """
+    Creates the user correlations of many time constraints in worker processes.
+
+    The ratings are put once into shared memory as time ordered 'user_id', 'item_id', 'rating' and timestamp arrays,
+    so a worker only slices the ratings of its time constraint. In memory correlations are written by the worker into
+    a shared memory block allocated by the builder, tiled correlations are written to disk by the worker. Only names
+    and bounds go through the pipes, never the ratings or correlation DataFrames.
+    """
+
+    def __init__(self, n_workers=None):
+        """
+        :param n_workers: number of worker processes, number of cpus if None
+        """
+        self.n_workers = n_workers if n_workers is not None else os.cpu_count()
+
+    def create_user_corrs(self, movie_ratings: pd.DataFrame, time_constraints: list, min_common_elements,
+                          tiled_corrs: TiledCorrs = None, store_result=None) -> list:
+        """
+        Parallel version of TemporalPearson.create_user_corrs for each of the time constraints.
+
+        :param movie_ratings: DataFrame with 'user_id', 'item_id', 'rating' and 'timestamp' columns
+        :param time_constraints: max limit or time bin TimeConstraints
+        :param min_common_elements: min common elements in between users in order to correlate them
+        :param tiled_corrs: when given, correlations are created by tiled_corrs on disk
+        :param store_result: when given, called with (index of the time constraint, user correlations) as soon as
+                             they are created, instead of keeping them until all are done
+        :return: user correlations of each time constraint in the same order, None if store_result is given
+        """
+        from .similarity import TemporalPearson
+
+        movie_ratings = movie_ratings.sort_values(by='timestamp', kind='stable')
+        columns = {'user_id': movie_ratings['user_id'].to_numpy(),
+                   'item_id': movie_ratings['item_id'].to_numpy(),
+                   'rating': movie_ratings['rating'].to_numpy(dtype=np.float64),
+                   'timestamp': ParallelCorrsBuilder._to_ns(movie_ratings['timestamp'].to_numpy())}
+        shared_columns = {name: ParallelCorrsBuilder._share(values) for name, values in columns.items()}
+        timestamps = columns['timestamp']
+
+        results = [None] * len(time_constraints) if store_result is None else None
+        if store_result is None:
+            def store_result(i, user_corrs):
+                results[i] = user_corrs
+        in_progress = dict()
+        try:
+            with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_attach_ratings,
+                                     initargs=({name: ParallelCorrsBuilder._describe(block, columns[name])
+                                                for name, block in shared_columns.items()},)) as executor:
+                for i, time_constraint in enumerate(time_constraints):
+                    start, end = ParallelCorrsBuilder._get_bounds(time_constraint, timestamps)
+                    if tiled_corrs is not None:
+                        name = TemporalPearson.get_user_corrs_name(time_constraint, min_common_elements)
+                        future = executor.submit(_create_tiled_corrs, start, end, min_common_elements, tiled_corrs,
+                                                 name)
+                        in_progress[future] = (i, name)
+                    else:
+                        user_ids = np.unique(columns['user_id'][start:end])
+                        if len(user_ids) == 0:
+                            store_result(i, ParallelCorrsBuilder._to_user_corrs(user_ids, np.zeros((0, 0))))
+                            continue
+                        block = shared_memory.SharedMemory(create=True, size=len(user_ids) ** 2 * 8)
+                        future = executor.submit(_create_corrs, start, end, min_common_elements, block.name)
+                        in_progress[future] = (i, (user_ids, block))
+
+                    # Bound the number of allocated result blocks waiting for the workers
+                    if len(in_progress) >= 2 * self.n_workers:
+                        self._collect(wait(in_progress, return_when=FIRST_COMPLETED).done, in_progress, store_result,
+                                      tiled_corrs)
+                self._collect(wait(in_progress).done, in_progress, store_result, tiled_corrs)
+        finally:
+            for _, result in in_progress.values():
+                if tiled_corrs is None:
+                    ParallelCorrsBuilder._release(result[1])
+            for block in shared_columns.values():
+                ParallelCorrsBuilder._release(block)
+        return results
+
+    @staticmethod
+    def _collect(done, in_progress, store_result, tiled_corrs):
+        for future in done:
+            i, result = in_progress.pop(future)
+            if tiled_corrs is not None:
+                future.result()
+                store_result(i, tiled_corrs.load(result))
+                continue
+            user_ids, block = result
+            try:
+                future.result()
+                corrs = np.ndarray((len(user_ids), len(user_ids)), dtype=np.float64, buffer=block.buf).copy()
+                store_result(i, ParallelCorrsBuilder._to_user_corrs(user_ids, corrs))
+            finally:
+                ParallelCorrsBuilder._release(block)
+
+    @staticmethod
+    def _get_bounds(time_constraint: TimeConstraint, timestamps):
+        """
+        :return: [start, end) positions of the time constraint's ratings in the time ordered ratings
+        """
+        start = 0
+        if time_constraint.is_valid_time_bin():
+            start = timestamps.searchsorted(ParallelCorrsBuilder._to_ns(time_constraint.start_dt), side='left')
+        elif not time_constraint.is_valid_max_limit():
+            raise Exception("Parallel user correlations are only created for max limit and time bin constraints!")
+        end = timestamps.searchsorted(ParallelCorrsBuilder._to_ns(time_constraint.end_dt), side='left')
+        return int(start), int(end)
+
+    @staticmethod
+    def _to_user_corrs(user_ids, corrs) -> pd.DataFrame:
+        user_ids = pd.Index(user_ids, name='user_id')
+        return pd.DataFrame(corrs, index=user_ids, columns=user_ids.copy())
+
+    @staticmethod
+    def _to_ns(timestamps):
+        return np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64)
+
+    @staticmethod
+    def _share(values: np.ndarray):
+        block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+        return block
+
+    @staticmethod
+    def _describe(block, values: np.ndarray):
+        return block.name, values.dtype.str, len(values)
+
+    @staticmethod
+    def _release(block):
+        block.close()
+        block.unlink()
+
+
+def _attach_ratings(shared_columns):
+    global _worker_ratings
+    blocks = {name: shared_memory.SharedMemory(name=block_name) for name, (block_name, _, _) in shared_columns.items()}
+    columns = {name: np.ndarray((length,), dtype=dtype, buffer=blocks[name].buf)
+               for name, (_, dtype, length) in shared_columns.items()}
+    _worker_ratings = (blocks, columns)
+
+
+def _get_sparse_pearson(start, end, min_common_elements):
+    _, columns = _worker_ratings
+    movie_ratings = pd.DataFrame({name: columns[name][start:end] for name in ('user_id', 'item_id', 'rating')})
+    return SparsePearson(movie_ratings, min_common_elements)
+
+
+def _create_corrs(start, end, min_common_elements, block_name):
+    sparse_pearson = _get_sparse_pearson(start, end, min_common_elements)
+    n_users = len(sparse_pearson.user_mapping)
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        np.ndarray((n_users, n_users), dtype=np.float64, buffer=block.buf)[:] = sparse_pearson.get_corrs()
+    finally:
+        block.close()
+
+
+def _create_tiled_corrs(start, end, min_common_elements, tiled_corrs: TiledCorrs, name):
+    tiled_corrs.create(_get_sparse_pearson(start, end, min_common_elements), name)
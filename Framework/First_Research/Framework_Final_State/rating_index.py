@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from .id_mapping import IdMapping
+
+
+class RatingIndex:
+    """
+    Compressed user-major (CSR) and item-major (CSC) index over the rows of a ratings DataFrame.
+
+    Slices of a user keep the order of the rows in the DataFrame, so selecting them returns the same rows as a
+    boolean mask over the whole DataFrame would. Inside each user slice the items are also kept sorted, which makes
+    a single (user, item) lookup a binary search over the ratings of that user only.
+    """
+
+    def __init__(self, user_ids: np.ndarray, item_ids: np.ndarray, ratings: np.ndarray):
+        """
+        :param user_ids: 'user_id' of each row
+        :param item_ids: 'item_id' of each row
+        :param ratings: 'rating' of each row
+        """
+        self.user_mapping = IdMapping(user_ids)
+        self.item_mapping = IdMapping(item_ids)
+        self.users, self.items = self.user_mapping.ids, self.item_mapping.ids
+        user_positions = self.user_mapping.to_positions(user_ids)
+        item_positions = self.item_mapping.to_positions(item_ids)
+
+        # User-major layout
+        self.user_ptr = RatingIndex._get_pointers(user_positions, len(self.users))
+        self.user_rows = np.argsort(user_positions, kind='stable')
+        order = np.lexsort((item_positions, user_positions))
+        self.user_sorted_items = item_positions[order]
+        self.user_sorted_rows = order
+        self.user_sorted_ratings = ratings[order]
+
+        # Item-major layout
+        self.item_ptr = RatingIndex._get_pointers(item_positions, len(self.items))
+        order = np.lexsort((user_positions, item_positions))
+        self.item_sorted_users = user_positions[order]
+        self.item_sorted_rows = order
+
+    @staticmethod
+    def from_ratings(data: pd.DataFrame):
+        """
+        :param data: DataFrame with 'user_id', 'item_id' and 'rating' columns
+        :return: RatingIndex over the rows of the data
+        """
+        return RatingIndex(data['user_id'].to_numpy(), data['item_id'].to_numpy(), data['rating'].to_numpy())
+
+    def get_user_rows(self, user_id):
+        """
+        :return: positions of the rows of the user in the DataFrame, empty array if the user is not found
+        """
+        u = self.user_mapping.to_position(user_id)
+        if u < 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.user_rows[self.user_ptr[u]:self.user_ptr[u + 1]]
+
+    def get_item_rows(self, item_id):
+        """
+        :return: positions of the rows of the item in the DataFrame, empty array if the item is not found
+        """
+        i = self.item_mapping.to_position(item_id)
+        if i < 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.item_sorted_rows[self.item_ptr[i]:self.item_ptr[i + 1]]
+
+    def get_item_raters(self, item_id):
+        """
+        :return: sorted 'user_id's of the users who rated the item
+        """
+        i = self.item_mapping.to_position(item_id)
+        if i < 0:
+            return np.zeros(0, dtype=self.users.dtype)
+        return self.users[self.item_sorted_users[self.item_ptr[i]:self.item_ptr[i + 1]]]
+
+    def get_rating_row(self, user_id, item_id):
+        """
+        :return: position of the rating row in the DataFrame, -1 if the user has not rated the item
+        """
+        position = self._find_user_item(user_id, item_id)
+        return self.user_sorted_rows[position] if position >= 0 else -1
+
+    def get_rating(self, user_id, item_id):
+        """
+        :return: rating given by the user to the item, 0 if not found
+        """
+        position = self._find_user_item(user_id, item_id)
+        return self.user_sorted_ratings[position] if position >= 0 else 0
+
+    def _find_user_item(self, user_id, item_id):
+        u = self.user_mapping.to_position(user_id)
+        i = self.item_mapping.to_position(item_id)
+        if u < 0 or i < 0:
+            return -1
+        start, end = self.user_ptr[u], self.user_ptr[u + 1]
+        position = start + np.searchsorted(self.user_sorted_items[start:end], i)
+        if position < end and self.user_sorted_items[position] == i:
+            return position
+        return -1
+
+    @staticmethod
+    def _get_pointers(positions, n):
+        pointers = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(positions, minlength=n), out=pointers[1:])
+        return pointers
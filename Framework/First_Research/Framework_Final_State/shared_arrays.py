@@ -0,0 +1,130 @@
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .id_mapping import IdMapping
+
+# Segments attached by this process, kept open for the lifetime of the process as arrays may still point to them
+# Also keeps the segments released by SharedArrays while arrays on them are still alive
+_attached_blocks = dict()
+
+
+class SharedArrays:
+    """
+    Owner of named shared memory segments holding read-only arrays and user correlations.
+
+    Published arrays are replaced by read-only views on their segment. Forked workers inherit the mapping of the
+    segments, which is never copied on write, and other processes attach to them by their picklable handles. So N
+    workers cost a single copy of the data. Segments are unlinked on close or when the owner is garbage collected.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self._finalizer = weakref.finalize(self, SharedArrays._release, self.blocks)
+
+    def publish(self, array: np.ndarray):
+        """
+        :return: (read-only view on the shared copy of the array, SharedArrayHandle to attach to it)
+        """
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.blocks.append(block)
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[...] = array
+        shared.flags.writeable = False
+        return shared, SharedArrayHandle(block.name, array.dtype.str, array.shape)
+
+    def publish_corrs(self, user_corrs: pd.DataFrame):
+        """
+        :return: (user correlations on shared memory, SharedCorrsHandle to attach to them)
+        """
+        corrs, handle = self.publish(user_corrs.to_numpy(dtype=np.float64))
+        handle = SharedCorrsHandle(handle, user_corrs.index.to_numpy(), user_corrs.index.name)
+        return handle.to_user_corrs(corrs), handle
+
+    def publish_attributes(self, obj) -> dict:
+        """
+        Replace the array attributes of obj, and of its IdMapping attributes, by their shared copies
+
+        :return: handles of the replaced attributes, see attach_attributes
+        """
+        handles = dict()
+        for name, value in vars(obj).items():
+            if isinstance(value, np.ndarray):
+                shared, handles[name] = self.publish(value)
+                setattr(obj, name, shared)
+            elif isinstance(value, IdMapping):
+                handles[name] = (type(value), self.publish_attributes(value))
+        return handles
+
+    def close(self):
+        SharedArrays._release(self.blocks)
+
+    @staticmethod
+    def _release(blocks):
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                _attached_blocks[block.name] = block  # Arrays on the segment are still alive, keep it mapped
+            block.unlink()
+        blocks.clear()
+
+
+class SharedArrayHandle:
+    """
+    Picklable reference to an array published by SharedArrays. Attach from processes started by multiprocessing, they
+    share the resource tracker of the publishing process which then stays the only one unlinking the segment.
+    """
+
+    def __init__(self, name, dtype, shape):
+        self.name = name
+        self.dtype = dtype
+        self.shape = shape
+
+    def attach(self) -> np.ndarray:
+        """
+        :return: read-only array on the shared memory segment
+        """
+        block = _attached_blocks.get(self.name)
+        if block is None:
+            block = shared_memory.SharedMemory(name=self.name)
+            _attached_blocks[self.name] = block
+        array = np.ndarray(self.shape, dtype=np.dtype(self.dtype), buffer=block.buf)
+        array.flags.writeable = False
+        return array
+
+
+class SharedCorrsHandle:
+    """
+    Picklable reference to user correlations published by SharedArrays
+    """
+
+    def __init__(self, corrs_handle: SharedArrayHandle, user_ids, index_name='user_id'):
+        self.corrs_handle = corrs_handle
+        self.user_ids = user_ids
+        self.index_name = index_name
+
+    def attach(self) -> pd.DataFrame:
+        return self.to_user_corrs(self.corrs_handle.attach())
+
+    def to_user_corrs(self, corrs) -> pd.DataFrame:
+        user_ids = pd.Index(self.user_ids, name=self.index_name)
+        return pd.DataFrame(corrs, index=user_ids, columns=user_ids.copy(), copy=False)
+
+
+def attach_attributes(obj, handles: dict):
+    """
+    Set the attributes published by SharedArrays.publish_attributes on obj, e.g. on RatingIndex.__new__(RatingIndex)
+    """
+    for name, handle in handles.items():
+        if isinstance(handle, SharedArrayHandle):
+            setattr(obj, name, handle.attach())
+        else:
+            value_type, value_handles = handle
+            value = value_type.__new__(value_type)
+            attach_attributes(value, value_handles)
+            setattr(obj, name, value)
+    return obj
@@ -1,6 +1,9 @@
 from .constraints import TimeConstraint
 import pandas as pd
 from .cache import TemporalCache
+from .sparse_pearson import SparsePearson, TiledCorrs
+from .incremental_pearson import IncrementalPearson
+from .time_bin_pearson import TimeBinPearson
 from datetime import datetime
 
 
@@ -78,10 +81,14 @@ class TemporalPearson:
 
         # we are here, if cache not found or no cache match
 
-        # Create user correlations
-        user_corrs = TemporalPearson.create_user_corrs(movie_ratings=self.cache.movie_ratings,
-                                                       time_constraint=self.time_constraint,
-                                                       min_common_elements=self.min_common_elements)
+        # Load user correlations saved by an earlier run, else create and save them
+        user_corrs = self.cache.load_stored_user_corrs(self.time_constraint, self.min_common_elements)
+        if user_corrs is None:
+            user_corrs = TemporalPearson.create_user_corrs(movie_ratings=self.cache.movie_ratings,
+                                                           time_constraint=self.time_constraint,
+                                                           min_common_elements=self.min_common_elements,
+                                                           tiled_corrs=self.cache.tiled_corrs)
+            self.cache.store_user_corrs(user_corrs, self.time_constraint, self.min_common_elements)
         
         # Cache the user_corrs, this will only work when caching is activated.
         self.cache.set_user_corrs(user_corrs=user_corrs,
@@ -91,7 +98,8 @@ class TemporalPearson:
         return user_corrs
 
     @staticmethod
-    def create_user_corrs(movie_ratings, time_constraint: TimeConstraint, min_common_elements):
+    def create_user_corrs(movie_ratings, time_constraint: TimeConstraint, min_common_elements,
+                          tiled_corrs: TiledCorrs = None):
         # by default movie_ratings is for no time constraint
         # with these controls change the time constraint of the movie_ratings
         if time_constraint is not None:
@@ -101,8 +109,20 @@ class TemporalPearson:
                 movie_ratings = movie_ratings[(movie_ratings.timestamp >= time_constraint.start_dt)
                                               & (movie_ratings.timestamp < time_constraint.end_dt)]
 
-        user_movie_matrix = movie_ratings.pivot_table(index='title', columns='user_id', values='rating')
-        return user_movie_matrix.corr(method="pearson", min_periods=min_common_elements)
+        sparse_pearson = SparsePearson(movie_ratings, min_common_elements)
+        if tiled_corrs is not None:
+            return tiled_corrs.create(sparse_pearson,
+                                      TemporalPearson.get_user_corrs_name(time_constraint, min_common_elements))
+        return sparse_pearson.get_user_corrs()
+
+    @staticmethod
+    def get_user_corrs_name(time_constraint: TimeConstraint, min_common_elements):
+        """
+        :return: name of the user correlations on disk, unique for each time constraint and min_common_elements
+        """
+        dts = (None, None) if time_constraint is None else (time_constraint.start_dt, time_constraint.end_dt)
+        dts = [dt.strftime('%Y%m%d%H%M%S') if dt is not None else 'none' for dt in dts]
+        return f"corrs_{dts[0]}_{dts[1]}_{min_common_elements}"
 
     def cache_user_corrs_in_bulk_for_max_limit(self, time_constraint: TimeConstraint, min_year, max_year):
         """
@@ -116,12 +136,37 @@ class TemporalPearson:
 
         if self.cache.use_bulk_corr_cache:
             if time_constraint is not None and time_constraint.is_valid_max_limit():
-                self.cache.user_corrs_in_bulk = dict()
-                for year in range(min_year, max_year):
-                    time_constraint.end_dt = time_constraint.end_dt.replace(year=year)
-                    corrs = TemporalPearson.create_user_corrs(self.cache.movie_ratings, time_constraint,
-                                                              self.min_common_elements)
-                    self.cache.user_corrs_in_bulk[year] = corrs
+                self.cache.reset_user_corrs_in_bulk()
+                years = list(range(min_year, max_year))
+                time_constraints = [TimeConstraint(end_dt=time_constraint.end_dt.replace(year=year)) for year in years]
+                if self._load_stored_in_bulk(years, time_constraints):
+                    return
+                store_in_bulk = self._store_in_bulk(years, time_constraints)
+
+                if self.cache.parallel_builder is not None:
+                    self.cache.parallel_builder.create_user_corrs(self.cache.movie_ratings, time_constraints,
+                                                                  self.min_common_elements, self.cache.tiled_corrs,
+                                                                  store_in_bulk)
+                    return
+
+                if self.cache.tiled_corrs is not None:
+                    # Tiled correlations never hold the full pair sums in memory, create each year separately
+                    for i, year_time_constraint in enumerate(time_constraints):
+                        corrs = TemporalPearson.create_user_corrs(self.cache.movie_ratings, year_time_constraint,
+                                                                  self.min_common_elements, self.cache.tiled_corrs)
+                        store_in_bulk(i, corrs)
+                    return
+
+                # Fold in only the ratings of each new year instead of recreating the correlations of every prefix
+                movie_ratings = self.cache.movie_ratings.sort_values(by='timestamp', kind='stable')
+                incremental_pearson = IncrementalPearson(movie_ratings, self.min_common_elements)
+                n_added = 0
+                for i, year_time_constraint in enumerate(time_constraints):
+                    n_ratings = movie_ratings.timestamp.searchsorted(year_time_constraint.end_dt, side='left')
+                    if n_ratings > n_added:
+                        incremental_pearson.add_ratings(movie_ratings.iloc[n_added:n_ratings])
+                        n_added = n_ratings
+                    store_in_bulk(i, incremental_pearson.get_user_corrs())
             else:
                 raise Exception("Trying to cache user correlations in bulk for max_limit "
                                 "but start time is not max_limit!")
@@ -132,23 +177,85 @@ class TemporalPearson:
                                                min_time_bin_size=2, max_time_bin_size=10):
         if self.cache.use_bulk_corr_cache:
             if time_constraint is not None and time_constraint.is_valid_time_bin():
-                del self.cache.user_corrs_in_bulk    # invalidate old cache
-                self.cache.user_corrs_in_bulk = dict()
+                self.cache.reset_user_corrs_in_bulk()    # invalidate old cache
                 for time_bin_size in range(min_time_bin_size, max_time_bin_size):
-                    self.cache.user_corrs_in_bulk[time_bin_size] = dict()
-                    for shift in range(0, time_bin_size):
-                        curr_year = min_year + shift
-                        while (curr_year + time_bin_size) < max_year:
-                            time_constraint = TimeConstraint(start_dt=datetime(curr_year, 1, 1),
-                                                             end_dt=datetime(curr_year + time_bin_size, 1, 1))
-                            corrs = TemporalPearson.create_user_corrs(self.cache.movie_ratings,
-                                                                      time_constraint,
-                                                                      self.min_common_elements)
-                            self.cache.user_corrs_in_bulk[time_bin_size][curr_year] = corrs
-                            curr_year += time_bin_size
+                    self.cache.user_corrs_in_bulk[time_bin_size] = self.cache.new_bulk_corrs()
+
+                if self.cache.parallel_builder is None and self.cache.tiled_corrs is None:
+                    # Bins are answered on demand from per year pair sums, computed once for every bin configuration
+                    self.cache.time_bin_pearson = TimeBinPearson(self.cache.movie_ratings, self.min_common_elements)
+                    return
+
+                time_bins = TemporalPearson._get_time_bins(min_year, max_year, min_time_bin_size, max_time_bin_size)
+                time_constraints = [TimeConstraint(start_dt=datetime(curr_year, 1, 1),
+                                                   end_dt=datetime(curr_year + time_bin_size, 1, 1))
+                                    for time_bin_size, curr_year in time_bins]
+                if self._load_stored_in_bulk(time_bins, time_constraints):
+                    return
+                store_in_bulk = self._store_in_bulk(time_bins, time_constraints)
+                if self.cache.parallel_builder is not None:
+                    self.cache.parallel_builder.create_user_corrs(self.cache.movie_ratings, time_constraints,
+                                                                  self.min_common_elements, self.cache.tiled_corrs,
+                                                                  store_in_bulk)
+                    return
+                for i, time_constraint in enumerate(time_constraints):
+                    corrs = TemporalPearson.create_user_corrs(self.cache.movie_ratings,
+                                                              time_constraint,
+                                                              self.min_common_elements,
+                                                              self.cache.tiled_corrs)
+                    store_in_bulk(i, corrs)
         else:
             raise Exception("Trying to create bulk corr cache when use_bulk_corr_cache is False")
 
+    def _store_in_bulk(self, keys, time_constraints):
+        """
+        :param keys: year, or (time_bin_size, start year) of each created user correlations
+        :param time_constraints: time constraint of each created user correlations
+        :return: function storing the i'th created user correlations in user_corrs_in_bulk and the corrs store
+        """
+        def store(i, corrs):
+            self._set_in_bulk(keys[i], corrs)
+            self.cache.store_user_corrs(corrs, time_constraints[i], self.min_common_elements)
+        return store
+
+    def _load_stored_in_bulk(self, keys, time_constraints) -> bool:
+        """
+        Fill user_corrs_in_bulk from the corrs store of the cache, only when all of the time constraints are stored
+
+        :return: True if user_corrs_in_bulk is filled
+        """
+        if self.cache.corrs_store is None:
+            return False
+        all_corrs = list()
+        for time_constraint in time_constraints:
+            corrs = self.cache.load_stored_user_corrs(time_constraint, self.min_common_elements)
+            if corrs is None:
+                return False
+            all_corrs.append(corrs)
+        for key, corrs in zip(keys, all_corrs):
+            self._set_in_bulk(key, corrs)
+        return True
+
+    def _set_in_bulk(self, key, corrs):
+        if isinstance(key, tuple):
+            self.cache.user_corrs_in_bulk[key[0]][key[1]] = corrs
+        else:
+            self.cache.user_corrs_in_bulk[key] = corrs
+
+    @staticmethod
+    def _get_time_bins(min_year, max_year, min_time_bin_size, max_time_bin_size):
+        """
+        :return: (time_bin_size, start year) of each time bin cached in bulk
+        """
+        time_bins = []
+        for time_bin_size in range(min_time_bin_size, max_time_bin_size):
+            for shift in range(0, time_bin_size):
+                curr_year = min_year + shift
+                while (curr_year + time_bin_size) < max_year:
+                    time_bins.append((time_bin_size, curr_year))
+                    curr_year += time_bin_size
+        return time_bins
+
     @property
     def time_constraint(self):
         return self._time_constraint
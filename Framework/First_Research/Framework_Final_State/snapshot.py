@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+class Snapshot:
+    """
+    Binary columnar snapshot of parsed DataFrames.
+
+    Each column is stored as its own .npy file inside a directory named after the fingerprint of the source file,
+    so that later loads can memory map the columns instead of parsing the csv file again.
+    """
+
+    format_version = 1
+
+    def __init__(self, snapshot_dir):
+        self.snapshot_dir = snapshot_dir
+
+    def load_or_create(self, source_path, name, create):
+        """
+        Load the snapshot of the source file, create and save it when it does not exist yet.
+
+        :param source_path: path of the csv file that the snapshot is created from
+        :param name: name of the snapshot, must be different for each parsing of the same file
+        :param create: function which parses the source file and returns the DataFrame
+        :return: parsed DataFrame
+        """
+        data = self.load(source_path, name)
+        if data is None:
+            data = create()
+            if data is not None:
+                self.save(source_path, name, data)
+        return data
+
+    def load(self, source_path, name):
+        """
+        :return: DataFrame whose numeric columns are memory mapped, None if no valid snapshot exists
+        """
+        path = self.get_path(source_path, name)
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.isfile(meta_path):
+            return None
+
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+
+        columns = dict()
+        for column, is_str in meta['columns']:
+            values = np.load(os.path.join(path, column + '.npy'), mmap_mode='r')
+            if is_str:
+                values = pd.Series(values)
+                null_mask_path = os.path.join(path, column + '.null.npy')
+                if os.path.isfile(null_mask_path):
+                    values[np.load(null_mask_path)] = np.nan
+            columns[column] = values
+        return pd.DataFrame(columns, copy=False)
+
+    def save(self, source_path, name, data: pd.DataFrame):
+        path = self.get_path(source_path, name)
+        if os.path.isdir(path):
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+
+        # Write into a temporary directory and rename it, so that readers never see a half written snapshot
+        temp_path = tempfile.mkdtemp(dir=self.snapshot_dir)
+        columns = list()
+        for column in data.columns:
+            values = data[column]
+            is_str = not (isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufmM')
+            if is_str:
+                # Nulls are stored as '' in the string array, the mask tells them apart from real empty strings
+                null_mask = values.isna().to_numpy()
+                if null_mask.any():
+                    np.save(os.path.join(temp_path, column + '.null.npy'), null_mask)
+                array = values.fillna('').to_numpy().astype(str)
+            else:
+                array = values.to_numpy()
+            np.save(os.path.join(temp_path, column + '.npy'), array)
+            columns.append((column, is_str))
+
+        with open(os.path.join(temp_path, 'meta.json'), 'w') as meta_file:
+            json.dump({'columns': columns}, meta_file)
+
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            shutil.rmtree(temp_path, ignore_errors=True)  # Same snapshot is published by another process
+
+    def get_path(self, source_path, name):
+        return os.path.join(self.snapshot_dir, name + '_' + Snapshot.fingerprint(source_path, name))
+
+    @staticmethod
+    def fingerprint(source_path, name):
+        """
+        Fingerprint of the source file, changes whenever the file is modified.
+        """
+        stat = os.stat(source_path)
+        key = f"{Snapshot.format_version}|{os.path.abspath(source_path)}|{stat.st_size}|{stat.st_mtime_ns}|{name}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
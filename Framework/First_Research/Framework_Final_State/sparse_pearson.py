@@ -0,0 +1,258 @@
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sparse
+
+from .id_mapping import IdMapping
+
+
+class SparsePearson:
+    """
+    User-user pearson correlations computed on the sparse item x user rating matrix.
+
+    For each pair of users only the co-rated items are used, same as DataFrame.corr on the pivot table. Co-rated counts
+    and sums are computed with sparse matrix products and the correlations are evaluated from the raw sums.
+    Pairs with less than min_common_elements co-rated items or without rating variance are NaN.
+    """
+
+    def __init__(self, movie_ratings: pd.DataFrame, min_common_elements):
+        """
+        :param movie_ratings: DataFrame with 'user_id', 'item_id' and 'rating' columns
+        :param min_common_elements: min common elements in between users in order to correlate them
+        """
+        self.min_common_elements = min_common_elements
+        user_ids = movie_ratings['user_id'].to_numpy()
+        item_ids = movie_ratings['item_id'].to_numpy()
+        self.user_mapping = IdMapping(user_ids)
+        self.item_mapping = IdMapping(item_ids)
+
+        rows, cols = self.item_mapping.to_positions(item_ids), self.user_mapping.to_positions(user_ids)
+        values = movie_ratings['rating'].to_numpy(dtype=np.float64)
+        shape = (len(self.item_mapping), len(self.user_mapping))
+        self.ratings = sparse.csc_matrix((values, (rows, cols)), shape=shape)
+        self.squared_ratings = sparse.csc_matrix((values * values, (rows, cols)), shape=shape)
+        self.is_rated = sparse.csc_matrix((np.ones(len(values)), (rows, cols)), shape=shape)
+
+    def get_user_corrs(self) -> pd.DataFrame:
+        """
+        :return: user x user correlation DataFrame, indexed by 'user_id' on both axes
+        """
+        user_ids = pd.Index(self.user_mapping.ids, name='user_id')
+        return pd.DataFrame(self.get_corrs(), index=user_ids, columns=user_ids.copy())
+
+    def get_corrs(self, user_positions=None) -> np.ndarray:
+        """
+        :param user_positions: positions of the users whose correlations are computed, all users if None
+        :return: array with one row per given user and one column per user
+        """
+        n, sum_x, sum_y, sum_xx, sum_yy, sum_xy = self.get_co_rated_sums(user_positions)
+        return SparsePearson.corrs_from_sums(n, sum_x, sum_y, sum_xx, sum_yy, sum_xy, self.min_common_elements)
+
+    def get_co_rated_sums(self, user_positions=None):
+        """
+        :return: co-rated item counts, sums, sums of squares of both users and the sum of products, one row per user
+        """
+        if user_positions is None:
+            ratings, squared_ratings, is_rated = self.ratings, self.squared_ratings, self.is_rated
+        else:
+            ratings = self.ratings[:, user_positions]
+            squared_ratings = self.squared_ratings[:, user_positions]
+            is_rated = self.is_rated[:, user_positions]
+
+        n = (is_rated.T @ self.is_rated).toarray()
+        sum_x = (ratings.T @ self.is_rated).toarray()
+        sum_xx = (squared_ratings.T @ self.is_rated).toarray()
+        sum_xy = (ratings.T @ self.ratings).toarray()
+        if user_positions is None:
+            return n, sum_x, sum_x.T, sum_xx, sum_xx.T, sum_xy
+        sum_y = (is_rated.T @ self.ratings).toarray()
+        sum_yy = (is_rated.T @ self.squared_ratings).toarray()
+        return n, sum_x, sum_y, sum_xx, sum_yy, sum_xy
+
+    @staticmethod
+    def corrs_from_sums(n, sum_x, sum_y, sum_xx, sum_yy, sum_xy, min_common_elements):
+        cov = n * sum_xy - sum_x * sum_y
+        var_x = n * sum_xx - sum_x * sum_x
+        var_y = n * sum_yy - sum_y * sum_y
+        valid = (n >= max(min_common_elements, 1)) & (var_x > 0) & (var_y > 0)
+        corrs = np.full(n.shape, np.nan)
+        corrs[valid] = cov[valid] / np.sqrt(var_x[valid] * var_y[valid])
+        return np.clip(corrs, -1, 1, out=corrs)
+
+
+class TiledCorrs:
+    """
+    Memory bounded creation of user correlations for datasets whose full user x user matrix does not fit in memory.
+
+    Users are processed in tiles of tile_size x n_users correlations, the tile size follows from memory_budget. Each
+    tile is reduced either to the top_k neighbours of its users or to the correlations >= min_corr and written to
+    the result directory, the returned result only memory maps those files.
+    """
+
+    bytes_per_cell = 128  # co-rated sums, sparse products and temporaries held per user pair of a tile
+
+    def __init__(self, result_dir, memory_budget=1 << 30, top_k=None, min_corr=None):
+        """
+        :param result_dir: directory that the results are written under
+        :param memory_budget: approximate upper bound of the memory used by a tile, in bytes
+        :param top_k: keep only the top_k correlations of each user
+        :param min_corr: keep only the correlations >= min_corr, used when top_k is None
+        """
+        if top_k is None and min_corr is None:
+            raise Exception("Either top_k or min_corr has to be given to reduce the correlation tiles!")
+        self.result_dir = result_dir
+        self.memory_budget = memory_budget
+        self.top_k = top_k
+        self.min_corr = min_corr
+
+    def create(self, sparse_pearson: SparsePearson, name):
+        """
+        :param sparse_pearson: correlation engine of the ratings
+        :param name: name of the result, e.g. derived from the time constraint of the ratings
+        :return: TopKUserCorrs or ThresholdedUserCorrs, both support .get(user_id) and .empty like a DataFrame
+        """
+        path = os.path.join(self.result_dir, name)
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'user_ids.npy'), sparse_pearson.user_mapping.ids)
+        if self.top_k is not None:
+            return self._save_top_k(sparse_pearson, path)
+        return self._save_thresholded(sparse_pearson, path)
+
+    def load(self, name):
+        """
+        :return: result of an earlier create with the same name
+        """
+        path = os.path.join(self.result_dir, name)
+        if self.top_k is not None:
+            return TopKUserCorrs(path)
+        return ThresholdedUserCorrs(path)
+
+    def get_tile_size(self, n_users):
+        return int(max(1, min(n_users, self.memory_budget // (TiledCorrs.bytes_per_cell * max(n_users, 1)))))
+
+    def iter_tiles(self, sparse_pearson: SparsePearson):
+        """
+        :return: generator of (user positions, correlations of those users with all users)
+        """
+        n_users = len(sparse_pearson.user_mapping)
+        tile_size = self.get_tile_size(n_users)
+        for start in range(0, n_users, tile_size):
+            user_positions = np.arange(start, min(start + tile_size, n_users))
+            yield user_positions, sparse_pearson.get_corrs(user_positions)
+
+    def _save_top_k(self, sparse_pearson, path):
+        n_users = len(sparse_pearson.user_mapping)
+        k = min(self.top_k, n_users)
+        neighbours = np.lib.format.open_memmap(os.path.join(path, 'neighbours.npy'), mode='w+', dtype=np.int32,
+                                               shape=(n_users, k))
+        corrs = np.lib.format.open_memmap(os.path.join(path, 'corrs.npy'), mode='w+', dtype=np.float64,
+                                          shape=(n_users, k))
+        for user_positions, tile_corrs in self.iter_tiles(sparse_pearson):
+            TiledCorrs.drop_self_corrs(user_positions, tile_corrs)
+            neighbours[user_positions], corrs[user_positions] = TiledCorrs.select_top_k(tile_corrs, k)
+        neighbours.flush()
+        corrs.flush()
+        del neighbours, corrs
+        return TopKUserCorrs(path)
+
+    def _save_thresholded(self, sparse_pearson, path):
+        n_users = len(sparse_pearson.user_mapping)
+        row_ptr = np.zeros(n_users + 1, dtype=np.int64)
+        with open(os.path.join(path, 'neighbours.int32'), 'wb') as neighbours_file, \
+                open(os.path.join(path, 'corrs.float64'), 'wb') as corrs_file:
+            for user_positions, tile_corrs in self.iter_tiles(sparse_pearson):
+                TiledCorrs.drop_self_corrs(user_positions, tile_corrs)
+                rows, neighbours = np.nonzero(tile_corrs >= self.min_corr)  # NaN is never kept
+                neighbours.astype(np.int32).tofile(neighbours_file)
+                tile_corrs[rows, neighbours].tofile(corrs_file)
+                row_ptr[user_positions + 1] = np.bincount(rows, minlength=len(user_positions))
+        np.save(os.path.join(path, 'row_ptr.npy'), np.cumsum(row_ptr))
+        return ThresholdedUserCorrs(path)
+
+    @staticmethod
+    def drop_self_corrs(user_positions, tile_corrs):
+        """
+        Set the correlation of each user of the tile to itself to NaN, so that it never takes a neighbour's place
+        """
+        tile_corrs[np.arange(len(user_positions)), user_positions] = np.nan
+
+    @staticmethod
+    def select_top_k(corrs, k):
+        """
+        :return: top k neighbour positions and correlations of each row in descending order, padded with -1 and NaN
+        """
+        scores = np.where(np.isnan(corrs), -np.inf, corrs)
+        if k < scores.shape[1]:
+            top_k = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top_k = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        top_k_scores = np.take_along_axis(scores, top_k, axis=1)
+        order = np.argsort(-top_k_scores, axis=1, kind='stable')
+        top_k = np.take_along_axis(top_k, order, axis=1)
+        top_k_scores = np.take_along_axis(top_k_scores, order, axis=1)
+        missing = np.isneginf(top_k_scores)
+        top_k[missing] = -1
+        top_k_scores[missing] = np.nan
+        return top_k.astype(np.int32), top_k_scores
+
+    @staticmethod
+    def to_user_corrs(user_id, neighbour_ids, corrs):
+        """
+        :return: Series in the same layout as a column of the full user correlation matrix
+        """
+        return pd.Series(np.array(corrs, dtype=np.float64), index=pd.Index(neighbour_ids, name='user_id'),
+                         name=user_id)
+
+
+class TopKUserCorrs:
+    """
+    Top k correlations of each user, written by TiledCorrs
+    """
+
+    def __init__(self, path):
+        self.user_mapping = IdMapping(np.load(os.path.join(path, 'user_ids.npy')))
+        self.neighbours = np.load(os.path.join(path, 'neighbours.npy'), mmap_mode='r')
+        self.corrs = np.load(os.path.join(path, 'corrs.npy'), mmap_mode='r')
+
+    def get(self, user_id, default=None):
+        u = self.user_mapping.to_position(user_id)
+        if u < 0:
+            return default
+        neighbours = self.neighbours[u]
+        found = neighbours >= 0
+        return TiledCorrs.to_user_corrs(user_id, self.user_mapping.to_ids(neighbours[found]), self.corrs[u][found])
+
+    @property
+    def empty(self):
+        return len(self.user_mapping) == 0
+
+
+class ThresholdedUserCorrs:
+    """
+    Correlations >= min_corr in compressed sparse rows, written by TiledCorrs
+    """
+
+    def __init__(self, path):
+        self.user_mapping = IdMapping(np.load(os.path.join(path, 'user_ids.npy')))
+        self.row_ptr = np.load(os.path.join(path, 'row_ptr.npy'))
+        self.neighbours = ThresholdedUserCorrs._map(os.path.join(path, 'neighbours.int32'), np.int32)
+        self.corrs = ThresholdedUserCorrs._map(os.path.join(path, 'corrs.float64'), np.float64)
+
+    def get(self, user_id, default=None):
+        u = self.user_mapping.to_position(user_id)
+        if u < 0:
+            return default
+        start, end = self.row_ptr[u], self.row_ptr[u + 1]
+        return TiledCorrs.to_user_corrs(user_id, self.user_mapping.to_ids(self.neighbours[start:end]),
+                                        self.corrs[start:end])
+
+    @property
+    def empty(self):
+        return len(self.user_mapping) == 0
+
+    @staticmethod
+    def _map(path, dtype):
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
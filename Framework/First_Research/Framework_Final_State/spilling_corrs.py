@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+from .corrs_cache import LRUCorrsCache
+
+
+class CorrsSpillBudget:
+    """
+    Memory budget shared by SpillingCorrs mappings.
+
+    User correlation DataFrames stored in the mappings are counted against memory_budget. When the budget is exceeded
+    the least recently used ones are written to the spill directory and replaced by DataFrames memory mapped from
+    there, which are no longer counted. Spill files are removed on clear and when the budget is garbage collected.
+    """
+
+    def __init__(self, memory_budget, spill_dir=None):
+        """
+        :param memory_budget: upper bound of the in memory user correlations, in bytes
+        :param spill_dir: directory of the spill files, a temporary directory if None
+        """
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.given_spill_dir = spill_dir
+        self.in_memory = OrderedDict()  # (id of the mapping, key) -> (mapping, key, size)
+        self.size = 0
+        self.n_spilled = 0
+        self.spill_files = []
+        self._finalizer = weakref.finalize(self, CorrsSpillBudget._remove_files, self.spill_files)
+
+    def add(self, mapping, key, value):
+        self.remove(mapping, key)
+        if not isinstance(value, pd.DataFrame):
+            return
+        size = LRUCorrsCache.get_size(value)
+        self.in_memory[(id(mapping), key)] = (mapping, key, size)
+        self.size += size
+        while self.size > self.memory_budget and self.in_memory:
+            _, (cold_mapping, cold_key, cold_size) = self.in_memory.popitem(last=False)
+            self.size -= cold_size
+            cold_mapping.entries[cold_key] = self.spill(cold_mapping.entries[cold_key])
+
+    def touch(self, mapping, key):
+        if (id(mapping), key) in self.in_memory:
+            self.in_memory.move_to_end((id(mapping), key))
+
+    def remove(self, mapping, key):
+        entry = self.in_memory.pop((id(mapping), key), None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def spill(self, user_corrs: pd.DataFrame) -> pd.DataFrame:
+        """
+        :return: user correlations memory mapped from their spill file
+        """
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='ptmrecs_spill_')
+            self.spill_files.append(self.spill_dir)
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"corrs_{self.n_spilled}.npy")
+        self.n_spilled += 1
+        np.save(path, user_corrs.to_numpy(dtype=np.float64))
+        self.spill_files.append(path)
+        corrs = np.load(path, mmap_mode='r')
+        return pd.DataFrame(corrs, index=user_corrs.index.copy(), columns=user_corrs.columns.copy(), copy=False)
+
+    def clear(self):
+        self.in_memory.clear()
+        self.size = 0
+        CorrsSpillBudget._remove_files(self.spill_files)
+        self.spill_dir = self.given_spill_dir
+
+    @staticmethod
+    def _remove_files(spill_files):
+        for path in reversed(spill_files):
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+        spill_files.clear()
+
+
+class SpillingCorrs(MutableMapping):
+    """
+    Dict of user correlations whose DataFrames are spilled to disk when their CorrsSpillBudget is exceeded.
+    Spilled entries are returned as memory mapped DataFrames, values which are not DataFrames are kept as they are.
+    """
+
+    def __init__(self, budget: CorrsSpillBudget):
+        self.budget = budget
+        self.entries = dict()
+
+    def __getitem__(self, key):
+        value = self.entries[key]
+        self.budget.touch(self, key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.entries[key] = value
+        self.budget.add(self, key, value)
+
+    def __delitem__(self, key):
+        del self.entries[key]
+        self.budget.remove(self, key)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sparse
+
+from .id_mapping import IdMapping
+from .sparse_pearson import SparsePearson
+
+
+class TimeBinPearson:
+    """
+    Store of per year pair statistics, answering the user correlations of any [start_year, end_year) time bin.
+
+    Two ratings of the same item only count for a time bin when both of them are inside the bin. The store therefore
+    keeps the pair sums of every (year of user rating, year of other user rating) block once, and the sums of a bin
+    are the sum of the blocks whose both years are inside it. Blocks are sparse and computed in a single pass over
+    the ratings, so no time bin configuration ever goes back to the ratings again.
+    """
+
+    def __init__(self, movie_ratings: pd.DataFrame, min_common_elements):
+        """
+        :param movie_ratings: DataFrame with 'user_id', 'item_id', 'rating' and 'timestamp' columns
+        :param min_common_elements: min common elements in between users in order to correlate them
+        """
+        self.min_common_elements = min_common_elements
+        user_ids = movie_ratings['user_id'].to_numpy()
+        item_ids = movie_ratings['item_id'].to_numpy()
+        self.user_mapping = IdMapping(user_ids)
+        self.item_mapping = IdMapping(item_ids)
+        n_users = len(self.user_mapping)
+        shape = (len(self.item_mapping), n_users)
+
+        cols, rows = self.user_mapping.to_positions(user_ids), self.item_mapping.to_positions(item_ids)
+        values = movie_ratings['rating'].to_numpy(dtype=np.float64)
+        years = movie_ratings['timestamp'].dt.year.to_numpy()
+        self.years = np.unique(years)
+
+        # Ratings of each year
+        yearly = dict()
+        self.has_ratings = dict()
+        for year in self.years:
+            in_year = years == year
+            year_rows, year_cols, year_values = rows[in_year], cols[in_year], values[in_year]
+            yearly[year] = (sparse.csc_matrix((year_values, (year_rows, year_cols)), shape=shape),
+                            sparse.csc_matrix((year_values * year_values, (year_rows, year_cols)), shape=shape),
+                            sparse.csc_matrix((np.ones(len(year_values)), (year_rows, year_cols)), shape=shape))
+            self.has_ratings[year] = np.bincount(year_cols, minlength=n_users) > 0
+
+        # (year of the user's ratings, year of the other user's ratings) -> (n, sum_x, sum_xx, sum_xy)
+        self.blocks = dict()
+        for year_x in self.years:
+            ratings_x, squared_ratings_x, is_rated_x = yearly[year_x]
+            for year_y in self.years:
+                ratings_y, _, is_rated_y = yearly[year_y]
+                n = is_rated_x.T @ is_rated_y
+                if n.nnz == 0:
+                    continue
+                self.blocks[(year_x, year_y)] = tuple(block.tocoo() for block in (
+                    n, ratings_x.T @ is_rated_y, squared_ratings_x.T @ is_rated_y, ratings_x.T @ ratings_y))
+
+    def get_user_corrs(self, start_year, end_year) -> pd.DataFrame:
+        """
+        :return: correlations of the ratings in [start_year, end_year), indexed by the 'user_id's rated in the bin
+        """
+        n_users = len(self.user_mapping)
+        has_ratings = np.zeros(n_users, dtype=bool)
+        bin_years = self.years[(self.years >= start_year) & (self.years < end_year)]
+        bin_blocks = []
+        for year_x in bin_years:
+            has_ratings |= self.has_ratings[year_x]
+            bin_blocks.extend(self.blocks[(year_x, year_y)] for year_y in bin_years if (year_x, year_y) in self.blocks)
+
+        # Only the users rated in the bin have co-rated pairs in its blocks
+        users = np.flatnonzero(has_ratings)
+        positions = np.full(n_users, -1)
+        positions[users] = np.arange(len(users))
+        n, sum_x, sum_xx, sum_xy = (np.zeros((len(users), len(users))) for _ in range(4))
+        for block in bin_blocks:
+            for total, block_sum in zip((n, sum_x, sum_xx, sum_xy), block):
+                total[positions[block_sum.row], positions[block_sum.col]] += block_sum.data  # coo pairs are unique
+        corrs = SparsePearson.corrs_from_sums(n, sum_x, sum_x.T, sum_xx, sum_xx.T, sum_xy, self.min_common_elements)
+        user_ids = pd.Index(self.user_mapping.to_ids(users), name='user_id')
+        return pd.DataFrame(corrs, index=user_ids, columns=user_ids.copy())
@@ -1,9 +1,11 @@
 from .constraints import TimeConstraint
 from .similarity import TemporalPearson
 from .cache import TemporalCache, Cache
+from .neighbours import NeighbourIndex
 from datetime import datetime
 import pandas as pd
 import random
+import weakref
 
 
 class TrainsetUser:
@@ -21,19 +23,9 @@ class TrainsetUser:
         """
         Get list of unique 'user_id's
 
-        Since MovieLens Have 'user_id's from 0 to 610 without any missing user, for now sending that directly
-        Uncomment the other lines later
-
-        :return: the ids of the users found in movie_ratings
+        :return: the sorted ids of the users found in ratings (or movie_ratings)
         """
-        #
-        # if self.cache.is_ratings_cached:
-        #     data = self.cache.ratings
-        # else:
-        #     data = self.cache.movie_ratings
-        #
-        # return pd.unique(data['user_id'])
-        return range(0, 611)
+        return self.cache.user_mapping.ids
 
     def get_active_users(self, n=10) -> pd.DataFrame:
         """
@@ -71,18 +63,13 @@ class TrainsetUser:
         :param user_id: id of the chosen user
         :return: Ratings given by the 'user_id'
         """
-        if self.cache.is_ratings_cached:                         # 2.2x faster than other choice
-            data = self.cache.ratings
-        else:
-            data = self.cache.movie_ratings
-
-        return data.loc[data['user_id'] == user_id]
+        return self.cache.get_rating_data().iloc[self.cache.rating_index.get_user_rows(user_id)]
 
     def get_user_avg(self, user_id: int):
 
         if self.cache.use_avg_ratings_cache:
-            avg_user_rating = self.cache.avg_user_ratings.loc[user_id]
-            return avg_user_rating[0] if not avg_user_rating.empty else 0
+            user_position = self.cache.user_mapping.to_position(user_id)
+            return self.cache.avg_user_rating_array[user_position] if user_position >= 0 else 0
 
         user_ratings = self.get_user_ratings(user_id=user_id)
         return user_ratings.rating.mean() if not user_ratings.empty else 0
@@ -96,13 +83,8 @@ class TrainsetUser:
         :return: if found the datetime object otherwise None
         """
 
-        if self.cache.is_ratings_cached:
-            data = self.cache.ratings
-        else:
-            data = self.cache.movie_ratings
-
-        timestamp = data.loc[(data['user_id'] == user_id) & (data['item_id'] == movie_id)]
-        return timestamp.values[0, 3] if not timestamp.empty else None
+        row = self.cache.rating_index.get_rating_row(user_id, movie_id)
+        return self.cache.get_rating_data()['timestamp'].iloc[row] if row >= 0 else None
 
     def get_first_timestamp(self):
         if self.cache.is_ratings_cached:
@@ -211,13 +193,7 @@ class TrainsetMovie:
         :return: Rating given by user. If not found, returns 0
         """
 
-        if self.cache.is_ratings_cached:
-            data = self.cache.ratings
-        else:
-            data = self.cache.movie_ratings
-
-        movie_rating = data.loc[(data['user_id'] == user_id) & (data['item_id'] == movie_id)]
-        return movie_rating.values[0, 2] if not movie_rating.empty else 0
+        return self.cache.rating_index.get_rating(user_id, movie_id)
 
     def get_random_movie_watched(self, user_id: int) -> int:
         """
@@ -264,6 +240,7 @@ class Trainset:
         self.cache = cache
         self.min_common_elements = min_common_elements
         self.similarity = TemporalPearson(time_constraint=None, cache=self.cache)
+        self.neighbour_indexes = dict()  # id of the user correlation matrix -> NeighbourIndex
 
         if not self.cache.is_movie_ratings_cached:
             raise Exception("'movie_ratings' has not been cached !")
@@ -330,7 +307,11 @@ class Trainset:
         if user_corr_matrix is None:
             return None
 
-        # Get the chosen 'user_id's correlations
+        # Full correlation matrices are answered from their top k neighbour index
+        if isinstance(user_corr_matrix, pd.DataFrame):
+            return self.get_neighbour_index(user_corr_matrix, k).get_k_neighbours(user_id, k)
+
+        # Tiled correlations, get the chosen 'user_id's correlations
         user_correlations = user_corr_matrix.get(user_id)
         if user_correlations is None:
             return None
@@ -346,6 +327,23 @@ class Trainset:
         #     so that first one is the most similar, last one least similar
         users_alike.sort_values(by='correlation', ascending=False, inplace=True)
 
-        # Eliminate Correlation to itself by deleting first row,
-        #     since biggest corr is with itself it is in first row
-        return users_alike.iloc[1:k+1]
+        # Tiled correlations never hold the correlation to itself,
+        #     only results written before that was dropped still have it
+        return users_alike.drop(index=user_id, errors='ignore').iloc[:k]
+
+    def get_neighbour_index(self, user_corr_matrix: pd.DataFrame, k):
+        """
+        Get the neighbour index of the correlation matrix, the index is created once for each matrix and k.
+
+        :param user_corr_matrix: user x user correlation DataFrame
+        :param k: min number of neighbours the index has to have
+        :return: NeighbourIndex
+        """
+        neighbour_index = self.neighbour_indexes.get(id(user_corr_matrix))
+        if neighbour_index is None or neighbour_index.k < k:
+            if id(user_corr_matrix) not in self.neighbour_indexes:
+                # Drop the index together with the matrix, so that ids reused by new matrices never match it
+                weakref.finalize(user_corr_matrix, self.neighbour_indexes.pop, id(user_corr_matrix), None)
+            neighbour_index = NeighbourIndex.from_user_corrs(user_corr_matrix, k)
+            self.neighbour_indexes[id(user_corr_matrix)] = neighbour_index
+        return neighbour_index
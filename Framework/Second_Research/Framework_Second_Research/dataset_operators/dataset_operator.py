@@ -1,6 +1,7 @@
 from internal.platform.constraints.time_constraint import TimeConstraint
 import pandas as pd
 from internal.platform.constraints.interval import Interval
+from internal.platform.datasets.compact_ratings import CompactRatings
 
 
 class DatasetOperator:
@@ -18,9 +19,13 @@ class DatasetOperator:
   @staticmethod
   def __apply_max_limit_time_constraint(data: pd.DataFrame, interval: Interval):
     _, end_dt = interval.get_interval()
+    if isinstance(data, CompactRatings):
+      return data.get_ratings_between(end_dt=end_dt)
     return data.loc[data.timestamp < end_dt]
 
   @staticmethod
   def __apply_timebin_time_constraint(data: pd.DataFrame, interval: Interval):
     start_dt, end_dt = interval.get_interval()
+    if isinstance(data, CompactRatings):
+      return data.get_ratings_between(start_dt, end_dt)
     return data.loc[(data.timestamp >= start_dt) & (data.timestamp < end_dt)]
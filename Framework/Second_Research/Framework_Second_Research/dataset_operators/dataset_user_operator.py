@@ -1,16 +1,26 @@
 import pandas as pd
 from internal.platform.dataset_operators.dataset_operator import DatasetOperator
 from internal.platform.constraints.interval import *
+from internal.platform.dataset_operators.rating_index import RatingIndex
+from internal.platform.datasets.compact_ratings import CompactRatings
 import numpy as np
 import random
 
 
 class DatasetUserOperator:
 
-  def __init__(self, ratings: pd.DataFrame):
+  def __init__(self, ratings, rating_index: RatingIndex = None):
     self.__ratings = ratings
+    self.__rating_index = rating_index
+
+  def get_rating_index(self) -> RatingIndex:
+    if self.__rating_index is None:
+      self.__rating_index = RatingIndex.from_ratings(self.__ratings)
+    return self.__rating_index
 
   def get_all_users(self) -> np.ndarray:
+    if isinstance(self.__ratings, CompactRatings):
+      return pd.unique(self.__ratings.user_ids)
     return pd.unique(self.__ratings['user_id'])
 
   def get_top_n_raters(self, n) -> pd.DataFrame:
@@ -30,7 +40,7 @@ class DatasetUserOperator:
   def get_user_rating_history(self, user_id: int) -> pd.DataFrame:
     if not DatasetUserOperator.__is_valid_user_id(user_id):
       return pd.DataFrame()
-    return self.__ratings.loc[self.__ratings['user_id'] == user_id]
+    return self.__take_rows(self.get_rating_index().get_user_rows(user_id))
 
   def get_user_avg(self, user_id: int) -> int:
     user_ratings = self.get_user_rating_history(user_id)
@@ -45,8 +55,9 @@ class DatasetUserOperator:
       return pd.Series(dtype=object)
 
   def get_user_rating_value(self, user_id:int, movie_id:int):
-    history = self.get_user_rating_record(user_id, movie_id)
-    return history.values[0, 2] if not history.empty else 0
+    if not DatasetUserOperator.__is_positive_number(movie_id) or not DatasetUserOperator.__is_valid_user_id(user_id):
+      return 0
+    return self.get_rating_index().get_rating(user_id, movie_id)
 
   def get_rating_timestamp(self, user_id: int, movie_id: int):
     user_rating = self.get_user_rating_record(user_id, movie_id)
@@ -60,7 +71,7 @@ class DatasetUserOperator:
 
   def get_user_ratings_at_interval(self, user_id: int, at: Interval) -> pd.DataFrame:
     ratings = DatasetOperator.apply_time_constraint(self.__ratings, at)
-    return ratings.loc[(ratings['user_id'] == user_id)]
+    return DatasetUserOperator.__select_user_ratings(ratings, user_id)
 
   def get_user_avg_at_interval(self, user_id: int, at: Interval):
     user_ratings = self.get_user_ratings_at_interval(user_id, at)
@@ -98,11 +109,27 @@ class DatasetUserOperator:
     active_users.sort_values(by=['count'], ascending=False, inplace=True)
 
   def __get_user_ratings_counts(self):
-    return pd.DataFrame(self.__ratings.groupby('user_id')['rating'].count())
+    return pd.DataFrame(self.__get_user_id_and_rating_columns().groupby('user_id')['rating'].count())
 
   def __get_user_mean_ratings(self):
-    return pd.DataFrame(self.__ratings.groupby('user_id')['rating'].mean())
+    return pd.DataFrame(self.__get_user_id_and_rating_columns().groupby('user_id')['rating'].mean())
+
+  def __get_user_id_and_rating_columns(self):
+    if isinstance(self.__ratings, CompactRatings):
+      return pd.DataFrame({'user_id': self.__ratings.user_ids, 'rating': self.__ratings.get_ratings()})
+    return self.__ratings
+
+  @staticmethod
+  def __select_user_ratings(ratings, user_id) -> pd.DataFrame:
+    if isinstance(ratings, CompactRatings):
+      return ratings.get_user_ratings(user_id)
+    return ratings.loc[ratings['user_id'] == user_id]
+
+  def __take_rows(self, rows) -> pd.DataFrame:
+    if isinstance(self.__ratings, CompactRatings):
+      return self.__ratings.take(rows).to_ratings()
+    return self.__ratings.iloc[rows]
 
   def __get_target_user_movie_rating(self, user_id, movie_id):
-    history = self.get_user_rating_history(user_id).reset_index()
-    return history.loc[history['item_id'] == movie_id]
+    row = self.get_rating_index().get_rating_row(user_id, movie_id)
+    return self.__take_rows(np.array([row] if row >= 0 else [], dtype=np.int64)).reset_index()
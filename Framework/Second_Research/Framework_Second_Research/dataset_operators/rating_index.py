@@ -0,0 +1,123 @@
+import numpy as np
+
+from internal.platform.datasets.compact_ratings import CompactRatings
+from internal.platform.datasets.id_mapping import IdMapping
+
+
+class RatingIndex:
+  """
+  User-major (CSR) and item-major (CSC) compressed layouts over a ratings table.
+
+  Rows are positions in the ratings table the index is built from. User slices keep the table order, so a user's
+  history comes out in the same (timestamp) order as a boolean mask over the table would return it. Items are also
+  kept sorted within each user, and users within each item, for O(log d) (user, item) lookups.
+  """
+
+  def __init__(self, user_ids: np.ndarray, item_ids: np.ndarray, ratings: np.ndarray):
+    self.__user_mapping = IdMapping(user_ids)
+    self.__item_mapping = IdMapping(item_ids)
+    self.__users = self.__user_mapping.get_ids()
+    user_positions = self.__user_mapping.get_positions(user_ids)
+    item_positions = self.__item_mapping.get_positions(item_ids)
+
+    self.__user_pointers = RatingIndex.__get_pointers(user_positions, len(self.__users))
+    self.__user_rows = np.argsort(user_positions, kind='stable')
+    user_item_order = np.lexsort((item_positions, user_positions))
+    self.__user_sorted_item_positions = item_positions[user_item_order]
+    self.__user_sorted_rows = user_item_order
+    self.__user_sorted_ratings = ratings[user_item_order]
+
+    self.__item_pointers = RatingIndex.__get_pointers(item_positions, len(self.__item_mapping))
+    item_user_order = np.lexsort((user_positions, item_positions))
+    self.__item_sorted_user_positions = user_positions[item_user_order]
+    self.__item_sorted_rows = item_user_order
+
+  @staticmethod
+  def from_ratings(ratings):
+    if isinstance(ratings, CompactRatings):
+      return RatingIndex(ratings.user_ids, ratings.item_ids, ratings.get_ratings())
+    item_ids = ratings['item_id'] if 'item_id' in ratings.columns else ratings.index
+    return RatingIndex(ratings['user_id'].to_numpy(), np.asarray(item_ids), ratings['rating'].to_numpy())
+
+  def get_user_mapping(self) -> IdMapping:
+    return self.__user_mapping
+
+  def get_item_mapping(self) -> IdMapping:
+    return self.__item_mapping
+
+  def get_users(self) -> np.ndarray:
+    return self.__users
+
+  def get_items(self) -> np.ndarray:
+    return self.__item_mapping.get_ids()
+
+  def get_user_position_rows(self, user_position: int) -> np.ndarray:
+    return self.__user_rows[self.__user_pointers[user_position]:self.__user_pointers[user_position + 1]]
+
+  def get_item_position_rows(self, item_position: int) -> np.ndarray:
+    return self.__item_sorted_rows[self.__item_pointers[item_position]:self.__item_pointers[item_position + 1]]
+
+  def get_user_rows(self, user_id: int) -> np.ndarray:
+    user_position = self.__user_mapping.get_position(user_id)
+    if user_position < 0:
+      return np.zeros(0, dtype=np.int64)
+    return self.get_user_position_rows(user_position)
+
+  def get_item_rows(self, item_id: int) -> np.ndarray:
+    item_position = self.__item_mapping.get_position(item_id)
+    if item_position < 0:
+      return np.zeros(0, dtype=np.int64)
+    return self.get_item_position_rows(item_position)
+
+  def get_item_raters(self, item_id: int) -> np.ndarray:
+    item_position = self.__item_mapping.get_position(item_id)
+    if item_position < 0:
+      return np.zeros(0, dtype=self.__users.dtype)
+    start, end = self.__item_pointers[item_position], self.__item_pointers[item_position + 1]
+    return self.__users[self.__item_sorted_user_positions[start:end]]
+
+  def get_user_item_positions_and_ratings(self, user_id: int):
+    """ Sorted item positions of the user's ratings and the ratings in the same order """
+    user_position = self.__user_mapping.get_position(user_id)
+    if user_position < 0:
+      return np.zeros(0, dtype=np.int64), self.__user_sorted_ratings[:0]
+    start, end = self.__user_pointers[user_position], self.__user_pointers[user_position + 1]
+    return self.__user_sorted_item_positions[start:end], self.__user_sorted_ratings[start:end]
+
+  def get_users_item_positions_and_ratings(self, user_ids):
+    """ Ratings of many users at once as (index of the user in user_ids, item position, rating) arrays """
+    user_positions = self.__user_mapping.get_positions(user_ids)
+    is_found = user_positions >= 0
+    starts = np.where(is_found, self.__user_pointers[np.maximum(user_positions, 0)], 0)
+    counts = np.where(is_found, self.__user_pointers[np.maximum(user_positions, 0) + 1] - starts, 0)
+    users = np.repeat(np.arange(len(user_positions)), counts)
+    positions = np.arange(counts.sum()) + np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return users, self.__user_sorted_item_positions[positions], self.__user_sorted_ratings[positions]
+
+  def get_user_rating_count(self, user_id: int) -> int:
+    return len(self.get_user_rows(user_id))
+
+  def get_rating_row(self, user_id: int, item_id: int) -> int:
+    position = self.__find_user_item_position(user_id, item_id)
+    return self.__user_sorted_rows[position] if position >= 0 else -1
+
+  def get_rating(self, user_id: int, item_id: int):
+    position = self.__find_user_item_position(user_id, item_id)
+    return self.__user_sorted_ratings[position] if position >= 0 else 0
+
+  def __find_user_item_position(self, user_id, item_id) -> int:
+    user_position = self.__user_mapping.get_position(user_id)
+    item_position = self.__item_mapping.get_position(item_id)
+    if user_position < 0 or item_position < 0:
+      return -1
+    start, end = self.__user_pointers[user_position], self.__user_pointers[user_position + 1]
+    position = start + np.searchsorted(self.__user_sorted_item_positions[start:end], item_position)
+    if position < end and self.__user_sorted_item_positions[position] == item_position:
+      return position
+    return -1
+
+  @staticmethod
+  def __get_pointers(positions, n):
+    pointers = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(positions, minlength=n), out=pointers[1:])
+    return pointers
@@ -0,0 +1,58 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.dataset_operators.dataset_user_operator import DatasetUserOperator
+from internal.platform.dataset_operators.rating_index import RatingIndex
+from internal.platform.datasets.compact_ratings import CompactRatings
+
+
+class TestRatingIndex(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestRatingIndex, self).__init__(*args, **kwargs)
+    self.ratings = pd.DataFrame({
+      'item_id': [30, 10, 20, 10, 30, 20, 40],
+      'user_id': [1, 1, 2, 2, 3, 1, 3],
+      'rating': [1.0, 4.5, 3.0, 5.0, 2.5, 3.5, 4.0],
+      'timestamp': pd.to_datetime([datetime(2001 + year, 1, 1) for year in range(7)]).astype('datetime64[s]')
+    }).set_index('item_id')
+    self.rating_index = RatingIndex.from_ratings(self.ratings)
+
+  def test_user_rows_keep_table_order(self):
+    self.assertEqual(self.rating_index.get_user_rows(1).tolist(), [0, 1, 5])
+    self.assertEqual(self.rating_index.get_user_rows(3).tolist(), [4, 6])
+    self.assertEqual(len(self.rating_index.get_user_rows(99)), 0)
+
+  def test_item_raters(self):
+    self.assertEqual(self.rating_index.get_item_raters(10).tolist(), [1, 2])
+    self.assertEqual(self.rating_index.get_item_rows(30).tolist(), [0, 4])
+    self.assertEqual(len(self.rating_index.get_item_raters(99)), 0)
+
+  def test_rating_lookup(self):
+    self.assertEqual(self.rating_index.get_rating(1, 20), 3.5)
+    self.assertEqual(self.rating_index.get_rating(3, 40), 4.0)
+    self.assertEqual(self.rating_index.get_rating(2, 30), 0)
+    self.assertEqual(self.rating_index.get_rating(99, 30), 0)
+    self.assertEqual(self.rating_index.get_rating_row(2, 10), 3)
+    self.assertEqual(self.rating_index.get_rating_row(2, 40), -1)
+
+  def test_user_operator_matches_boolean_mask(self):
+    user_operator = DatasetUserOperator(self.ratings, self.rating_index)
+    for user_id in [1, 2, 3]:
+      expected = self.ratings.loc[self.ratings['user_id'] == user_id]
+      self.assertTrue(user_operator.get_user_rating_history(user_id).equals(expected))
+    self.assertEqual(user_operator.get_user_rating_value(2, 10), 5.0)
+    self.assertEqual(user_operator.get_user_rating_record(1, 30)['rating'].tolist(), [1.0])
+    self.assertTrue(user_operator.get_user_rating_record(2, 30).empty)
+
+  def test_compact_ratings(self):
+    compact_ratings = CompactRatings.from_ratings(self.ratings, (0.5, 5, 0.5))
+    rating_index = RatingIndex.from_ratings(compact_ratings)
+    self.assertEqual(rating_index.get_rating(1, 10), 4.5)
+    self.assertTrue(np.array_equal(rating_index.get_user_rows(1), self.rating_index.get_user_rows(1)))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.dataset_operators.dataset_user_operator import DatasetUserOperator
+from internal.platform.similarity.timebin_similarity.timebin import Timebin
+from internal.platform.dataset_operators.user_histories import UserHistories
+
+
+class TestUserHistories(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestUserHistories, self).__init__(*args, **kwargs)
+    random = np.random.default_rng(13)
+    user_item_pairs = pd.DataFrame({'user_id': random.integers(1, 20, 800), 'item_id': random.integers(1, 90, 800)})
+    self.ratings = user_item_pairs.drop_duplicates().reset_index(drop=True)
+    self.ratings['rating'] = random.integers(1, 11, len(self.ratings)) / 2
+    self.ratings['timestamp'] = pd.to_datetime(random.integers(1000000000, 1500000000, len(self.ratings)), unit='s')
+    self.ratings = self.ratings.sort_values('timestamp').set_index('item_id')
+    self.user_histories = UserHistories(self.ratings)
+    self.dataset_user_operator = DatasetUserOperator(self.ratings)
+
+  def test_same_as_user_rating_history(self):
+    for user_id in [1, 7, 19]:
+      user_history = self.dataset_user_operator.get_user_rating_history(user_id)
+      self.assertEqual(self.user_histories.get_history_length(user_id), len(user_history))
+      item_ids, ratings = self.user_histories.get_window(user_id, 3, 10)
+      self.assertTrue(np.array_equal(item_ids, user_history.index.to_numpy()[3:13]))
+      self.assertTrue(np.array_equal(ratings, user_history['rating'].to_numpy()[3:13]))
+      self.assertAlmostEqual(self.user_histories.get_user_avg(user_id), user_history['rating'].mean())
+    self.assertEqual(len(self.user_histories.get_window(1000, 0, 5)[0]), 0)
+
+  def test_windows_with_item(self):
+    item_ids, _ = self.user_histories.get_window(7, 0, self.user_histories.get_history_length(7))
+    for position in [0, 11, len(item_ids) - 1]:
+      self.assertEqual(self.user_histories.find_item_position(7, item_ids[position]), position)
+      for user_id, start, size in self.user_histories.get_windows_with_item(7, item_ids[position], [5, 10, 15]):
+        self.assertEqual(start % size, 0)
+        self.assertIn(item_ids[position], self.user_histories.get_window(user_id, start, size)[0])
+    self.assertEqual(self.user_histories.find_item_position(7, 1000), -1)
+    self.assertEqual(self.user_histories.get_windows_with_item(7, 1000, [5]), [])
+
+  def test_windows(self):
+    user_ids, starts, sizes = np.array([1, 7, 19, 1000, 7]), np.array([0, 5, 30, 0, 200]), np.array([10, 5, 15, 5, 5])
+    windows, item_ids, ratings = self.user_histories.get_windows(user_ids, starts, sizes)
+    for window, (user_id, start, size) in enumerate(zip(user_ids, starts, sizes)):
+      expected_item_ids, expected_ratings = self.user_histories.get_window(user_id, start, size)
+      self.assertTrue(np.array_equal(item_ids[windows == window], expected_item_ids))
+      self.assertTrue(np.array_equal(ratings[windows == window], expected_ratings))
+    self.assertTrue(np.allclose(self.user_histories.get_user_avgs(user_ids),
+                                [self.user_histories.get_user_avg(user_id) for user_id in user_ids]))
+
+  def test_find_item_positions(self):
+    user_ids = np.array([1, 7, 19, 19, 1000])
+    item_ids = np.array([3, self.user_histories.get_window(7, 5, 1)[0][0], 8, 1000, 3])
+    expected = list()
+    for user_id, item_id in zip(user_ids, item_ids):
+      user_history = self.dataset_user_operator.get_user_rating_history(user_id)
+      expected.append(Timebin.find_movie_index_in_user_history(user_history, item_id))
+      self.assertEqual(user_history.index.name, 'item_id')
+    self.assertEqual(self.user_histories.find_item_positions(user_ids, item_ids).tolist(), expected)
+
+
+if __name__ == '__main__':
+  unittest.main()
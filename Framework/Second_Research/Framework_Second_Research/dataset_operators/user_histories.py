@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from internal.platform.dataset_operators.rating_index import RatingIndex
+from internal.platform.datasets.compact_ratings import CompactRatings
+
+
+class UserHistories:
+  """
+  Time ordered rating histories of all users, as flat item id and rating arrays with a pointer per user.
+
+  Histories keep the (timestamp) order of the ratings table, like DatasetUserOperator.get_user_rating_history. A
+  timebin is a (user, start, size) window of a history, so it is a slice of these arrays, and the window of a given
+  size that contains a movie follows from the position of the movie in the history. Positions are looked up in a
+  hash index of (user, item) keys, built once, so finding a movie in a history never scans it.
+  """
+
+  def __init__(self, ratings, rating_index: RatingIndex = None):
+    if isinstance(ratings, CompactRatings):
+      user_ids, item_ids, rating_values = ratings.user_ids, ratings.item_ids, ratings.get_ratings()
+    else:
+      item_ids = ratings['item_id'] if 'item_id' in ratings.columns else ratings.index
+      user_ids, item_ids, rating_values = ratings['user_id'].to_numpy(), np.asarray(item_ids), ratings['rating']
+    if rating_index is None:
+      rating_index = RatingIndex.from_ratings(ratings)
+    self.__user_mapping = rating_index.get_user_mapping()
+    user_positions = self.__user_mapping.get_positions(user_ids)
+    n_ratings = np.bincount(user_positions, minlength=len(self.__user_mapping))
+    self.__pointers = np.zeros(len(self.__user_mapping) + 1, dtype=np.int64)
+    np.cumsum(n_ratings, out=self.__pointers[1:])
+    history_order = np.argsort(user_positions, kind='stable')
+    history_user_positions = user_positions[history_order]
+    self.__item_ids = np.asarray(item_ids)[history_order]
+    self.__ratings = np.asarray(rating_values, dtype=np.float64)[history_order]
+    self.__avg_ratings = np.bincount(history_user_positions, weights=self.__ratings,
+                                     minlength=len(self.__user_mapping)) / np.maximum(n_ratings, 1)
+    self.__item_mapping = rating_index.get_item_mapping()
+    keys = UserHistories.__get_keys(history_user_positions, self.__item_mapping.get_positions(self.__item_ids),
+                                    len(self.__item_mapping))
+    # First rating of an item in a history wins, like a search from the beginning of the history
+    keys, history_indices = np.unique(keys, return_index=True)
+    self.__history_index = pd.Index(keys)
+    self.__history_positions = history_indices - self.__pointers[history_user_positions[history_indices]]
+
+  def get_history_length(self, user_id: int) -> int:
+    user_position = self.__user_mapping.get_position(user_id)
+    if user_position < 0:
+      return 0
+    return int(self.__pointers[user_position + 1] - self.__pointers[user_position])
+
+  def get_window(self, user_id: int, start: int, size: int):
+    """ (item ids, ratings) of the timebin of the user, like iloc[start:start + size] of the history """
+    user_position = self.__user_mapping.get_position(user_id)
+    if user_position < 0:
+      return self.__item_ids[:0], self.__ratings[:0]
+    history_start, history_end = self.__pointers[user_position], self.__pointers[user_position + 1]
+    window = slice(history_start + min(max(start, 0), history_end - history_start),
+                   history_start + min(max(start + size, 0), history_end - history_start))
+    return self.__item_ids[window], self.__ratings[window]
+
+  def get_windows(self, user_ids, starts, sizes):
+    """ Ratings of many (user, start, size) windows at once as (index of the window, item id, rating) arrays """
+    user_positions = self.__user_mapping.get_positions(np.asarray(user_ids))
+    is_found = user_positions >= 0
+    history_starts = np.where(is_found, self.__pointers[np.maximum(user_positions, 0)], 0)
+    history_lengths = np.where(is_found, self.__pointers[np.maximum(user_positions, 0) + 1] - history_starts, 0)
+    window_starts = np.clip(starts, 0, history_lengths)
+    window_ends = np.clip(np.asarray(starts) + sizes, window_starts, history_lengths)
+    counts = window_ends - window_starts
+    windows = np.repeat(np.arange(len(counts)), counts)
+    offsets = history_starts + window_starts - (np.cumsum(counts) - counts)
+    positions = np.arange(counts.sum()) + np.repeat(offsets, counts)
+    return windows, self.__item_ids[positions], self.__ratings[positions]
+
+  def get_user_avgs(self, user_ids) -> np.ndarray:
+    user_positions = self.__user_mapping.get_positions(np.asarray(user_ids))
+    return np.where(user_positions >= 0, self.__avg_ratings[user_positions], 0)
+
+  def get_user_avg(self, user_id: int) -> float:
+    user_position = self.__user_mapping.get_position(user_id)
+    return float(self.__avg_ratings[user_position]) if user_position >= 0 else 0
+
+  def find_item_position(self, user_id: int, item_id: int) -> int:
+    """ Position of the item in the user's history, -1 if the user has not rated it """
+    return int(self.find_item_positions(np.asarray([user_id]), np.asarray([item_id]))[0])
+
+  def find_item_positions(self, user_ids, item_ids) -> np.ndarray:
+    """ Positions of the items in the histories of the users, -1 where the user has not rated the item """
+    user_positions = self.__user_mapping.get_positions(user_ids)
+    item_positions = self.__item_mapping.get_positions(item_ids)
+    keys = UserHistories.__get_keys(user_positions, item_positions, len(self.__item_mapping))
+    indices = self.__history_index.get_indexer(keys)
+    is_found = (indices >= 0) & (user_positions >= 0) & (item_positions >= 0)
+    return np.where(is_found, self.__history_positions[indices], -1)
+
+  def get_windows_with_item(self, user_id: int, item_id: int, sizes) -> list:
+    """ (user, start, size) of the window of every size that contains the item, windows of a size tile the history """
+    item_position = self.find_item_position(user_id, item_id)
+    if item_position < 0:
+      return list()
+    return [(user_id, item_position - item_position % size, size) for size in sizes]
+
+  @staticmethod
+  def __get_keys(user_positions, item_positions, n_items) -> np.ndarray:
+    return user_positions.astype(np.int64) * n_items + item_positions
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+class CompactRatings:
+  """
+  Column store of ratings using int32 user/item ids, uint8 rating codes and int64 epoch seconds.
+
+  Rating codes are the number of rating increments above the lowest rating of the dataset, see
+  get_dataset_rating_range of the datasets. Movie titles and genres are never copied onto the ratings,
+  to_ratings decodes the store back into the standard ratings frame whenever a DataFrame is required.
+  """
+
+  def __init__(self, user_ids: np.ndarray, item_ids: np.ndarray, rating_codes: np.ndarray, timestamps: np.ndarray,
+               rating_range):
+    self.user_ids = user_ids
+    self.item_ids = item_ids
+    self.rating_codes = rating_codes
+    self.timestamps = timestamps
+    self.rating_range = rating_range
+
+  @staticmethod
+  def from_ratings(ratings: pd.DataFrame, rating_range):
+    item_ids = ratings['item_id'] if 'item_id' in ratings.columns else ratings.index
+    return CompactRatings(np.asarray(ratings['user_id'], dtype=np.int32),
+                          np.asarray(item_ids, dtype=np.int32),
+                          CompactRatings.encode_ratings(ratings['rating'].to_numpy(), rating_range),
+                          CompactRatings.to_epoch_seconds(ratings['timestamp'].to_numpy()),
+                          rating_range)
+
+  @staticmethod
+  def as_dataframe(ratings) -> pd.DataFrame:
+    return ratings.to_ratings() if isinstance(ratings, CompactRatings) else ratings
+
+  @staticmethod
+  def encode_ratings(ratings: np.ndarray, rating_range) -> np.ndarray:
+    lowest_rating, _, rating_increment = rating_range
+    return np.rint((ratings - lowest_rating) / rating_increment).astype(np.uint8)
+
+  @staticmethod
+  def decode_ratings(rating_codes: np.ndarray, rating_range) -> np.ndarray:
+    lowest_rating, _, rating_increment = rating_range
+    return lowest_rating + rating_codes * float(rating_increment)
+
+  @staticmethod
+  def to_epoch_seconds(timestamps) -> np.ndarray:
+    return np.asarray(timestamps, dtype='datetime64[s]').astype(np.int64)
+
+  def get_ratings(self) -> np.ndarray:
+    return CompactRatings.decode_ratings(self.rating_codes, self.rating_range)
+
+  def get_user_ratings(self, user_id: int) -> pd.DataFrame:
+    return self.take(np.flatnonzero(self.user_ids == user_id)).to_ratings()
+
+  def get_ratings_between(self, start_dt=None, end_dt=None):
+    in_interval = np.ones(len(self), dtype=bool)
+    if start_dt is not None:
+      in_interval &= self.timestamps >= CompactRatings.to_epoch_seconds(start_dt)
+    if end_dt is not None:
+      in_interval &= self.timestamps < CompactRatings.to_epoch_seconds(end_dt)
+    return self.take(np.flatnonzero(in_interval))
+
+  def take(self, positions: np.ndarray):
+    return CompactRatings(self.user_ids[positions], self.item_ids[positions], self.rating_codes[positions],
+                          self.timestamps[positions], self.rating_range)
+
+  def to_ratings(self) -> pd.DataFrame:
+    ratings = pd.DataFrame({'item_id': self.item_ids,
+                            'user_id': self.user_ids,
+                            'rating': self.get_ratings(),
+                            'timestamp': self.timestamps.astype('datetime64[s]')})
+    return ratings.set_index('item_id')
+
+  @property
+  def empty(self):
+    return len(self) == 0
+
+  @property
+  def nbytes(self):
+    return self.user_ids.nbytes + self.item_ids.nbytes + self.rating_codes.nbytes + self.timestamps.nbytes
+
+  def __len__(self):
+    return len(self.user_ids)
@@ -1,5 +1,7 @@
 import os
 import pandas as pd
+from internal.platform.datasets.compact_ratings import CompactRatings
+from internal.platform.datasets.dataset_snapshot import DatasetSnapshot
 
 
 class InvalidDatasetInputFilePath(Exception):
@@ -7,9 +9,10 @@ class InvalidDatasetInputFilePath(Exception):
 
 
 class Dataset:
-  def __init__(self, ratings_file_path, movies_file_path):
+  def __init__(self, ratings_file_path, movies_file_path, snapshot_directory=None):
     self.ratings_file_path = ratings_file_path
     self.movies_file_path = movies_file_path
+    self.snapshot_directory = snapshot_directory
 
     self.ratings_column_names = ('user_id', 'item_id', 'rating', 'timestamp')
     self.movies_column_names = ('item_id', 'title', 'genres')
@@ -20,12 +23,20 @@ class Dataset:
   def load_ratings(self) -> pd.DataFrame:
     return pd.DataFrame()
 
+  def load_compact_ratings(self) -> CompactRatings:
+    return CompactRatings.from_ratings(self.load_ratings(), self.get_dataset_rating_range())
+
   def load_movie_ratings(self) -> pd.DataFrame:
     movies = self.load_movies()
     ratings = self.load_ratings()
     movie_ratings = Dataset.merge_ratings_and_movies_to_movie_ratings(ratings, movies)
     return movie_ratings
 
+  def load_with_snapshot(self, source_file_path, name, parse_frame) -> pd.DataFrame:
+    if self.snapshot_directory is None:
+      return parse_frame()
+    return DatasetSnapshot(self.snapshot_directory).load_or_create(source_file_path, name, parse_frame)
+
   @staticmethod
   def merge_ratings_and_movies_to_movie_ratings(ratings, movies) -> pd.DataFrame:
     return pd.merge(ratings, movies, on='item_id')
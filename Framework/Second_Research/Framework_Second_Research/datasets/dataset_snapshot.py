@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+class DatasetSnapshot:
+  """
+  Columnar binary snapshot of parsed dataset frames.
+
+  Every column of a parsed frame is written once as a standalone .npy file under a directory named after the
+  fingerprint of the source file (path, size and modification time). Later loads memory map those files
+  instead of parsing the csv again, so the snapshot is invalidated automatically when the source file changes.
+  """
+
+  format_version = 1
+  meta_file_name = 'meta.json'
+
+  def __init__(self, snapshot_directory):
+    self.snapshot_directory = snapshot_directory
+
+  def load_or_create(self, source_file_path, name, create_frame) -> pd.DataFrame:
+    frame = self.load(source_file_path, name)
+    if frame is not None:
+      return frame
+    frame = create_frame()
+    self.save(source_file_path, name, frame)
+    return frame
+
+  def load(self, source_file_path, name):
+    snapshot_path = self.get_snapshot_path(source_file_path, name)
+    meta_path = os.path.join(snapshot_path, DatasetSnapshot.meta_file_name)
+    if not os.path.isfile(meta_path):
+      return None
+    with open(meta_path) as meta_file:
+      meta = json.load(meta_file)
+    columns = {column: DatasetSnapshot.__load_column(snapshot_path, column, is_str)
+               for column, is_str in meta['columns']}
+    frame = pd.DataFrame(columns, copy=False)
+    if meta['index'] is not None:
+      frame.set_index(meta['index'], inplace=True)
+    return frame
+
+  def save(self, source_file_path, name, frame: pd.DataFrame):
+    snapshot_path = self.get_snapshot_path(source_file_path, name)
+    if os.path.isdir(snapshot_path):
+      return
+    os.makedirs(self.snapshot_directory, exist_ok=True)
+    index_name = frame.index.name
+    data = frame.reset_index() if index_name is not None else frame
+    # Write into a temporary directory first so that concurrent readers never see half written snapshots
+    temp_path = tempfile.mkdtemp(dir=self.snapshot_directory)
+    columns = [(column, DatasetSnapshot.__save_column(temp_path, column, data[column])) for column in data.columns]
+    with open(os.path.join(temp_path, DatasetSnapshot.meta_file_name), 'w') as meta_file:
+      json.dump({'index': index_name, 'columns': columns}, meta_file)
+    try:
+      os.rename(temp_path, snapshot_path)
+    except OSError:
+      # Another process has published the same snapshot in the meantime
+      shutil.rmtree(temp_path, ignore_errors=True)
+
+  def get_snapshot_path(self, source_file_path, name):
+    return os.path.join(self.snapshot_directory, f"{name}_{DatasetSnapshot.fingerprint(source_file_path, name)}")
+
+  @staticmethod
+  def fingerprint(source_file_path, name) -> str:
+    stat = os.stat(source_file_path)
+    key = f"{DatasetSnapshot.format_version}|{os.path.abspath(source_file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{name}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+  @staticmethod
+  def __save_column(snapshot_path, column, values: pd.Series) -> bool:
+    is_str = not DatasetSnapshot.__is_numeric_dtype(values.dtype)
+    if is_str:
+      null_mask = values.isna().to_numpy()
+      if null_mask.any():
+        np.save(os.path.join(snapshot_path, f"{column}.null.npy"), null_mask)
+      array = values.fillna('').to_numpy().astype(str)
+    else:
+      array = values.to_numpy()
+    np.save(os.path.join(snapshot_path, f"{column}.npy"), array)
+    return is_str
+
+  @staticmethod
+  def __load_column(snapshot_path, column, is_str):
+    array = np.load(os.path.join(snapshot_path, f"{column}.npy"), mmap_mode='r')
+    if not is_str:
+      return array
+    values = pd.Series(array)
+    null_mask_path = os.path.join(snapshot_path, f"{column}.null.npy")
+    if os.path.isfile(null_mask_path):
+      values[np.load(null_mask_path)] = np.nan
+    return values
+
+  @staticmethod
+  def __is_numeric_dtype(dtype):
+    return isinstance(dtype, np.dtype) and dtype.kind in 'biufmM'
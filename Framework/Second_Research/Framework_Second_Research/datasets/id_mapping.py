@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class IdMapping:
+  """
+  Bidirectional mapping between the external ids of a dataset and contiguous 0..n-1 positions.
+
+  Positions follow the sorted order of the ids. Integer ids are translated with a direct lookup table whenever the
+  largest id is small enough (MovieLens and Netflix ids both are), otherwise with a binary search over the ids.
+  Ids that are not part of the mapping are translated to -1.
+  """
+
+  max_lookup_table_size = 1 << 26
+
+  def __init__(self, ids):
+    self.__ids = np.unique(np.asarray(ids))
+    self.__lookup_table = IdMapping.__create_lookup_table(self.__ids)
+
+  def get_ids(self) -> np.ndarray:
+    return self.__ids
+
+  def get_id(self, position: int):
+    return self.__ids[position]
+
+  def get_id_list(self, positions) -> np.ndarray:
+    return self.__ids[np.asarray(positions, dtype=np.int64)]
+
+  def get_position(self, external_id) -> int:
+    if self.__lookup_table is not None and isinstance(external_id, (int, np.integer)):
+      return int(self.__lookup_table[external_id]) if 0 <= external_id < len(self.__lookup_table) else -1
+    return int(self.get_positions(np.asarray([external_id]))[0])
+
+  def get_positions(self, external_ids) -> np.ndarray:
+    external_ids = np.asarray(external_ids)
+    if self.__lookup_table is not None and external_ids.dtype.kind in 'iu':
+      in_table = (external_ids >= 0) & (external_ids < len(self.__lookup_table))
+      positions = np.full(len(external_ids), -1, dtype=np.int64)
+      positions[in_table] = self.__lookup_table[external_ids[in_table]]
+      return positions
+    positions = np.searchsorted(self.__ids, external_ids)
+    is_found = positions < len(self.__ids)
+    is_found[is_found] = self.__ids[positions[is_found]] == external_ids[is_found]
+    return np.where(is_found, positions, -1)
+
+  def __contains__(self, external_id):
+    return self.get_position(external_id) >= 0
+
+  def __len__(self):
+    return len(self.__ids)
+
+  @staticmethod
+  def __create_lookup_table(ids):
+    if len(ids) == 0 or ids.dtype.kind not in 'iu' or ids[0] < 0 or ids[-1] >= IdMapping.max_lookup_table_size:
+      return None
+    lookup_table = np.full(int(ids[-1]) + 1, -1, dtype=np.int32)
+    lookup_table[ids] = np.arange(len(ids))
+    return lookup_table
@@ -3,8 +3,8 @@ import pandas as pd
 
 class MovielensDataset(Dataset):
 
-  def __init__(self, ratings_file_path, movies_file_path):
-    super().__init__(ratings_file_path, movies_file_path)
+  def __init__(self, ratings_file_path, movies_file_path, snapshot_directory=None):
+    super().__init__(ratings_file_path, movies_file_path, snapshot_directory)
     self.ratings_column_names = ('user_id', 'item_id', 'rating', 'timestamp')
     self.movies_column_names = ('item_id', 'title', 'genres')
     self.__lowest_rating, self.__highest_rating, self.__rating_increment = 0.5, 5, 0.5
@@ -15,14 +15,20 @@ class MovielensDataset(Dataset):
   def load_movies(self) -> pd.DataFrame:
     if not Dataset.is_valid_input_file(self.movies_file_path):
       raise InvalidDatasetInputFilePath
+    return self.load_with_snapshot(self.movies_file_path, 'movies', self.__parse_movies)
+
+  def load_ratings(self) -> pd.DataFrame:
+    if not Dataset.is_valid_input_file(self.ratings_file_path):
+      raise InvalidDatasetInputFilePath
+    return self.load_with_snapshot(self.ratings_file_path, 'ratings', self.__parse_ratings)
+
+  def __parse_movies(self) -> pd.DataFrame:
     movies = MovielensDataset.__read_data_from_file(self.movies_file_path, self.movies_column_names, )
     MovielensDataset.__create_datetime_year_column_for_movies_from_title_years(movies)
     MovielensDataset.__truncate_movie_year_str_from_movie_titles(movies)
     return movies
 
-  def load_ratings(self) -> pd.DataFrame:
-    if not Dataset.is_valid_input_file(self.ratings_file_path):
-      raise InvalidDatasetInputFilePath
+  def __parse_ratings(self) -> pd.DataFrame:
     ratings = MovielensDataset.__read_data_from_file(self.ratings_file_path, self.ratings_column_names)
     MovielensDataset.__convert_ratings_timestamp_column_to_readable_dates(ratings)
     Dataset.sort_ratings_by_timestamp(ratings)
@@ -1,13 +1,24 @@
+from concurrent.futures import ProcessPoolExecutor
 from internal.platform.datasets.dataset import Dataset, InvalidDatasetInputFilePath
-from collections import deque
 import numpy as np
 import pandas as pd
 
 
 class NetflixDataset(Dataset):
 
-  def __init__(self, ratings_file_path, movies_file_path):
+  def __init__(self, ratings_file_path, movies_file_path, chunk_size=1000000, n_jobs=None, out_of_core=False):
+    """
+    ratings_file_path is either a single combined_data file or a list of them, e.g. all four combined_data files of
+    the Netflix Prize. Multiple files are parsed concurrently by up to n_jobs worker processes.
+
+    With out_of_core, the low active user filter streams over the files twice instead of loading all ratings first:
+    the first pass only counts ratings per user, the second pass keeps the ratings of the high active users.
+    """
     super().__init__(ratings_file_path, movies_file_path)
+    self.chunk_size = chunk_size
+    self.n_jobs = n_jobs
+    self.out_of_core = out_of_core
+    self.__loaded_item_ids = None
     self.ratings_column_names = ('user_id', 'rating', 'timestamp')
     self.movies_column_names = ('item_id', 'year', 'title')
     self.__lowest_rating, self.__highest_rating, self.__rating_increment = 1, 5, 1
@@ -20,20 +31,106 @@ class NetflixDataset(Dataset):
     movies = NetflixDataset.__replace_invalid_years_with_zero(movies)
     movies = NetflixDataset.__convert_movies_year_format_to_int(movies)
     movies = NetflixDataset.__interchange_movies_title_and_year(movies)
-    return NetflixDataset.__get_only_movies_from_the_first_ratings_file(movies)
+    return self.__get_only_movies_from_the_loaded_ratings_files(movies)
 
   def load_ratings(self):
-    if not Dataset.is_valid_input_file(self.ratings_file_path):
+    ratings_file_paths = self.get_ratings_file_paths()
+    if not all(Dataset.is_valid_input_file(path) for path in ratings_file_paths):
       raise InvalidDatasetInputFilePath
-    unstructured_ratings = self.__read_ratings_data_from_file()
-    ratings = NetflixDataset.__structure_ratings_dataframe(unstructured_ratings)
-    ratings = NetflixDataset.__reduce_dataset_size_by_removing_low_active_user_data(ratings)
+    if self.out_of_core:
+      ratings = self.__read_ratings_files_of_high_active_users(ratings_file_paths)
+    else:
+      ratings = self.__read_ratings_files(ratings_file_paths)
+      self.__loaded_item_ids = pd.unique(ratings['item_id'])
+      ratings = NetflixDataset.__reduce_dataset_size_by_removing_low_active_user_data(ratings)
     Dataset.sort_ratings_by_timestamp(ratings)
     return ratings
 
+  def get_ratings_file_paths(self) -> list:
+    if isinstance(self.ratings_file_path, (list, tuple)):
+      return list(self.ratings_file_path)
+    return [self.ratings_file_path]
+
+  @staticmethod
+  def read_ratings_file(ratings_file_path, chunk_size, is_user_kept=None) -> pd.DataFrame:
+    """
+    is_user_kept is an optional boolean array indexed by user id, only the ratings of the users marked are kept.
+    """
+    unstructured_ratings_chunks = NetflixDataset.__read_ratings_file_chunks(ratings_file_path, chunk_size)
+    return NetflixDataset.__structure_ratings_dataframe(unstructured_ratings_chunks, is_user_kept)
+
+  @staticmethod
+  def __read_ratings_file_chunks(ratings_file_path, chunk_size):
+    # No usecols, a chunk of only "<movie_id>:" header rows has a single field and gets NaN rating and timestamp
+    return pd.read_csv(ratings_file_path, header=None, names=('user_id', 'rating', 'timestamp'),
+                       dtype={'user_id': str, 'rating': float, 'timestamp': str}, chunksize=chunk_size)
+
+  @staticmethod
+  def count_ratings_per_user(ratings_file_path, chunk_size) -> (np.ndarray, np.ndarray, np.ndarray):
+    """
+    First pass of the out of core activity filter.
+
+    :return: rating counts and rating sums indexed by user id, and the movie ids found in the file
+    """
+    counts, rating_sums, movie_ids = np.zeros(0, dtype=np.int32), np.zeros(0), list()
+    for ratings_raw in NetflixDataset.__read_ratings_file_chunks(ratings_file_path, chunk_size):
+      is_movie_header = ratings_raw['rating'].isna()
+      movie_ids.append(ratings_raw['user_id'].loc[is_movie_header].str[:-1].astype(int).to_numpy())
+      user_ids = ratings_raw['user_id'].loc[~is_movie_header].astype(int).to_numpy()
+      chunk_counts = np.bincount(user_ids)
+      chunk_rating_sums = np.bincount(user_ids, weights=ratings_raw['rating'].loc[~is_movie_header].to_numpy())
+      counts = NetflixDataset.__add_counters(counts, chunk_counts.astype(np.int32))
+      rating_sums = NetflixDataset.__add_counters(rating_sums, chunk_rating_sums)
+    return counts, rating_sums, np.concatenate(movie_ids) if movie_ids else np.zeros(0, dtype=int)
+
   @staticmethod
-  def __get_only_movies_from_the_first_ratings_file(movies):
-    return movies[:4499]
+  def __add_counters(counter_a, counter_b):
+    if len(counter_a) < len(counter_b):
+      counter_a, counter_b = counter_b, counter_a
+    counter_a[:len(counter_b)] += counter_b
+    return counter_a
+
+  def __read_ratings_files_of_high_active_users(self, ratings_file_paths) -> pd.DataFrame:
+    counters_per_file = self.__map_over_ratings_files(NetflixDataset.count_ratings_per_user, ratings_file_paths,
+                                                      [self.chunk_size] * len(ratings_file_paths))
+    counts, rating_sums = np.zeros(0, dtype=np.int32), np.zeros(0)
+    for file_counts, file_rating_sums, _ in counters_per_file:
+      counts = NetflixDataset.__add_counters(counts, file_counts)
+      rating_sums = NetflixDataset.__add_counters(rating_sums, file_rating_sums)
+    self.__loaded_item_ids = np.concatenate([movie_ids for _, _, movie_ids in counters_per_file])
+
+    is_user_kept = np.zeros(len(counts), dtype=bool)
+    is_user_kept[NetflixDataset.__get_high_active_user_list_from_counters(counts, rating_sums, 40)] = True
+    ratings_per_file = self.__map_over_ratings_files(NetflixDataset.read_ratings_file, ratings_file_paths,
+                                                     [self.chunk_size] * len(ratings_file_paths),
+                                                     [is_user_kept] * len(ratings_file_paths))
+    return pd.concat(ratings_per_file, ignore_index=True)
+
+  @staticmethod
+  def read_movie_ids_of_ratings_file(ratings_file_path) -> list:
+    with open(ratings_file_path) as ratings_file:
+      return [int(line[:-2]) for line in ratings_file if line.endswith(':\n')]
+
+  def __read_ratings_files(self, ratings_file_paths) -> pd.DataFrame:
+    ratings_per_file = self.__map_over_ratings_files(NetflixDataset.read_ratings_file, ratings_file_paths,
+                                                     [self.chunk_size] * len(ratings_file_paths))
+    if len(ratings_per_file) == 1:
+      return ratings_per_file[0]
+    return pd.concat(ratings_per_file, ignore_index=True)
+
+  def __map_over_ratings_files(self, function, ratings_file_paths, *args) -> list:
+    if len(ratings_file_paths) == 1 or self.n_jobs == 1:
+      return list(map(function, ratings_file_paths, *args))
+    n_workers = len(ratings_file_paths) if self.n_jobs is None else min(self.n_jobs, len(ratings_file_paths))
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+      return list(executor.map(function, ratings_file_paths, *args))
+
+  def __get_only_movies_from_the_loaded_ratings_files(self, movies):
+    if self.__loaded_item_ids is None:
+      movie_ids_per_file = self.__map_over_ratings_files(NetflixDataset.read_movie_ids_of_ratings_file,
+                                                         self.get_ratings_file_paths())
+      self.__loaded_item_ids = np.concatenate(movie_ids_per_file)
+    return movies.loc[movies.index.isin(self.__loaded_item_ids)]
 
   @staticmethod
   def __interchange_movies_title_and_year(movies):
@@ -53,64 +150,33 @@ class NetflixDataset(Dataset):
     movies['year'].replace([np.inf, -np.inf, np.nan], 0, inplace=True)
     return movies
 
-  def __read_ratings_data_from_file(self):
-    return pd.read_csv(self.ratings_file_path, header=None, names=self.ratings_column_names, usecols=[0, 1, 2])
-
-  @staticmethod
-  def __structure_ratings_dataframe(ratings_raw):
-    NetflixDataset.__convert_ratings_rating_column_format_to_float(ratings_raw)
-    ratings = NetflixDataset.__convert_netflix_ratings_format_to_standard_movielens_like_format(ratings_raw)
-    NetflixDataset.__convert_ratings_column_order_similar_to_movielens(ratings)
-    NetflixDataset.__convert_ratings_timestamp_format_to_datetime(ratings)
-    NetflixDataset.__convert_ratings_user_id_format_to_int(ratings)
-    return ratings
-
-  @staticmethod
-  def __convert_ratings_rating_column_format_to_float(ratings):
-    ratings['rating'] = ratings['rating'].astype(float)
-
   @staticmethod
-  def __convert_ratings_user_id_format_to_int(ratings):
-    ratings['user_id'] = ratings['user_id'].astype(int)
+  def __structure_ratings_dataframe(ratings_raw_chunks, is_user_kept=None):
+    # Movie ids only appear in "<movie_id>:" header rows, carry the last one seen over to the next chunk
+    ratings_chunks = list()
+    movie_id = np.nan
+    for ratings_raw in ratings_raw_chunks:
+      ratings, movie_id = NetflixDataset.__convert_netflix_ratings_chunk_to_standard_movielens_like_format(ratings_raw,
+                                                                                                           movie_id)
+      if is_user_kept is not None:
+        ratings = NetflixDataset.__drop_ratings_of_not_kept_users(ratings, is_user_kept)
+      ratings_chunks.append(ratings)
+    return pd.concat(ratings_chunks, ignore_index=True)
 
   @staticmethod
-  def __convert_ratings_timestamp_format_to_datetime(ratings):
-    ratings['timestamp'] = pd.to_datetime(ratings['timestamp'], infer_datetime_format=True)
-
-  @staticmethod
-  def __convert_ratings_column_order_similar_to_movielens(ratings):
-    ratings.reindex(columns=['user_id', 'item_id', 'rating', 'timestamp'])
-
-  @staticmethod
-  def __convert_netflix_ratings_format_to_standard_movielens_like_format(ratings_raw):
-
-    # Find empty rows to slice dataframe for each movie
-    temp_movies = ratings_raw[ratings_raw['rating'].isna()]['user_id'].reset_index()
-    movie_indexes = [[index, int(movie[:-1])] for index, movie in temp_movies.values]
-    # Shift the movie_indexes by one to get start and endpoints of all movies
-    shifted_movie_indexes = deque(movie_indexes)
-    shifted_movie_indexes.rotate(-1)
-    # Gather all dataframes
-    user_data = []
-    for [df_id_1, movie_id], [df_id_2, next_movie_id] in zip(movie_indexes, shifted_movie_indexes):
-
-      # if it is the last movie in the file
-      if df_id_1 < df_id_2:
-        temp_df = ratings_raw[(df_id_1 + 1):(df_id_2 - 1)].copy()
-      else:
-        temp_df = ratings_raw[df_id_1 + 1:].copy()
-
-      # Create movie id column
-      temp_df['item_id'] = movie_id
-
-      # Append dataframe to list
-
-      user_data.append(temp_df)
-    # Combile all  dataframes
-    ratings = pd.concat(user_data)
-    del user_data, ratings_raw, temp_movies, temp_df, shifted_movie_indexes, movie_indexes, df_id_1, df_id_2, \
-      movie_id, next_movie_id
-    return ratings
+  def __convert_netflix_ratings_chunk_to_standard_movielens_like_format(ratings_raw, previous_movie_id):
+    is_movie_header = ratings_raw['rating'].isna()
+    movie_ids = pd.to_numeric(ratings_raw['user_id'].where(is_movie_header).str[:-1])
+    movie_ids = movie_ids.ffill().fillna(previous_movie_id)
+    ratings_raw = ratings_raw.loc[~is_movie_header]
+    ratings = pd.DataFrame({
+      'user_id': ratings_raw['user_id'].astype(int),
+      'rating': ratings_raw['rating'],
+      'timestamp': pd.to_datetime(ratings_raw['timestamp'], format='%Y-%m-%d'),
+      'item_id': movie_ids.loc[~is_movie_header].astype(int)
+    })
+    last_movie_id = movie_ids.iloc[-1] if len(movie_ids) > 0 else previous_movie_id
+    return ratings, last_movie_id
 
   @staticmethod
   def __reduce_dataset_size_by_removing_low_active_user_data(ratings):
@@ -118,11 +184,29 @@ class NetflixDataset(Dataset):
     ratings = NetflixDataset.__drop_low_active_user_ratings_only_keep_high_ones(netflix_users, ratings)
     return ratings
 
+  @staticmethod
+  def __drop_ratings_of_not_kept_users(ratings, is_user_kept):
+    user_ids = ratings['user_id'].to_numpy()
+    is_kept = user_ids < len(is_user_kept)
+    is_kept[is_kept] = is_user_kept[user_ids[is_kept]]
+    return ratings.loc[is_kept]
+
+  @staticmethod
+  def __get_high_active_user_list_from_counters(counts, rating_sums, min_ratings_count_for_being_high_active):
+    user_ids = np.flatnonzero(counts)
+    users = pd.DataFrame({'rating': rating_sums[user_ids] / counts[user_ids]}, index=pd.Index(user_ids, name='user_id'))
+    users['No_of_ratings'] = counts[user_ids].astype(np.int64)
+    return NetflixDataset.__select_high_active_users(users, min_ratings_count_for_being_high_active)
+
   @staticmethod
   def __get_high_active_user_list(ratings, min_ratings_count_for_being_high_active):
     data = ratings.copy(deep=True)
     users = pd.DataFrame(data.groupby('user_id')['rating'].mean())
     users['No_of_ratings'] = pd.DataFrame(data.groupby('user_id')['rating'].count())
+    return NetflixDataset.__select_high_active_users(users, min_ratings_count_for_being_high_active)
+
+  @staticmethod
+  def __select_high_active_users(users, min_ratings_count_for_being_high_active):
     users.sort_values(by=['No_of_ratings'], ascending=False, inplace=True)
     users.columns = ['mean_rating', 'No_of_ratings']
     return users.loc[users['No_of_ratings'] > min_ratings_count_for_being_high_active].drop_duplicates(
@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.constraints.interval import MaxLimitInterval, TimebinInterval
+from internal.platform.dataset_operators.dataset_operator import DatasetOperator
+from internal.platform.dataset_operators.dataset_user_operator import DatasetUserOperator
+from internal.platform.datasets.compact_ratings import CompactRatings
+
+
+class TestCompactRatings(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestCompactRatings, self).__init__(*args, **kwargs)
+    self.ratings = pd.DataFrame({
+      'item_id': [10, 20, 10, 30, 20],
+      'user_id': [1, 1, 2, 2, 3],
+      'rating': [0.5, 4.5, 3.0, 5.0, 2.5],
+      'timestamp': pd.to_datetime([datetime(2001, 1, 1), datetime(2003, 5, 5), datetime(2005, 1, 1),
+                                   datetime(2007, 1, 1), datetime(2009, 1, 1)]).astype('datetime64[s]')
+    }).set_index('item_id')
+    self.compact_ratings = CompactRatings.from_ratings(self.ratings, (0.5, 5, 0.5))
+
+  def test_compact_types(self):
+    self.assertEqual(self.compact_ratings.user_ids.dtype, np.int32)
+    self.assertEqual(self.compact_ratings.item_ids.dtype, np.int32)
+    self.assertEqual(self.compact_ratings.rating_codes.dtype, np.uint8)
+    self.assertEqual(self.compact_ratings.timestamps.dtype, np.int64)
+    self.assertEqual(self.compact_ratings.rating_codes.tolist(), [0, 8, 5, 9, 4])
+
+  def test_round_trip(self):
+    ratings = self.compact_ratings.to_ratings()
+    self.assertEqual(ratings['rating'].tolist(), self.ratings['rating'].tolist())
+    self.assertEqual(ratings.index.tolist(), self.ratings.index.tolist())
+    self.assertTrue((ratings['timestamp'].to_numpy() == self.ratings['timestamp'].to_numpy()).all())
+
+  def test_time_constraint(self):
+    max_limit = MaxLimitInterval(None, datetime(2005, 1, 1))
+    self.assertEqual(len(DatasetOperator.apply_time_constraint(self.compact_ratings, max_limit)), 2)
+    timebin = TimebinInterval(datetime(2003, 1, 1), datetime(2008, 1, 1))
+    self.assertEqual(len(DatasetOperator.apply_time_constraint(self.compact_ratings, timebin)), 3)
+
+  def test_user_operator_accepts_compact_ratings(self):
+    user_operator = DatasetUserOperator(self.ratings)
+    compact_user_operator = DatasetUserOperator(self.compact_ratings)
+    self.assertEqual(sorted(compact_user_operator.get_all_users()), [1, 2, 3])
+    self.assertEqual(compact_user_operator.get_user_avg(2), user_operator.get_user_avg(2))
+    self.assertEqual(compact_user_operator.get_user_rating_value(1, 20), 4.5)
+    self.assertTrue(compact_user_operator.get_top_n_raters(2).equals(user_operator.get_top_n_raters(2)))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from internal.platform.datasets.dataset_snapshot import DatasetSnapshot
+from internal.platform.datasets.movielens_dataset import MovielensDataset
+
+
+class TestDatasetSnapshot(unittest.TestCase):
+  def test_snapshot_matches_parsed_frames(self):
+    with tempfile.TemporaryDirectory() as directory:
+      ratings_file_path = os.path.join(directory, 'ratings.csv')
+      with open(ratings_file_path, 'w') as ratings_file:
+        ratings_file.write('userId,movieId,rating,timestamp\n')
+        for user_id, item_id, rating, timestamp in [(1, 1, 4.0, 964982703), (1, 3, 4.0, 964981247),
+                                                    (2, 1, 3.5, 1445714835), (2, 6, 5.0, 1445714952),
+                                                    (3, 3, 0.5, 1306463578)]:
+          ratings_file.write(f'{user_id},{item_id},{rating},{timestamp}\n')
+      movies_file_path = os.path.join(directory, 'movies.csv')
+      with open(movies_file_path, 'w') as movies_file:
+        movies_file.write('movieId,title,genres\n')
+        movies_file.write('1,Toy Story (1995),Adventure|Animation|Children\n')
+        movies_file.write('3,Grumpier Old Men (1995),\n')  # Empty genres are parsed as null
+        movies_file.write('6,Heat (1995),Action|Crime|Thriller\n')
+        movies_file.write('7,Movie Without A Year,Comedy\n')
+      snapshot_directory = os.path.join(directory, 'snapshots')
+      parsed_dataset = MovielensDataset(ratings_file_path, movies_file_path)
+      snapshot_dataset = MovielensDataset(ratings_file_path, movies_file_path, snapshot_directory)
+
+      snapshot_dataset.load_ratings()
+      parsed_movies = snapshot_dataset.load_movies()
+      self.assertEqual(len(os.listdir(snapshot_directory)), 2)
+      self.assertTrue(parsed_movies['genres'].isna().any())
+
+      self.assertTrue(parsed_dataset.load_ratings().equals(snapshot_dataset.load_ratings()))
+      self.assertTrue(parsed_dataset.load_movies().equals(snapshot_dataset.load_movies()))
+
+  def test_fingerprint_changes_with_source_file(self):
+    with tempfile.TemporaryDirectory() as directory:
+      source_file_path = os.path.join(directory, 'ratings.csv')
+      with open(source_file_path, 'w') as source_file:
+        source_file.write('userId,movieId,rating,timestamp\n')
+      fingerprint = DatasetSnapshot.fingerprint(source_file_path, 'ratings')
+      self.assertEqual(fingerprint, DatasetSnapshot.fingerprint(source_file_path, 'ratings'))
+      self.assertNotEqual(fingerprint, DatasetSnapshot.fingerprint(source_file_path, 'movies'))
+
+      with open(source_file_path, 'a') as source_file:
+        source_file.write('1,1,4.0,964982703\n')
+      self.assertNotEqual(fingerprint, DatasetSnapshot.fingerprint(source_file_path, 'ratings'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from internal.platform.datasets.id_mapping import IdMapping
+
+
+class TestIdMapping(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestIdMapping, self).__init__(*args, **kwargs)
+    self.user_ids = np.array([2649429, 6, 1488844, 6, 822109, 30878])
+    self.id_mapping = IdMapping(self.user_ids)
+
+  def test_positions_are_contiguous(self):
+    self.assertEqual(len(self.id_mapping), 5)
+    self.assertEqual(self.id_mapping.get_ids().tolist(), [6, 30878, 822109, 1488844, 2649429])
+    self.assertEqual(self.id_mapping.get_positions(self.user_ids).tolist(), [4, 0, 3, 0, 2, 1])
+
+  def test_round_trip(self):
+    positions = self.id_mapping.get_positions(self.user_ids)
+    self.assertEqual(self.id_mapping.get_id_list(positions).tolist(), self.user_ids.tolist())
+    self.assertEqual(self.id_mapping.get_id(self.id_mapping.get_position(822109)), 822109)
+
+  def test_unknown_ids(self):
+    self.assertEqual(self.id_mapping.get_position(7), -1)
+    self.assertEqual(self.id_mapping.get_position(-1), -1)
+    self.assertEqual(self.id_mapping.get_position(1 << 40), -1)
+    self.assertFalse(7 in self.id_mapping)
+    self.assertTrue(6 in self.id_mapping)
+
+  def test_without_lookup_table(self):
+    id_mapping = IdMapping(np.array(['b', 'a', 'c']))
+    self.assertEqual(id_mapping.get_positions(np.array(['c', 'x', 'a'])).tolist(), [2, -1, 0])
+    id_mapping = IdMapping(np.array([1 << 40, 5]))
+    self.assertEqual(id_mapping.get_position(1 << 40), 1)
+    self.assertEqual(id_mapping.get_position(6), -1)
+
+
+if __name__ == '__main__':
+  unittest.main()
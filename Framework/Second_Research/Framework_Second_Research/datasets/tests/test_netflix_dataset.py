@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.datasets.netflix_dataset import NetflixDataset
+
+
+class TestNetflixDataset(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestNetflixDataset, self).__init__(*args, **kwargs)
+    self.random = np.random.default_rng(17)
+
+  def test_read_ratings_file_same_for_all_chunk_sizes(self):
+    with tempfile.TemporaryDirectory() as directory:
+      ratings_file_path = self.__write_ratings_file(directory, 'combined_data_1.txt', range(1, 9))
+      with open(ratings_file_path, 'a') as ratings_file:
+        # Consecutive headers, the first movie has no ratings
+        ratings_file.write('9:\n10:\n3,2,2005-01-02\n')
+      expected = TestNetflixDataset.__read_ratings_file_line_by_line(ratings_file_path)
+      for chunk_size in [1, 2, 3, 7, 50, 100000]:
+        ratings = NetflixDataset.read_ratings_file(ratings_file_path, chunk_size)
+        self.assertTrue(ratings[list(expected.columns)].equals(expected), 'chunk size {}'.format(chunk_size))
+
+  def test_parallel_loading_same_as_sequential(self):
+    with tempfile.TemporaryDirectory() as directory:
+      ratings_file_paths, movies_file_path = self.__write_dataset_files(directory)
+      sequential_dataset = NetflixDataset(ratings_file_paths, movies_file_path, chunk_size=100, n_jobs=1)
+      parallel_dataset = NetflixDataset(ratings_file_paths, movies_file_path, chunk_size=100)
+      sequential_ratings = sequential_dataset.load_ratings()
+      self.assertTrue(0 < sequential_ratings['user_id'].nunique() < 80)
+      self.assertTrue(parallel_dataset.load_ratings().equals(sequential_ratings))
+      self.assertTrue(parallel_dataset.load_movies().equals(sequential_dataset.load_movies()))
+
+  def test_out_of_core_same_as_in_memory(self):
+    with tempfile.TemporaryDirectory() as directory:
+      ratings_file_paths, movies_file_path = self.__write_dataset_files(directory)
+      for n_jobs in [1, None]:
+        in_memory_dataset = NetflixDataset(ratings_file_paths, movies_file_path, chunk_size=7, n_jobs=n_jobs)
+        out_of_core_dataset = NetflixDataset(ratings_file_paths, movies_file_path, chunk_size=7, n_jobs=n_jobs,
+                                             out_of_core=True)
+        in_memory_ratings = in_memory_dataset.load_ratings().reset_index(drop=True)
+        self.assertTrue(out_of_core_dataset.load_ratings().reset_index(drop=True).equals(in_memory_ratings))
+        movies = in_memory_dataset.load_movies()
+        self.assertEqual(len(movies), 90)
+        self.assertTrue(out_of_core_dataset.load_movies().equals(movies))
+
+  def __write_dataset_files(self, directory):
+    ratings_file_paths = [self.__write_ratings_file(directory, 'combined_data_1.txt', range(1, 41), 80),
+                          self.__write_ratings_file(directory, 'combined_data_2.txt', range(41, 91), 80)]
+    movies_file_path = os.path.join(directory, 'movie_titles.csv')
+    with open(movies_file_path, 'w') as movies_file:
+      for movie_id in range(1, 101):
+        movies_file.write('{},{},Movie {}\n'.format(movie_id, 1990 + movie_id % 20, movie_id))
+    return ratings_file_paths, movies_file_path
+
+  def __write_ratings_file(self, directory, file_name, movie_ids, n_users=60):
+    ratings_file_path = os.path.join(directory, file_name)
+    with open(ratings_file_path, 'w') as ratings_file:
+      for movie_id in movie_ids:
+        ratings_file.write('{}:\n'.format(movie_id))
+        for user_id in self.random.choice(np.arange(1, n_users + 1), self.random.integers(1, n_users), replace=False):
+          ratings_file.write('{},{},2005-{:02d}-{:02d}\n'.format(user_id, self.random.integers(1, 6),
+                                                                 self.random.integers(1, 13),
+                                                                 self.random.integers(1, 29)))
+    return ratings_file_path
+
+  @staticmethod
+  def __read_ratings_file_line_by_line(ratings_file_path):
+    rows, movie_id = list(), None
+    with open(ratings_file_path) as ratings_file:
+      for line in ratings_file:
+        line = line.strip()
+        if line.endswith(':'):
+          movie_id = int(line[:-1])
+        else:
+          user_id, rating, date = line.split(',')
+          rows.append((int(user_id), float(rating), date, movie_id))
+    ratings = pd.DataFrame(rows, columns=['user_id', 'rating', 'timestamp', 'item_id'])
+    ratings['timestamp'] = pd.to_datetime(ratings['timestamp'], format='%Y-%m-%d')
+    return ratings
+
+
+if __name__ == '__main__':
+  unittest.main()
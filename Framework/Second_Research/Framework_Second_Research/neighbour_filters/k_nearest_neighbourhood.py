@@ -1,25 +1,34 @@
 import pandas as pd
 
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex
+
 
 class KNearestNeighbours:
-  def __init__(self, similarity_method, k: int, correlation_column_name='correlation'):
+  def __init__(self, similarity_method, k: int, correlation_column_name='correlation',
+               neighbour_index: NeighbourIndex = None):
     self.__similarity_method = similarity_method
     self.__k = k
     self.__correlation_column_name = correlation_column_name
+    self.__neighbour_index = neighbour_index
 
   def get_k_nearest_neighbours(self, user_id: int) -> pd.DataFrame:
+    if self.__neighbour_index is not None:
+      return self.__neighbour_index.get_neighbours(user_id, self.__k, self.__correlation_column_name)
     user_neighbors = self.__similarity_method.get_neighbours(user_id)
     if user_neighbors.empty:
       return pd.DataFrame()
     user_neighbors.sort_values(by=self.__correlation_column_name, ascending=False, inplace=True)
-    user_k_nearest_neighbors = user_neighbors.iloc[1:self.__k + 1]
+    # Tiled correlations have no correlation of the user to itself, so it is dropped by id instead of the first row
+    user_k_nearest_neighbors = user_neighbors.drop(index=user_id, errors='ignore').iloc[:self.__k]
     return user_k_nearest_neighbors
 
   @staticmethod
-  def get_k_nearest(neighbours: pd.DataFrame, k: int, correlation_column_name='correlation') -> pd.DataFrame:
+  def get_k_nearest(neighbours: pd.DataFrame, k: int, correlation_column_name='correlation',
+                    user_id: int = None) -> pd.DataFrame:
+    """ k most correlated neighbours, without the target user when it is given and found among the neighbours """
     if neighbours is None or neighbours.empty:
       return pd.DataFrame()
-    neighbours_df = neighbours.copy(deep=True)
+    neighbours_df = neighbours.drop(index=user_id, errors='ignore') if user_id is not None else neighbours.copy()
     neighbours_df.sort_values(by=correlation_column_name, ascending=False, inplace=True)
-    k_nearest_neighbours = neighbours_df.iloc[1:k + 1]
+    k_nearest_neighbours = neighbours_df.iloc[:k]
     return k_nearest_neighbours
@@ -0,0 +1,85 @@
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.datasets.id_mapping import IdMapping
+from internal.platform.similarity.sparse_mutual_information import SparseMutualInformation
+from internal.platform.similarity.sparse_pearson import SparsePearson
+from internal.platform.similarity.tiled_pearson import TiledPearson
+
+
+class NeighbourIndex:
+  """
+  Top K neighbours of every user in fixed width arrays, sorted by descending correlation.
+
+  The K neighbour positions and correlations of a user are selected once with a partial selection, so neighbour
+  queries are O(k) and the index takes O(N.K) memory instead of the O(N^2) of the full correlation matrix.
+  Correlation of a user to itself is never part of its neighbours. Missing neighbours are padded with -1 and NaN.
+  """
+
+  def __init__(self, user_ids: np.ndarray, neighbours: np.ndarray, correlations: np.ndarray):
+    # Neighbours are positions of the sorted user ids of the IdMapping, so the rows have to be in that order as well
+    if np.any(user_ids[1:] <= user_ids[:-1]):
+      raise UnsortedUserIdsException
+    self.__user_mapping = IdMapping(user_ids)
+    self.__neighbours = neighbours
+    self.__correlations = correlations
+
+  @staticmethod
+  def from_correlation_matrix(user_user_correlation_matrix: pd.DataFrame, k: int):
+    if not (user_user_correlation_matrix.index.is_monotonic_increasing and
+            user_user_correlation_matrix.columns.is_monotonic_increasing):
+      user_user_correlation_matrix = user_user_correlation_matrix.sort_index().sort_index(axis=1)
+    if not user_user_correlation_matrix.index.equals(user_user_correlation_matrix.columns):
+      raise UnmatchedCorrelationMatrixUsersException
+    correlations = user_user_correlation_matrix.to_numpy(dtype=np.float64, copy=True)
+    np.fill_diagonal(correlations, np.nan)
+    neighbours, correlations = TiledPearson.select_top_k(correlations, min(k, correlations.shape[1]))
+    return NeighbourIndex(user_user_correlation_matrix.columns.to_numpy(), neighbours, correlations)
+
+  @staticmethod
+  def from_sparse_pearson(sparse_pearson: Union[SparsePearson, SparseMutualInformation], k: int,
+                          memory_budget: int = 1 << 30):
+    n_users = sparse_pearson.get_n_users()
+    k = min(k, n_users)
+    neighbours = np.full((n_users, k), -1, dtype=np.int32)
+    correlations = np.full((n_users, k), np.nan)
+    for user_positions, tile_correlations in TiledPearson(sparse_pearson, memory_budget).iterate_tiles():
+      TiledPearson.drop_self_correlations(user_positions, tile_correlations)
+      neighbours[user_positions], correlations[user_positions] = TiledPearson.select_top_k(tile_correlations, k)
+    return NeighbourIndex(sparse_pearson.get_user_mapping().get_ids(), neighbours, correlations)
+
+  def get_k(self) -> int:
+    return self.__neighbours.shape[1]
+
+  def get_neighbours(self, user_id: int, k: int = None, correlation_column_name='correlation') -> pd.DataFrame:
+    """ At most k (all K if None) neighbours of the user, empty DataFrame if the user is not indexed """
+    user_position = self.__user_mapping.get_position(user_id)
+    if user_position < 0:
+      return pd.DataFrame()
+    neighbour_positions, correlations = self.get_neighbour_positions(user_position, k)
+    user_ids = pd.Index(self.__user_mapping.get_id_list(neighbour_positions), name='user_id')
+    return pd.DataFrame({correlation_column_name: correlations}, index=user_ids)
+
+  def get_neighbour_positions(self, user_position: int, k: int = None):
+    neighbours = self.__neighbours[user_position, :k]
+    is_found = neighbours >= 0
+    return neighbours[is_found], self.__correlations[user_position, :k][is_found]
+
+  def get_user_mapping(self) -> IdMapping:
+    return self.__user_mapping
+
+  def get_neighbour_array(self) -> np.ndarray:
+    return self.__neighbours
+
+  def get_correlation_array(self) -> np.ndarray:
+    return self.__correlations
+
+
+class UnsortedUserIdsException(Exception):
+  pass
+
+
+class UnmatchedCorrelationMatrixUsersException(Exception):
+  pass
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex, UnsortedUserIdsException
+from internal.platform.similarity.sparse_pearson import SparsePearson
+
+
+class TestNeighbourIndex(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestNeighbourIndex, self).__init__(*args, **kwargs)
+    random = np.random.default_rng(3)
+    user_item_pairs = pd.DataFrame({'user_id': random.integers(1, 30, 900), 'item_id': random.integers(1, 50, 900)})
+    self.ratings = user_item_pairs.drop_duplicates().reset_index(drop=True)
+    self.ratings['rating'] = random.integers(1, 11, len(self.ratings)) / 2
+    self.sparse_pearson = SparsePearson(self.ratings, 3)
+    self.correlation_matrix = self.sparse_pearson.get_correlation_matrix()
+
+  def get_expected_neighbours(self, user_id, k):
+    correlations = self.correlation_matrix.get(user_id).drop(user_id).dropna()
+    return correlations.sort_values(ascending=False).head(k)
+
+  def test_same_as_sorted_correlations(self):
+    neighbour_index = NeighbourIndex.from_correlation_matrix(self.correlation_matrix, 10)
+    for user_id in [1, 8, 29]:
+      neighbours = neighbour_index.get_neighbours(user_id, 5)
+      self.assertEqual(neighbours.columns.tolist(), ['correlation'])
+      self.assertFalse(user_id in neighbours.index)
+      self.assertTrue(np.allclose(neighbours['correlation'].to_numpy(),
+                                  self.get_expected_neighbours(user_id, 5).to_numpy()))
+
+  def test_tiled_build(self):
+    neighbour_index = NeighbourIndex.from_correlation_matrix(self.correlation_matrix, 10)
+    tiled_neighbour_index = NeighbourIndex.from_sparse_pearson(self.sparse_pearson, 10, memory_budget=10000)
+    for user_id in [1, 8, 29]:
+      self.assertTrue(np.allclose(neighbour_index.get_neighbours(user_id)['correlation'].to_numpy(),
+                                  tiled_neighbour_index.get_neighbours(user_id)['correlation'].to_numpy()))
+
+  def test_unsorted_user_ids(self):
+    user_ids = pd.Index([30, 10, 20], name='user_id')
+    correlation_matrix = pd.DataFrame([[1.0, 0.9, 0.2], [0.9, 1.0, 0.5], [0.2, 0.5, 1.0]], index=user_ids,
+                                      columns=user_ids.copy())
+    neighbour_index = NeighbourIndex.from_correlation_matrix(correlation_matrix, 2)
+    self.assertEqual(neighbour_index.get_neighbours(30).index.tolist(), [10, 20])
+    self.assertEqual(neighbour_index.get_neighbours(10)['correlation'].tolist(), [0.9, 0.5])
+    with self.assertRaises(UnsortedUserIdsException):
+      NeighbourIndex(user_ids.to_numpy(), np.zeros((3, 1), dtype=np.int32), np.zeros((3, 1)))
+
+  def test_unknown_user(self):
+    neighbour_index = NeighbourIndex.from_sparse_pearson(self.sparse_pearson, 10)
+    self.assertTrue(neighbour_index.get_neighbours(999).empty)
+    self.assertEqual(neighbour_index.get_k(), 10)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,21 +1,27 @@
+from internal.platform.dataset_operators.rating_index import RatingIndex
+from internal.platform.dataset_operators.user_histories import UserHistories
+from internal.platform.datasets.compact_ratings import CompactRatings
 from internal.platform.datasets.dataset import Dataset
 import pandas as pd
 
 class DatasetOptimizer:
-  def __init__(self, dataset:Dataset, is_active=True):
+  def __init__(self, dataset:Dataset, is_active=True, use_compact_ratings=False):
     if dataset is None:
       raise InvalidDatasetOptimizerInput
     self.__dataset = dataset
     self.__is_active = is_active
+    self.__use_compact_ratings = use_compact_ratings
     self.__ratings = pd.DataFrame()
     self.__movies  = pd.DataFrame()
     self.__movie_ratings = pd.DataFrame()
+    self.__rating_index = None
+    self.__user_histories = None
 
   def get_ratings(self):
     if not self.is_optimizer_active():
-      return self.__dataset.load_ratings()
+      return self.__load_ratings()
     if self.__ratings.empty:
-      self.__ratings = self.__dataset.load_ratings()
+      self.__ratings = self.__load_ratings()
     return self.__ratings
 
   def get_movies(self):
@@ -29,9 +35,29 @@ class DatasetOptimizer:
     if not self.is_optimizer_active():
       return self.__dataset.load_movie_ratings()
     if self.__movie_ratings.empty:
-      self.__movie_ratings = pd.merge(self.get_ratings(), self.get_movies(), on='item_id')
+      self.__movie_ratings = pd.merge(CompactRatings.as_dataframe(self.get_ratings()), self.get_movies(), on='item_id')
     return self.__movie_ratings
 
+  def get_rating_index(self):
+    if not self.is_optimizer_active():
+      return RatingIndex.from_ratings(self.get_ratings())
+    if self.__rating_index is None:
+      self.__rating_index = RatingIndex.from_ratings(self.get_ratings())
+    return self.__rating_index
+
+  def get_user_histories(self):
+    if not self.is_optimizer_active():
+      return UserHistories(self.get_ratings(), self.get_rating_index())
+    if self.__user_histories is None:
+      self.__user_histories = UserHistories(self.get_ratings(), self.get_rating_index())
+    return self.__user_histories
+
+  def get_user_id_mapping(self):
+    return self.get_rating_index().get_user_mapping()
+
+  def get_item_id_mapping(self):
+    return self.get_rating_index().get_item_mapping()
+
   def get_dataset(self):
     return self.__dataset
 
@@ -40,9 +66,19 @@ class DatasetOptimizer:
       self.__movies = pd.DataFrame()
     if clean_ratings:
       self.__ratings = pd.DataFrame()
+      self.__rating_index = None
+      self.__user_histories = None
     if clean_movie_ratings:
       self.__movie_ratings = pd.DataFrame()
 
+  def is_using_compact_ratings(self):
+    return self.__use_compact_ratings
+
+  def __load_ratings(self):
+    if self.__use_compact_ratings:
+      return self.__dataset.load_compact_ratings()
+    return self.__dataset.load_ratings()
+
   def is_optimizer_active(self):
     return self.__is_active
 
@@ -0,0 +1,89 @@
+import pandas as pd
+from internal.platform.constraints.interval import Interval
+from internal.platform.datasets.compact_ratings import CompactRatings
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex
+from internal.platform.similarity.mutual_information import MutualInformation
+from internal.platform.similarity.pearson import TargetUserNotFoundException
+from internal.platform.optimizer.dataset_optimizer import DatasetOptimizer
+from internal.platform.similarity.correlation_store import CorrelationStore
+
+
+class OptimizedMutualInformation:
+  """
+  Mutual information as a precomputed similarity, cached like OptimizedPearsonSimilarity.
+
+  The user x user mutual information matrix, or the top k neighbour index, is built once in bulk on the ratings of
+  the interval and every later neighbour query is a lookup, so Prediction and KNearestNeighbours use it like Pearson.
+  """
+
+  def __init__(self, dataset_optimizer: DatasetOptimizer, interval: Interval = None, is_active=True,
+               memory_budget=1 << 30, correlation_store: CorrelationStore = None):
+    self.__mutual_information = MutualInformation(dataset_optimizer)
+    self.__interval = interval
+    self.__is_active = is_active
+    self.__memory_budget = memory_budget
+    self.__user_user_mutual_information_matrix = pd.DataFrame()
+    self.__neighbour_index = None
+    self.__neighbour_index_k = 0
+    self.__correlation_store = correlation_store
+    self.__ratings_fingerprint = None
+
+  def get_user_user_mutual_information_matrix(self) -> pd.DataFrame:
+    if not self.is_optimizer_active():
+      return self.__create_user_user_mutual_information_matrix()
+    if self.__user_user_mutual_information_matrix.empty:
+      self.__user_user_mutual_information_matrix = self.__create_user_user_mutual_information_matrix()
+    return self.__user_user_mutual_information_matrix
+
+  def get_neighbours(self, user_id: int) -> pd.DataFrame:
+    target_user_mutual_infos = self.get_user_user_mutual_information_matrix().get(user_id)
+    if target_user_mutual_infos is None:
+      raise TargetUserNotFoundException
+    return pd.DataFrame({'correlation': target_user_mutual_infos.dropna()})
+
+  def get_neighbour_index(self, k: int):
+    """ Top k neighbour index, built from the cached mutual information matrix when it is already computed """
+    if not self.is_optimizer_active():
+      return self.__create_neighbour_index(k)
+    if self.__neighbour_index is None or self.__neighbour_index_k < k:
+      self.__neighbour_index = self.__create_neighbour_index(k)
+      self.__neighbour_index_k = k
+    return self.__neighbour_index
+
+  def get_dataset_optimizer(self):
+    return self.__mutual_information.get_dataset_optimizer()
+
+  def get_interval(self) -> Interval:
+    return self.__interval
+
+  def is_optimizer_active(self):
+    return self.__is_active
+
+  def __create_user_user_mutual_information_matrix(self):
+    if self.__correlation_store is None:
+      return self.__mutual_information.get_user_user_mutual_information_matrix(self.__interval)
+    matrix = self.__correlation_store.load_correlation_matrix(*self.__get_store_key(), self.__interval)
+    if matrix is None:
+      matrix = self.__mutual_information.get_user_user_mutual_information_matrix(self.__interval)
+      self.__correlation_store.save_correlation_matrix(matrix, *self.__get_store_key(), self.__interval)
+    return matrix
+
+  def __create_neighbour_index(self, k):
+    if self.__correlation_store is not None:
+      neighbour_index = self.__correlation_store.load_neighbour_index(*self.__get_store_key(), k, self.__interval)
+      if neighbour_index is not None:
+        return neighbour_index
+    if not self.__user_user_mutual_information_matrix.empty:
+      neighbour_index = NeighbourIndex.from_correlation_matrix(self.__user_user_mutual_information_matrix, k)
+    else:
+      neighbour_index = self.__mutual_information.get_neighbour_index(k, self.__interval, self.__memory_budget)
+    if self.__correlation_store is not None:
+      self.__correlation_store.save_neighbour_index(neighbour_index, *self.__get_store_key(), self.__interval)
+    return neighbour_index
+
+  def __get_store_key(self):
+    """ (fingerprint, method, min_common_elements) of the mutual information in the correlation store """
+    if self.__ratings_fingerprint is None:
+      ratings = CompactRatings.as_dataframe(self.get_dataset_optimizer().get_ratings())
+      self.__ratings_fingerprint = CorrelationStore.fingerprint(ratings)
+    return self.__ratings_fingerprint, 'mutual_information', 1
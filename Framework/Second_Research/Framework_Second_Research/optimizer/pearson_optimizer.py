@@ -1,17 +1,37 @@
+import numpy as np
 import pandas as pd
 from internal.platform.similarity.pearson import PearsonSimilarity
 from internal.platform.optimizer.dataset_optimizer import DatasetOptimizer
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex
+from internal.platform.similarity.correlation_store import CorrelationStore
+from internal.platform.similarity.co_rating_counts import CoRatingCounts
+from internal.platform.similarity.significance_weighting import SignificanceWeighting
 
 
 class OptimizedPearsonSimilarity:
-  def __init__(self, dataset_optimizer: DatasetOptimizer, min_common_elements: int, is_active=True):
+  def __init__(self, dataset_optimizer: DatasetOptimizer, min_common_elements: int, is_active=True,
+               tiled_result_directory=None, memory_budget=1 << 30, top_k=None, min_correlation=None,
+               correlation_store: CorrelationStore = None, co_rating_counts: CoRatingCounts = None):
     self.__pearson_similarity = PearsonSimilarity(dataset_optimizer, min_common_elements)
     self.__user_user_correlation_matrix = pd.DataFrame()
     self.__is_active = is_active
+    self.__tiled_result_directory = tiled_result_directory
+    self.__memory_budget = memory_budget
+    self.__top_k = top_k
+    self.__min_correlation = min_correlation
+    self.__neighbour_index = None
+    self.__neighbour_index_k = 0
+    self.__correlation_store = correlation_store
+    self.__ratings_fingerprint = None
+    self.__co_rating_counts = co_rating_counts
+    self.__n_common_matrix = None
+    self.__weighted_correlation_matrices = dict()
+    self.__weighted_neighbour_indexes = dict()
 
-  def get_user_user_correlation_matrix(self) -> pd.DataFrame:
+  def get_user_user_correlation_matrix(self):
+    """ Full correlation DataFrame, or the tiled top k / thresholded result when a tiled result directory is set """
     if not self.is_optimizer_active():
-      return self.__pearson_similarity.get_user_user_correlation_matrix()
+      return self.__create_user_correlations()
     if not self.__is_user_user_correlations_cached():
       self.__cache_user_correlations()
     return self.__get_cached_user_correlations()
@@ -19,14 +39,93 @@ class OptimizedPearsonSimilarity:
   def get_neighbours(self, user_id: int) -> pd.DataFrame:
     return self.__pearson_similarity.get_neighbours(user_id, self.get_user_user_correlation_matrix())
 
+  def get_neighbour_index(self, k: int):
+    """ Top k neighbour index, built from the cached correlation matrix when it is already computed """
+    if not self.is_optimizer_active():
+      return self.__create_neighbour_index(k)
+    if self.__neighbour_index is None or self.__neighbour_index_k < k:
+      self.__neighbour_index = self.__create_neighbour_index(k)
+      self.__neighbour_index_k = k
+    return self.__neighbour_index
+
+  def get_weighted_correlation_matrix(self, weighting, parameter=None) -> pd.DataFrame:
+    """
+    Correlation matrix with a significance weighting applied in bulk, see SignificanceWeighting.weight_correlations.
+    Cached per weighting and parameter, so a sweep over alpha or beta costs one matrix transform per value.
+    """
+    key = (weighting, parameter)
+    if not self.is_optimizer_active():
+      return self.__create_weighted_correlation_matrix(weighting, parameter)
+    if key not in self.__weighted_correlation_matrices:
+      self.__weighted_correlation_matrices[key] = self.__create_weighted_correlation_matrix(weighting, parameter)
+    return self.__weighted_correlation_matrices[key]
+
+  def get_weighted_neighbour_index(self, k: int, weighting, parameter=None) -> NeighbourIndex:
+    key = (weighting, parameter)
+    if not self.is_optimizer_active():
+      return NeighbourIndex.from_correlation_matrix(self.get_weighted_correlation_matrix(weighting, parameter), k)
+    if key not in self.__weighted_neighbour_indexes or self.__weighted_neighbour_indexes[key].get_k() < k:
+      weighted_correlation_matrix = self.get_weighted_correlation_matrix(weighting, parameter)
+      self.__weighted_neighbour_indexes[key] = NeighbourIndex.from_correlation_matrix(weighted_correlation_matrix, k)
+    return self.__weighted_neighbour_indexes[key]
+
   def get_dataset_optimizer(self):
     return self.__pearson_similarity.get_dataset_optimizer()
 
   def is_optimizer_active(self):
     return self.__is_active
 
+  def is_tiled(self):
+    return self.__tiled_result_directory is not None
+
+  def __create_user_correlations(self):
+    if self.is_tiled():
+      return self.__pearson_similarity.get_tiled_user_user_correlations(self.__tiled_result_directory,
+                                                                        self.__memory_budget,
+                                                                        self.__top_k, self.__min_correlation)
+    if self.__correlation_store is None:
+      return self.__pearson_similarity.get_user_user_correlation_matrix()
+    user_user_correlation_matrix = self.__correlation_store.load_correlation_matrix(*self.__get_store_key())
+    if user_user_correlation_matrix is None:
+      user_user_correlation_matrix = self.__pearson_similarity.get_user_user_correlation_matrix()
+      self.__correlation_store.save_correlation_matrix(user_user_correlation_matrix, *self.__get_store_key())
+    return user_user_correlation_matrix
+
+  def __create_weighted_correlation_matrix(self, weighting, parameter):
+    if self.is_tiled():
+      raise TiledCorrelationsNotWeightedException
+    user_user_correlation_matrix = self.get_user_user_correlation_matrix()
+    if self.__n_common_matrix is None:
+      if self.__co_rating_counts is None:
+        self.__co_rating_counts = CoRatingCounts(self.get_dataset_optimizer().get_ratings())
+      self.__n_common_matrix = self.__co_rating_counts.get_n_common_matrix(user_user_correlation_matrix.index)
+    correlations = SignificanceWeighting.weight_correlations(user_user_correlation_matrix.to_numpy(dtype=np.float64),
+                                                             self.__n_common_matrix, weighting, parameter)
+    return pd.DataFrame(correlations, index=user_user_correlation_matrix.index,
+                        columns=user_user_correlation_matrix.columns)
+
+  def __create_neighbour_index(self, k):
+    if self.__correlation_store is not None:
+      neighbour_index = self.__correlation_store.load_neighbour_index(*self.__get_store_key(), k)
+      if neighbour_index is not None:
+        return neighbour_index
+    if self.__is_user_user_correlations_cached() and not self.is_tiled():
+      neighbour_index = NeighbourIndex.from_correlation_matrix(self.__get_cached_user_correlations(), k)
+    else:
+      neighbour_index = self.__pearson_similarity.get_neighbour_index(k, self.__memory_budget)
+    if self.__correlation_store is not None:
+      self.__correlation_store.save_neighbour_index(neighbour_index, *self.__get_store_key())
+    return neighbour_index
+
+  def __get_store_key(self):
+    """ (fingerprint, method, min_common_elements) of the correlations in the correlation store """
+    if self.__ratings_fingerprint is None:
+      movie_ratings = self.get_dataset_optimizer().get_movie_ratings()
+      self.__ratings_fingerprint = CorrelationStore.fingerprint(movie_ratings)
+    return self.__ratings_fingerprint, 'pearson', self.__pearson_similarity.min_common_elements
+
   def __cache_user_correlations(self):
-    self.__user_user_correlation_matrix = self.__pearson_similarity.get_user_user_correlation_matrix()
+    self.__user_user_correlation_matrix = self.__create_user_correlations()
 
   def __get_cached_user_correlations(self):
     return self.__user_user_correlation_matrix
@@ -34,3 +133,6 @@ class OptimizedPearsonSimilarity:
   def __is_user_user_correlations_cached(self):
     return not self.__user_user_correlation_matrix.empty
 
+
+class TiledCorrelationsNotWeightedException(Exception):
+  pass
@@ -6,13 +6,16 @@ class Prediction:
   def __init__(self, similarity_method, k: int = 10):
     self.__similarity_method = similarity_method
     self.__dataset_optimizer = self.__similarity_method.get_dataset_optimizer()
-    self.__dataset_user_operator = DatasetUserOperator(self.__dataset_optimizer.get_ratings())
+    self.__dataset_user_operator = DatasetUserOperator(self.__dataset_optimizer.get_ratings(),
+                                                       self.__dataset_optimizer.get_rating_index())
     self.__k = k
+    self.__neighbour_index = None
 
   def predict(self, user_id: int, movie_id: int) -> float:
     if self.__dataset_user_operator.get_user_rating_record(user_id, movie_id).empty:
       return 0.0
-    target_user_k_nearest_neighbors = KNearestNeighbours(self.__similarity_method, self.__k)
+    target_user_k_nearest_neighbors = KNearestNeighbours(self.__similarity_method, self.__k,
+                                                         neighbour_index=self.get_neighbour_index())
     user_k_nearest_neighbours = target_user_k_nearest_neighbors.get_k_nearest_neighbours(user_id)
     if user_k_nearest_neighbours.empty:
       return 0.0
@@ -20,11 +23,18 @@ class Prediction:
 
   def predict_using_given_neighbours(self, user_id: int, movie_id: int, neighbours,
                                      neighbours_corr_column_name='correlation') -> float:
-    user_k_nearest_neighbours = KNearestNeighbours.get_k_nearest(neighbours, self.__k, neighbours_corr_column_name)
+    user_k_nearest_neighbours = KNearestNeighbours.get_k_nearest(neighbours, self.__k, neighbours_corr_column_name,
+                                                                 user_id)
     if user_k_nearest_neighbours.empty:
       return 0.0
     return self.calculate_neighbour_weighted_avg_rating(movie_id, user_id, user_k_nearest_neighbours)
 
+  def get_neighbour_index(self):
+    """ Top k neighbour index of the similarity method, built once, None if the method has no neighbour index """
+    if self.__neighbour_index is None and hasattr(self.__similarity_method, 'get_neighbour_index'):
+      self.__neighbour_index = self.__similarity_method.get_neighbour_index(self.__k)
+    return self.__neighbour_index
+
   def calculate_neighbour_weighted_avg_rating(self, movie_id, user_id, user_k_nearest_neighbours, corr_column_name='correlation') -> float:
     avg_user_rating = self.__dataset_user_operator.get_user_avg(user_id)
     sum_of_weights, weighted_sum = self.__take_weighted_neighbour_rating_average(movie_id, user_k_nearest_neighbours, corr_column_name)
@@ -15,7 +15,8 @@ class StaticTimebinPrediction(Prediction):
                                                   neighbour_timebin_size_increment, min_common_between_users)
     super().__init__(self.__timebin_similarity, k)
     self.__optimized_dataset = optimized_dataset
-    self.__dataset_user_operator = DatasetUserOperator(optimized_dataset.get_ratings())
+    self.__dataset_user_operator = DatasetUserOperator(optimized_dataset.get_ratings(),
+                                                       optimized_dataset.get_rating_index())
     self.__k = k
     self.__global_timebin_size = global_timebin_size
 
@@ -27,7 +28,7 @@ class StaticTimebinPrediction(Prediction):
     corr_filtered_neighbours = MinCorrelationFilter.filter(neighbours,
                                                            minimum_correlation=0.0,
                                                            correlation_column_name='pearson_corr')
-    knn = KNearestNeighbours.get_k_nearest(corr_filtered_neighbours, self.__k, 'pearson_corr')
+    knn = KNearestNeighbours.get_k_nearest(corr_filtered_neighbours, self.__k, 'pearson_corr', user_id)
     print(knn)
     prediction = self.calculate_neighbour_weighted_avg_rating(movie_id, user_id, knn, corr_column_name='pearson_corr')
     actual = self.__dataset_user_operator.get_user_rating_value(user_id, movie_id)
@@ -42,7 +43,8 @@ class DynamicTimebinPrediction(Prediction):
                                                   neighbour_timebin_size_increment, min_common_between_users)
     super().__init__(self.__timebin_similarity, k)
     self.__optimized_dataset = optimized_dataset
-    self.__dataset_user_operator = DatasetUserOperator(optimized_dataset.get_ratings())
+    self.__dataset_user_operator = DatasetUserOperator(optimized_dataset.get_ratings(),
+                                                       optimized_dataset.get_rating_index())
     self.__k = k
 
   def get_dynamic_timebin_size(self, user_id:int, movie_id:int):
@@ -58,7 +60,7 @@ class DynamicTimebinPrediction(Prediction):
     corr_filtered_neighbours = MinCorrelationFilter.filter(neighbours,
                                                            minimum_correlation=0.0,
                                                            correlation_column_name='pearson_corr')
-    knn = KNearestNeighbours.get_k_nearest(corr_filtered_neighbours, 20, 'pearson_corr')
+    knn = KNearestNeighbours.get_k_nearest(corr_filtered_neighbours, 20, 'pearson_corr', user_id)
     print(knn)
     prediction = self.calculate_neighbour_weighted_avg_rating(movie_id, user_id, knn, corr_column_name='pearson_corr')
     actual = self.__dataset_user_operator.get_user_rating_value(user_id, movie_id)
@@ -0,0 +1,70 @@
+import numpy as np
+import scipy.sparse as sparse
+
+from internal.platform.constraints.interval import Interval
+from internal.platform.dataset_operators.dataset_operator import DatasetOperator
+from internal.platform.datasets.compact_ratings import CompactRatings
+from internal.platform.datasets.id_mapping import IdMapping
+
+
+class CoRatingCounts:
+  """
+  Number of items co-rated by pairs of users, from the sparse binary item x user rating matrix.
+
+  Nothing of size users x users is kept: the n_common of a user with every other user is a single sparse column
+  product, reused while the same user is queried, and a dense block is only built for the users asked for by
+  get_n_common_matrix. Users outside of the ratings (or of the interval) have no common items.
+  """
+
+  def __init__(self, ratings, interval: Interval = None):
+    ratings = CompactRatings.as_dataframe(DatasetOperator.apply_time_constraint(ratings, interval))
+    item_ids = ratings['item_id'] if 'item_id' in ratings.columns else ratings.index
+    self.__user_mapping = IdMapping(ratings['user_id'].to_numpy())
+    item_mapping = IdMapping(np.asarray(item_ids))
+    user_positions = self.__user_mapping.get_positions(ratings['user_id'].to_numpy())
+    item_positions = item_mapping.get_positions(np.asarray(item_ids))
+    self.__is_rated = sparse.csc_matrix((np.ones(len(user_positions)), (item_positions, user_positions)),
+                                        shape=(len(item_mapping), len(self.__user_mapping)))
+    self.__is_rated.data[:] = 1  # Repeated ratings of an item count once
+    self.__last_user_position, self.__last_user_counts = -1, None
+
+  def get_user_mapping(self) -> IdMapping:
+    return self.__user_mapping
+
+  def get_counts(self) -> np.ndarray:
+    """ Dense n_common of all user pairs, in the order of the user mapping, only for small datasets """
+    return self.get_n_common_matrix(self.__user_mapping.get_ids())
+
+  def get_n_common(self, user1_id: int, user2_id: int) -> int:
+    user1_position = self.__user_mapping.get_position(user1_id)
+    user2_position = self.__user_mapping.get_position(user2_id)
+    if user1_position < 0 or user2_position < 0:
+      return 0
+    return len(np.intersect1d(self.__get_item_positions(user1_position), self.__get_item_positions(user2_position),
+                              assume_unique=True))
+
+  def get_n_common_list(self, user_id: int, other_user_ids) -> np.ndarray:
+    """ n_common of the user with each of the other users """
+    other_positions = self.__user_mapping.get_positions(np.asarray(other_user_ids))
+    user_position = self.__user_mapping.get_position(user_id)
+    if user_position < 0:
+      return np.zeros(len(other_positions), dtype=np.int32)
+    return np.where(other_positions >= 0, self.__get_user_counts(user_position)[other_positions], 0)
+
+  def get_n_common_matrix(self, user_ids) -> np.ndarray:
+    """ n_common of every pair of the given users, rows and columns in the order of user_ids """
+    positions = self.__user_mapping.get_positions(np.asarray(user_ids))
+    is_rated = self.__is_rated[:, np.maximum(positions, 0)]
+    n_common = (is_rated.T @ is_rated).toarray().astype(np.int32)
+    n_common[positions < 0] = 0
+    n_common[:, positions < 0] = 0
+    return n_common
+
+  def __get_user_counts(self, user_position) -> np.ndarray:
+    if user_position != self.__last_user_position:
+      user_counts = self.__is_rated[:, [user_position]].T @ self.__is_rated
+      self.__last_user_position, self.__last_user_counts = user_position, user_counts.toarray()[0].astype(np.int32)
+    return self.__last_user_counts
+
+  def __get_item_positions(self, user_position) -> np.ndarray:
+    return self.__is_rated.indices[self.__is_rated.indptr[user_position]:self.__is_rated.indptr[user_position + 1]]
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.constraints.interval import Interval
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex
+
+
+class CorrelationStore:
+  """
+  Persistent cache of user-user correlation matrices and neighbour indexes, shared by later runs.
+
+  Every entry is a directory keyed by the similarity method, the fingerprint of the ratings, the interval and
+  min_common_elements. Arrays are standalone .npy files which are memory mapped on load, so a matrix computed once is
+  read back in milliseconds. Entries are written into a temporary directory first and renamed, like dataset snapshots.
+  """
+
+  format_version = 1
+  meta_file_name = 'meta.json'
+
+  def __init__(self, store_directory):
+    self.store_directory = store_directory
+
+  def load_correlation_matrix(self, fingerprint, method, min_common_elements, interval: Interval = None):
+    entry_path = self.get_entry_path(fingerprint, method, min_common_elements, interval, 'matrix')
+    if not os.path.isfile(os.path.join(entry_path, CorrelationStore.meta_file_name)):
+      return None
+    user_ids = pd.Index(np.load(os.path.join(entry_path, 'user_ids.npy')), name='user_id')
+    correlations = np.load(os.path.join(entry_path, 'correlations.npy'), mmap_mode='r')
+    return pd.DataFrame(correlations, index=user_ids, columns=user_ids.copy(), copy=False)
+
+  def save_correlation_matrix(self, user_user_correlation_matrix: pd.DataFrame, fingerprint, method,
+                              min_common_elements, interval: Interval = None):
+    entry_path = self.get_entry_path(fingerprint, method, min_common_elements, interval, 'matrix')
+    self.__publish(entry_path, {
+      'user_ids.npy': user_user_correlation_matrix.columns.to_numpy(),
+      'correlations.npy': user_user_correlation_matrix.to_numpy(dtype=np.float64)})
+
+  def load_neighbour_index(self, fingerprint, method, min_common_elements, k: int, interval: Interval = None):
+    entry_path = self.get_entry_path(fingerprint, method, min_common_elements, interval, f"neighbours_{k}")
+    if not os.path.isfile(os.path.join(entry_path, CorrelationStore.meta_file_name)):
+      return None
+    return NeighbourIndex(np.load(os.path.join(entry_path, 'user_ids.npy')),
+                          np.load(os.path.join(entry_path, 'neighbours.npy'), mmap_mode='r'),
+                          np.load(os.path.join(entry_path, 'correlations.npy'), mmap_mode='r'))
+
+  def save_neighbour_index(self, neighbour_index: NeighbourIndex, fingerprint, method, min_common_elements,
+                           interval: Interval = None):
+    entry_path = self.get_entry_path(fingerprint, method, min_common_elements, interval,
+                                     f"neighbours_{neighbour_index.get_k()}")
+    self.__publish(entry_path, {
+      'user_ids.npy': neighbour_index.get_user_mapping().get_ids(),
+      'neighbours.npy': neighbour_index.get_neighbour_array(),
+      'correlations.npy': neighbour_index.get_correlation_array()})
+
+  def get_entry_path(self, fingerprint, method, min_common_elements, interval, kind):
+    beginning, end = (None, None) if interval is None else interval.get_interval()
+    key = f"{CorrelationStore.format_version}|{fingerprint}|{method}|{min_common_elements}|{beginning}|{end}|{kind}"
+    return os.path.join(self.store_directory, f"{method}_{kind}_{hashlib.sha1(key.encode('utf-8')).hexdigest()}")
+
+  @staticmethod
+  def fingerprint(ratings: pd.DataFrame) -> str:
+    """ Content hash of the user ids, item ids, ratings and timestamps that correlations are computed from """
+    item_ids = ratings['item_id'] if 'item_id' in ratings.columns else ratings.index
+    columns = [ratings['user_id'], item_ids, ratings['rating']]
+    if 'timestamp' in ratings.columns:
+      columns.append(ratings['timestamp'])
+    digest = hashlib.sha1()
+    for column in columns:
+      array = np.ascontiguousarray(np.asarray(column))
+      digest.update(f"{array.dtype.str}|{len(array)}".encode('utf-8'))
+      digest.update(array.view(np.uint8))
+    return digest.hexdigest()
+
+  def __publish(self, entry_path, arrays):
+    if os.path.isdir(entry_path):
+      return
+    os.makedirs(self.store_directory, exist_ok=True)
+    # Write into a temporary directory first so that concurrent readers never see half written entries
+    temp_path = tempfile.mkdtemp(dir=self.store_directory)
+    for file_name, array in arrays.items():
+      np.save(os.path.join(temp_path, file_name), np.asarray(array))
+    with open(os.path.join(temp_path, CorrelationStore.meta_file_name), 'w') as meta_file:
+      json.dump({'format_version': CorrelationStore.format_version, 'files': list(arrays)}, meta_file)
+    try:
+      os.rename(temp_path, entry_path)
+    except OSError:
+      # Another process has published the same entry in the meantime
+      shutil.rmtree(temp_path, ignore_errors=True)
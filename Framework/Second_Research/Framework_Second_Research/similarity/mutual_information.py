@@ -1,8 +1,13 @@
-import math
+import numpy as np
+import pandas as pd
 
+from internal.platform.constraints.interval import Interval
+from internal.platform.dataset_operators.dataset_operator import DatasetOperator
 from internal.platform.dataset_operators.dataset_user_operator import DatasetUserOperator
+from internal.platform.datasets.compact_ratings import CompactRatings
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex
 from internal.platform.optimizer.dataset_optimizer import DatasetOptimizer
-import pandas as pd
+from internal.platform.similarity.sparse_mutual_information import SparseMutualInformation
 
 
 class MutualInformation:
@@ -10,18 +15,31 @@ class MutualInformation:
     self.dataset_optimizer = dataset_optimizer
     dataset = self.dataset_optimizer.get_dataset()
     self.lowest_rating, self.highest_rating, self.rating_increment = dataset.get_dataset_rating_range()
-    self.dataset_user_operator = DatasetUserOperator(self.dataset_optimizer.get_ratings())
+    self.n_rating_codes = int(round((self.highest_rating - self.lowest_rating) / self.rating_increment)) + 1
+    self.rating_index = self.dataset_optimizer.get_rating_index()
+    self.dataset_user_operator = DatasetUserOperator(self.dataset_optimizer.get_ratings(), self.rating_index)
 
   def get_neighbours(self, user_id, movie_id):
-    neighbour_mutual_info = list()
-    for dataset_user in self.dataset_user_operator.get_all_users():
-      rating = self.dataset_user_operator.get_user_rating_value(dataset_user, movie_id)
-      if rating != 0:
-        corr = self.mutual_information(user_id, dataset_user)
-        if corr != 0:
-          # print(f"rating={rating} corr={corr}")
-          neighbour_mutual_info.append((dataset_user, corr))
-    return self.__convert_mutual_info_list_to_df(neighbour_mutual_info)
+    # Only the raters of the movie can be neighbours, their mutual information is computed in one pass
+    raters = self.rating_index.get_item_raters(movie_id)
+    mutual_infos = self.get_mutual_informations(user_id, raters)
+    is_neighbour = mutual_infos != 0
+    return self.__convert_mutual_info_list_to_df(list(zip(raters[is_neighbour], mutual_infos[is_neighbour])))
+
+  def get_user_user_mutual_information_matrix(self, interval: Interval = None) -> pd.DataFrame:
+    """ Mutual information of all user pairs in bulk, only on the ratings in the interval if one is given """
+    return self.get_sparse_mutual_information(interval).get_correlation_matrix()
+
+  def get_neighbour_index(self, k: int, interval: Interval = None, memory_budget=1 << 30) -> NeighbourIndex:
+    return NeighbourIndex.from_sparse_pearson(self.get_sparse_mutual_information(interval), k, memory_budget)
+
+  def get_sparse_mutual_information(self, interval: Interval = None) -> SparseMutualInformation:
+    ratings = DatasetOperator.apply_time_constraint(self.dataset_optimizer.get_ratings(), interval)
+    return SparseMutualInformation(CompactRatings.as_dataframe(ratings), self.lowest_rating, self.highest_rating,
+                                   self.rating_increment)
+
+  def get_dataset_optimizer(self):
+    return self.dataset_optimizer
 
   @staticmethod
   def __convert_mutual_info_list_to_df(mutual_info_list):
@@ -32,62 +50,56 @@ class MutualInformation:
     mi_df.set_index('user_id', inplace=True)
     return mi_df
 
-  @staticmethod
-  def get_n_rating(common_ratings, is_first_user: bool, rating):
-    if is_first_user:
-      return common_ratings.loc[common_ratings['rating_x'] == rating].count()[0]
-    else:
-      return common_ratings.loc[common_ratings['rating_y'] == rating].count()[0]
+  def mutual_information(self, user1_id, user2_id):
+    return float(self.get_mutual_informations(user1_id, np.asarray([user2_id]))[0])
 
-  @staticmethod
-  def get_n_rating_pair(common_ratings, user1_rating, user2_rating):
-    return common_ratings.loc[(common_ratings['rating_x'] == user1_rating) &
-                              (common_ratings['rating_y'] == user2_rating)].count()[0]
+  def get_mutual_informations(self, user_id, other_user_ids) -> np.ndarray:
+    """ Mutual information of the user with each of the other users, 0 for the ones without common ratings """
+    n_codes = self.n_rating_codes
+    user_items, user_codes = self.__get_user_rating_codes(user_id)
+    item_codes = np.full(len(self.rating_index.get_item_mapping()), -1, dtype=np.int64)
+    item_codes[user_items] = user_codes
+    others, other_items, other_ratings = self.rating_index.get_users_item_positions_and_ratings(other_user_ids)
+    is_common = item_codes[other_items] >= 0
+    # Joint histograms of the rating pairs on the common items of every other user, in a single bincount
+    pair_codes = (others[is_common] * n_codes + item_codes[other_items[is_common]]) * n_codes
+    pair_codes += self.get_rating_codes(other_ratings[is_common])
+    joint_histograms = np.bincount(pair_codes, minlength=len(other_user_ids) * n_codes ** 2)
+    return MutualInformation.mutual_information_from_histograms(joint_histograms.reshape(-1, n_codes, n_codes))
 
-  def mutual_information(self, user1_id, user2_id):
-    ratings = self.dataset_optimizer.get_ratings()
-    common_ratings = pd.merge(ratings.loc[(ratings['user_id'] == user1_id)],
-                              ratings.loc[(ratings['user_id'] == user2_id)],
-                              on="item_id")
-    n_common = common_ratings.count()[0]
-    if n_common == 0:
-      return 0.0
-    # Calculate entropies
-    user1_entropy, n1 = self.user_entropy(common_ratings, True, n_common)
-    user2_entropy, n2 = self.user_entropy(common_ratings, False, n_common)
-    user1_and_2_entropy, n1_2 = self.cross_entropy(common_ratings, n_common)
+  @staticmethod
+  def mutual_information_from_histograms(joint_histograms: np.ndarray) -> np.ndarray:
+    """ Bias corrected mutual information of each n_codes x n_codes joint rating histogram """
+    n_common = joint_histograms.sum(axis=(1, 2))
+    # Calculate entropies, the marginal histograms are the row and column sums of the joint histograms
+    user1_entropy, n1 = MutualInformation.entropy(joint_histograms.sum(axis=2), n_common)
+    user2_entropy, n2 = MutualInformation.entropy(joint_histograms.sum(axis=1), n_common)
+    user1_and_2_entropy, n1_2 = MutualInformation.entropy(joint_histograms.reshape(len(joint_histograms), -1),
+                                                          n_common)
 
     # Handle bias of the entropy values and calculate mutual information
+    n_common = np.maximum(n_common, 1)
     I = user1_entropy + ((n1 - 1) / (2 * n_common))  # User1 entropy
     I += user2_entropy + ((n2 - 1) / (2 * n_common))  # Plus User2 entropy
     I -= user1_and_2_entropy + ((n1_2 - 1) / (2 * n_common))  # Plus Cross entropy
-    return I
-
-  def user_entropy(self, common_ratings, is_first_user: bool, n_common):
-    entropy = 0.0
-    rating = self.lowest_rating
-    n = 0
-    while rating <= self.highest_rating:
-      n_rating = self.get_n_rating(common_ratings, is_first_user, rating)
-      Pi = n_rating / n_common
-      if Pi > 0:
-        entropy -= Pi * math.log(Pi)
-        n += 1
-      rating += self.rating_increment
-    return entropy, n
-
-  def cross_entropy(self, common_ratings, n_common):
-    entropy = 0.0
-    user1_rating = self.lowest_rating
-    n = 0
-    while user1_rating <= self.highest_rating:
-      user2_rating = self.lowest_rating
-      while user2_rating <= self.highest_rating:
-        n_rating = self.get_n_rating_pair(common_ratings, user1_rating, user2_rating)
-        Pi = n_rating / n_common
-        if Pi > 0:
-          entropy -= Pi * math.log(Pi)
-          n += 1
-        user2_rating += self.rating_increment
-      user1_rating += self.rating_increment
-    return entropy, n
+    return np.where(n1_2 > 0, I, 0.0)
+
+  @staticmethod
+  def entropy(histograms: np.ndarray, n_common):
+    """ Entropies of the histograms along the last axis and the number of their non-empty bins """
+    probabilities = histograms / np.expand_dims(np.maximum(n_common, 1), -1)
+    log_probabilities = np.log(np.where(probabilities > 0, probabilities, 1))
+    return -np.sum(probabilities * log_probabilities, axis=-1), np.count_nonzero(histograms, axis=-1)
+
+  def get_rating_codes(self, ratings) -> np.ndarray:
+    """ Ratings as 0, 1, ... n_rating_codes - 1 from the lowest to the highest rating of the dataset """
+    return MutualInformation.to_rating_codes(ratings, self.lowest_rating, self.rating_increment)
+
+  @staticmethod
+  def to_rating_codes(ratings, lowest_rating, rating_increment) -> np.ndarray:
+    codes = (np.asarray(ratings, dtype=np.float64) - lowest_rating) / rating_increment
+    return np.rint(codes).astype(np.int64)
+
+  def __get_user_rating_codes(self, user_id):
+    item_positions, ratings = self.rating_index.get_user_item_positions_and_ratings(user_id)
+    return item_positions, self.get_rating_codes(ratings)
@@ -1,5 +1,8 @@
 import pandas as pd
 from internal.platform.optimizer.dataset_optimizer import DatasetOptimizer
+from internal.platform.similarity.sparse_pearson import SparsePearson
+from internal.platform.similarity.tiled_pearson import TiledPearson
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex
 
 
 class PearsonSimilarity:
@@ -30,10 +33,28 @@ class PearsonSimilarity:
 
   def get_user_user_correlation_matrix(self):
     movie_ratings = self.dataset_optimizer.get_movie_ratings()
-    user_movie_matrix = movie_ratings.pivot_table(index='title', columns='user_id', values='rating')
-    user_user_corr_matrix = user_movie_matrix.corr(method="pearson", min_periods=self.min_common_elements)
-    return user_user_corr_matrix
+    return SparsePearson(movie_ratings, self.min_common_elements).get_correlation_matrix()
+
+  def get_neighbour_index(self, k: int, memory_budget=1 << 30) -> NeighbourIndex:
+    movie_ratings = self.dataset_optimizer.get_movie_ratings()
+    return NeighbourIndex.from_sparse_pearson(SparsePearson(movie_ratings, self.min_common_elements), k,
+                                              memory_budget)
+
+  def get_tiled_user_user_correlations(self, result_directory, memory_budget=1 << 30, top_k=None,
+                                       min_correlation=None):
+    """ Top k or thresholded correlations streamed to result_directory, use when the full matrix does not fit """
+    movie_ratings = self.dataset_optimizer.get_movie_ratings()
+    tiled_pearson = TiledPearson(SparsePearson(movie_ratings, self.min_common_elements), memory_budget)
+    if top_k is not None:
+      return tiled_pearson.save_top_k(result_directory, top_k)
+    if min_correlation is not None:
+      return tiled_pearson.save_thresholded(result_directory, min_correlation)
+    raise MissingTileReductionException
 
 
 class TargetUserNotFoundException(Exception):
   pass
+
+
+class MissingTileReductionException(Exception):
+  pass
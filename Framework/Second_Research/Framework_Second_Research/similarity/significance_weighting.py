@@ -1,15 +1,23 @@
+import numpy as np
 import pandas as pd
 
-from internal.platform.dataset_operators.dataset_user_operator import DatasetUserOperator
+from internal.platform.constraints.interval import Interval
+from internal.platform.similarity.co_rating_counts import CoRatingCounts
 
 
 class SignificanceWeighting:
+  common_rated_item_count = 'common_rated_item_count'
+  static = 'static'
+  dynamic = 'dynamic'
 
-  def __init__(self, actual_similarity_method, correlation_column_name='correlation'):
+  def __init__(self, actual_similarity_method, correlation_column_name='correlation',
+               co_rating_counts: CoRatingCounts = None, interval: Interval = None):
+    """ co_rating_counts are created from the ratings, in the interval if one is given, when they are not given """
     self.__similarity_method = actual_similarity_method
     self.__correlation_column_name = correlation_column_name
     self.__dataset_optimizer = actual_similarity_method.get_dataset_optimizer()
-    self.__dataset_user_operator = DatasetUserOperator(self.__dataset_optimizer.get_ratings())
+    self.__co_rating_counts = co_rating_counts
+    self.__interval = interval
 
   def get_neighbours_using_common_rated_item_count(self, user_id: int, movie_id: int) -> pd.DataFrame:
     movie_n_common_based_neighbours = self.__get_common_movie_based_neighbours(user_id, movie_id)
@@ -72,14 +80,46 @@ class SignificanceWeighting:
     movie_based_neighbours.columns = ['user_id', self.__correlation_column_name, 'n_common']
     movie_based_neighbours.set_index('user_id', inplace=True)
 
+  @staticmethod
+  def weight_correlations(correlations: np.ndarray, n_common: np.ndarray, weighting, parameter=None) -> np.ndarray:
+    """
+    Bulk version of the neighbour weightings, applied to every user pair of a correlation matrix at once.
+
+    :param weighting: common_rated_item_count, static (parameter is alpha, 50 if None) or dynamic (parameter is beta,
+                      3/4 if None). Dynamic alpha of a user is 2.beta times the mean n_common of all other users it
+                      correlates with, not only of the ones that rated the target movie, so it is the same for every
+                      movie. Rows and columns of the matrices are the same users in the same order.
+    """
+    if weighting == SignificanceWeighting.common_rated_item_count:
+      return n_common * correlations
+    if weighting == SignificanceWeighting.static:
+      alpha = 50 if parameter is None else parameter
+    elif weighting == SignificanceWeighting.dynamic:
+      is_neighbour = ~np.isnan(correlations)
+      np.fill_diagonal(is_neighbour, False)  # n_common of a user with itself is its rating count, not a neighbour's
+      mean_n_common = np.sum(n_common * is_neighbour, axis=1) / np.maximum(np.sum(is_neighbour, axis=1), 1)
+      alpha = 2 * (3 / 4 if parameter is None else parameter) * mean_n_common[:, np.newaxis]
+    else:
+      raise UnknownSignificanceWeightingException
+    u = np.where(n_common < alpha, n_common / np.where(alpha > 0, alpha, 1), 1)
+    return u * correlations
+
+  def get_co_rating_counts(self) -> CoRatingCounts:
+    if self.__co_rating_counts is None:
+      self.__co_rating_counts = CoRatingCounts(self.__dataset_optimizer.get_ratings(), self.__interval)
+    return self.__co_rating_counts
+
   def __get_movie_based_neighbours(self, movie_id, user_id, user_knn) -> pd.DataFrame:
-    user_neighbour_corr_and_n_common_list = list()
-    target_user_hist = self.__dataset_user_operator.get_user_rating_history(user_id)
-    for neighbour_id, row in user_knn.iterrows():
-      rating = self.__dataset_user_operator.get_user_rating_value(neighbour_id, movie_id)
-      neighbour_history = self.__dataset_user_operator.get_user_rating_history(neighbour_id)
-      n_common = len(target_user_hist.merge(neighbour_history, on='item_id'))
-      if rating == 0:
-        continue
-      user_neighbour_corr_and_n_common_list.append((neighbour_id, row['correlation'], n_common))
-    return pd.DataFrame(user_neighbour_corr_and_n_common_list)
+    neighbour_ids = user_knn.index.to_numpy()
+    movie_raters = self.__dataset_optimizer.get_rating_index().get_item_raters(movie_id)
+    is_movie_rater = np.isin(neighbour_ids, movie_raters)
+    if not is_movie_rater.any():
+      return pd.DataFrame()
+    n_common = self.get_co_rating_counts().get_n_common_list(user_id, neighbour_ids[is_movie_rater])
+    return pd.DataFrame({'user_id': neighbour_ids[is_movie_rater],
+                         'correlation': user_knn['correlation'].to_numpy()[is_movie_rater],
+                         'n_common': n_common})
+
+
+class UnknownSignificanceWeightingException(Exception):
+  pass
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sparse
+from scipy.special import xlogy
+
+from internal.platform.datasets.id_mapping import IdMapping
+
+
+class SparseMutualInformation:
+  """
+  Pairwise user-user mutual information over one-hot rating code matrices.
+
+  Ratings are encoded as codes of the dataset rating range and every code has its own sparse item x user indicator
+  matrix. Joint rating counts of all user pairs for two codes are a single sparse product of their indicators, the
+  marginal counts are products with the is-rated matrix. Entropies are accumulated from these counts, so every pair
+  gets the same bias corrected value as MutualInformation.mutual_information. Pairs without co-rated items are NaN.
+  Exposes the SparsePearson interface, so TiledPearson and NeighbourIndex reduce it tile by tile as well.
+  """
+
+  bytes_per_cell = 128  # Co-rated counts, the entropy sums and their temporaries per user pair
+  bytes_per_code_per_cell = 56  # Sparse histogram bins of a code, as coo entries and their bin sums, per user pair
+
+  def __init__(self, ratings: pd.DataFrame, lowest_rating, highest_rating, rating_increment):
+    item_ids = ratings['item_id'] if 'item_id' in ratings.columns else ratings.index
+    self.__user_mapping = IdMapping(ratings['user_id'].to_numpy())
+    self.__item_mapping = IdMapping(np.asarray(item_ids))
+    user_positions = self.__user_mapping.get_positions(ratings['user_id'].to_numpy())
+    item_positions = self.__item_mapping.get_positions(np.asarray(item_ids))
+    codes = np.rint((ratings['rating'].to_numpy(dtype=np.float64) - lowest_rating) / rating_increment).astype(np.int64)
+    n_codes = int(round((highest_rating - lowest_rating) / rating_increment)) + 1
+    shape = (len(self.__item_mapping), len(self.__user_mapping))
+    self.__is_rated = sparse.csc_matrix((np.ones(len(codes)), (item_positions, user_positions)), shape=shape)
+    self.__code_indicators = list()
+    for code in range(n_codes):
+      is_code = codes == code
+      if is_code.any():
+        self.__code_indicators.append(sparse.csc_matrix(
+          (np.ones(np.count_nonzero(is_code)), (item_positions[is_code], user_positions[is_code])), shape=shape))
+
+  def get_user_mapping(self) -> IdMapping:
+    return self.__user_mapping
+
+  def get_n_users(self) -> int:
+    return len(self.__user_mapping)
+
+  def get_bytes_per_cell(self) -> int:
+    """ Memory taken per user pair of a tile, the joint histograms of one code are held at a time """
+    return SparseMutualInformation.bytes_per_cell + \
+      SparseMutualInformation.bytes_per_code_per_cell * len(self.__code_indicators)
+
+  def get_correlation_matrix(self) -> pd.DataFrame:
+    """ Mutual information matrix, under the correlation name like the other similarity matrices """
+    user_ids = pd.Index(self.__user_mapping.get_ids(), name='user_id')
+    return pd.DataFrame(self.get_correlations(), index=user_ids, columns=user_ids.copy())
+
+  def get_correlations(self, user_positions=None) -> np.ndarray:
+    """ Mutual information of the given users (all users if None) with every user, one row per given user """
+    is_rated = SparseMutualInformation.__select(self.__is_rated, user_positions).T
+    n_common = SparseMutualInformation.__to_dense(is_rated @ self.__is_rated)
+    user1_histograms, user2_histograms, joint_counts = list(), list(), 0
+    for indicators_x in self.__code_indicators:
+      selected_x = SparseMutualInformation.__select(indicators_x, user_positions).T
+      user1_histograms.append(selected_x @ self.__is_rated)
+      if user_positions is not None:
+        user2_histograms.append(is_rated @ indicators_x)
+      # Reduced one code of the first user at a time, only n_codes of the n_codes^2 joint bins are held at once
+      joint_counts = joint_counts + SparseMutualInformation.__get_bin_counts(
+        [selected_x @ indicators_y for indicators_y in self.__code_indicators], n_common.shape)
+    user1_counts = SparseMutualInformation.__get_bin_counts(user1_histograms, n_common.shape)
+    if user_positions is None:
+      # All pairs are computed, the other user's marginals are the transposes
+      user2_counts = user1_counts.transpose(0, 2, 1)
+    else:
+      user2_counts = SparseMutualInformation.__get_bin_counts(user2_histograms, n_common.shape)
+    return SparseMutualInformation.mutual_information_from_counts(n_common, user1_counts, user2_counts,
+                                                                  joint_counts)
+
+  @staticmethod
+  def mutual_information_from_counts(n_common, user1_counts, user2_counts, joint_counts) -> np.ndarray:
+    """
+    Bias corrected mutual information from the (sum of c.log(c), number of non-empty bins) of the histograms, where
+    the entropy of a histogram of n_common ratings is log(n_common) - sum of c.log(c) / n_common
+    """
+    is_valid = n_common > 0
+    n_common = np.where(is_valid, n_common, 1)
+    mutual_information = np.log(n_common) + (joint_counts[0] - user1_counts[0] - user2_counts[0]) / n_common
+    mutual_information += (user1_counts[1] + user2_counts[1] - joint_counts[1] - 1) / (2 * n_common)
+    mutual_information[~is_valid] = np.nan
+    return mutual_information
+
+  @staticmethod
+  def __get_bin_counts(histograms, shape) -> np.ndarray:
+    """ (sum of c.log(c), number of non-empty bins) of every user pair over the sparse histogram bins """
+    histograms = [histogram.tocoo() for histogram in histograms]
+    pairs = np.concatenate([histogram.row.astype(np.int64) * shape[1] + histogram.col for histogram in histograms])
+    bins = np.concatenate([histogram.data for histogram in histograms])
+    n_pairs = shape[0] * shape[1]
+    return np.stack([np.bincount(pairs, weights=xlogy(bins, bins), minlength=n_pairs).reshape(shape),
+                     np.bincount(pairs, minlength=n_pairs).reshape(shape)])
+
+  @staticmethod
+  def __select(matrix, user_positions):
+    return matrix if user_positions is None else matrix[:, np.asarray(user_positions)]
+
+  @staticmethod
+  def __to_dense(matrix) -> np.ndarray:
+    return matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
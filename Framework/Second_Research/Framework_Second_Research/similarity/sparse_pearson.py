@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sparse
+
+from internal.platform.datasets.id_mapping import IdMapping
+
+
+class SparsePearson:
+  """
+  Pairwise user-user pearson correlations over the sparse item x user rating matrix.
+
+  Every pair only uses the items both users rated, like DataFrame.corr does on a pivot table. The co-rated counts
+  and sums of both users are computed with sparse products and the correlation is evaluated from raw sums, which
+  is exact for ratings on a half star scale. Pairs with less than min_common_elements co-rated items, or without
+  any rating variance on the co-rated items, are NaN.
+  """
+
+  bytes_per_cell = 128  # Dense co-rated sums, their sparse products and the correlation temporaries per user pair
+
+  def __init__(self, ratings: pd.DataFrame, min_common_elements: int):
+    item_ids = ratings['item_id'] if 'item_id' in ratings.columns else ratings.index
+    self.__user_mapping = IdMapping(ratings['user_id'].to_numpy())
+    self.__item_mapping = IdMapping(np.asarray(item_ids))
+    self.__min_common_elements = min_common_elements
+    user_positions = self.__user_mapping.get_positions(ratings['user_id'].to_numpy())
+    item_positions = self.__item_mapping.get_positions(np.asarray(item_ids))
+    values = ratings['rating'].to_numpy(dtype=np.float64)
+    shape = (len(self.__item_mapping), len(self.__user_mapping))
+    self.__ratings = sparse.csc_matrix((values, (item_positions, user_positions)), shape=shape)
+    self.__squared_ratings = self.__ratings.multiply(self.__ratings).tocsc()
+    self.__is_rated = sparse.csc_matrix((np.ones(len(values)), (item_positions, user_positions)), shape=shape)
+
+  def get_user_mapping(self) -> IdMapping:
+    return self.__user_mapping
+
+  def get_n_users(self) -> int:
+    return len(self.__user_mapping)
+
+  def get_bytes_per_cell(self) -> int:
+    """ Memory taken per user pair of a correlation tile, TiledPearson sizes its tiles with it """
+    return SparsePearson.bytes_per_cell
+
+  def get_correlation_matrix(self) -> pd.DataFrame:
+    user_ids = pd.Index(self.__user_mapping.get_ids(), name='user_id')
+    return pd.DataFrame(self.get_correlations(), index=user_ids, columns=user_ids.copy())
+
+  def get_correlations(self, user_positions=None) -> np.ndarray:
+    """ Correlations of the given users (all users if None) with every user, one row per given user """
+    n_common, sum_x, sum_y, sum_xx, sum_yy, sum_xy = self.__get_co_rated_sums(user_positions)
+    return SparsePearson.correlations_from_sums(n_common, sum_x, sum_y, sum_xx, sum_yy, sum_xy,
+                                                self.__min_common_elements)
+
+  def get_co_rated_counts(self, user_positions=None) -> np.ndarray:
+    return SparsePearson.__to_dense(SparsePearson.__select(self.__is_rated, user_positions).T @ self.__is_rated)
+
+  @staticmethod
+  def correlations_from_sums(n_common, sum_x, sum_y, sum_xx, sum_yy, sum_xy, min_common_elements) -> np.ndarray:
+    covariance = n_common * sum_xy - sum_x * sum_y
+    variance_x = n_common * sum_xx - sum_x * sum_x
+    variance_y = n_common * sum_yy - sum_y * sum_y
+    is_valid = (n_common >= max(min_common_elements, 1)) & (variance_x > 0) & (variance_y > 0)
+    correlations = np.full(n_common.shape, np.nan)
+    correlations[is_valid] = covariance[is_valid] / np.sqrt(variance_x[is_valid] * variance_y[is_valid])
+    return np.clip(correlations, -1, 1, out=correlations)
+
+  def __get_co_rated_sums(self, user_positions):
+    ratings = SparsePearson.__select(self.__ratings, user_positions).T
+    squared_ratings = SparsePearson.__select(self.__squared_ratings, user_positions).T
+    is_rated = SparsePearson.__select(self.__is_rated, user_positions).T
+    n_common = SparsePearson.__to_dense(is_rated @ self.__is_rated)
+    sum_x = SparsePearson.__to_dense(ratings @ self.__is_rated)
+    sum_xx = SparsePearson.__to_dense(squared_ratings @ self.__is_rated)
+    sum_xy = SparsePearson.__to_dense(ratings @ self.__ratings)
+    if user_positions is None:
+      # All pairs are computed, the other user's sums are the transposes
+      return n_common, sum_x, sum_x.T, sum_xx, sum_xx.T, sum_xy
+    sum_y = SparsePearson.__to_dense(is_rated @ self.__ratings)
+    sum_yy = SparsePearson.__to_dense(is_rated @ self.__squared_ratings)
+    return n_common, sum_x, sum_y, sum_xx, sum_yy, sum_xy
+
+  @staticmethod
+  def __select(matrix, user_positions):
+    return matrix if user_positions is None else matrix[:, np.asarray(user_positions)]
+
+  @staticmethod
+  def __to_dense(matrix) -> np.ndarray:
+    return matrix.toarray() if sparse.issparse(matrix) else np.asarray(matrix)
@@ -0,0 +1,44 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.constraints.interval import MaxLimitInterval
+from internal.platform.similarity.co_rating_counts import CoRatingCounts
+
+
+class TestCoRatingCounts(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestCoRatingCounts, self).__init__(*args, **kwargs)
+    random = np.random.default_rng(3)
+    user_item_pairs = pd.DataFrame({'user_id': random.integers(1, 40, 1500), 'item_id': random.integers(1, 60, 1500)})
+    self.ratings = user_item_pairs.drop_duplicates().reset_index(drop=True)
+    self.ratings['rating'] = random.integers(1, 11, len(self.ratings)) / 2
+    self.ratings['timestamp'] = pd.to_datetime(random.integers(1000000000, 1500000000, len(self.ratings)), unit='s')
+
+  def test_same_as_merge(self):
+    co_rating_counts = CoRatingCounts(self.ratings)
+    for user1_id, user2_id in [(1, 2), (5, 5), (17, 38)]:
+      expected = len(pd.merge(self.ratings.loc[self.ratings['user_id'] == user1_id],
+                              self.ratings.loc[self.ratings['user_id'] == user2_id], on='item_id'))
+      self.assertEqual(co_rating_counts.get_n_common(user1_id, user2_id), expected)
+    self.assertEqual(co_rating_counts.get_n_common(1, 1000), 0)
+    self.assertEqual(co_rating_counts.get_n_common_list(1, [2, 1000, 1]).tolist(),
+                     [co_rating_counts.get_n_common(1, 2), 0, co_rating_counts.get_n_common(1, 1)])
+
+  def test_n_common_matrix(self):
+    co_rating_counts = CoRatingCounts(self.ratings)
+    user_ids = [5, 1000, 2]
+    expected = [[co_rating_counts.get_n_common(user1_id, user2_id) for user2_id in user_ids] for user1_id in user_ids]
+    self.assertEqual(co_rating_counts.get_n_common_matrix(user_ids).tolist(), expected)
+
+  def test_interval(self):
+    interval = MaxLimitInterval(None, datetime(2010, 1, 1))
+    ratings_in_interval = self.ratings.loc[self.ratings['timestamp'] < datetime(2010, 1, 1)]
+    expected = CoRatingCounts(ratings_in_interval).get_counts()
+    self.assertTrue(np.array_equal(CoRatingCounts(self.ratings, interval).get_counts(), expected))
+
+
+if __name__ == '__main__':
+  unittest.main()
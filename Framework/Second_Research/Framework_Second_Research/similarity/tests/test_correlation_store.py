@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.constraints.interval import MaxLimitInterval
+from internal.platform.neighbour_filters.neighbour_index import NeighbourIndex
+from internal.platform.similarity.correlation_store import CorrelationStore
+from internal.platform.similarity.sparse_pearson import SparsePearson
+
+
+class TestCorrelationStore(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestCorrelationStore, self).__init__(*args, **kwargs)
+    random = np.random.default_rng(5)
+    user_item_pairs = pd.DataFrame({'user_id': random.integers(1, 40, 1500), 'item_id': random.integers(1, 60, 1500)})
+    self.ratings = user_item_pairs.drop_duplicates().reset_index(drop=True)
+    self.ratings['rating'] = random.integers(1, 11, len(self.ratings)) / 2
+    self.correlation_matrix = SparsePearson(self.ratings, 3).get_correlation_matrix()
+    self.fingerprint = CorrelationStore.fingerprint(self.ratings)
+
+  def test_correlation_matrix_round_trip(self):
+    with tempfile.TemporaryDirectory() as store_directory:
+      correlation_store = CorrelationStore(store_directory)
+      self.assertIsNone(correlation_store.load_correlation_matrix(self.fingerprint, 'pearson', 3))
+      correlation_store.save_correlation_matrix(self.correlation_matrix, self.fingerprint, 'pearson', 3)
+      self.assertTrue(CorrelationStore(store_directory).load_correlation_matrix(self.fingerprint, 'pearson', 3)
+                      .equals(self.correlation_matrix))
+      self.assertIsNone(correlation_store.load_correlation_matrix(self.fingerprint, 'pearson', 4))
+      self.assertIsNone(correlation_store.load_correlation_matrix(self.fingerprint, 'pearson', 3,
+                                                                  MaxLimitInterval(None, datetime(2010, 1, 1))))
+      self.assertEqual(len(os.listdir(store_directory)), 1)
+
+  def test_neighbour_index_round_trip(self):
+    with tempfile.TemporaryDirectory() as store_directory:
+      correlation_store = CorrelationStore(store_directory)
+      neighbour_index = NeighbourIndex.from_correlation_matrix(self.correlation_matrix, 5)
+      correlation_store.save_neighbour_index(neighbour_index, self.fingerprint, 'pearson', 3)
+      self.assertIsNone(correlation_store.load_neighbour_index(self.fingerprint, 'pearson', 3, 6))
+      loaded_neighbour_index = correlation_store.load_neighbour_index(self.fingerprint, 'pearson', 3, 5)
+      for user_id in [1, 20, 39]:
+        self.assertTrue(loaded_neighbour_index.get_neighbours(user_id).equals(neighbour_index.get_neighbours(user_id)))
+      del loaded_neighbour_index
+
+  def test_fingerprint_changes_with_ratings(self):
+    changed_ratings = self.ratings.copy()
+    self.assertEqual(self.fingerprint, CorrelationStore.fingerprint(changed_ratings))
+    changed_ratings.loc[0, 'rating'] = 5.5
+    self.assertNotEqual(self.fingerprint, CorrelationStore.fingerprint(changed_ratings))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,5 +1,8 @@
+import math
 import unittest
 
+import numpy as np
+
 from internal.platform.datasets.movielens_dataset import MovielensDataset
 from internal.platform.optimizer.dataset_optimizer import DatasetOptimizer
 from internal.platform.similarity.mutual_information import MutualInformation
@@ -19,6 +22,28 @@ class TestMutualInformation(unittest.TestCase):
     mutual_info = MutualInformation(self.optimized_dataset)
     self.assertTrue(len(mutual_info.get_neighbours(448, 3)) > 0)
 
+  def test_entropy(self):
+    entropies, n = MutualInformation.entropy(np.array([[0, 2, 0, 1, 1], [0, 0, 3, 0, 0]]), np.array([4, 3]))
+    self.assertAlmostEqual(entropies[0], -0.5 * math.log(0.5) - 2 * 0.25 * math.log(0.25))
+    self.assertEqual(entropies[1], 0.0)
+    self.assertEqual(n.tolist(), [3, 1])
+
+  def test_mutual_information_from_histograms(self):
+    joint_histograms = np.zeros((3, 2, 2), dtype=np.int64)
+    joint_histograms[0] = [[2, 0], [0, 2]]
+    joint_histograms[1] = [[1, 1], [1, 1]]
+    mutual_infos = MutualInformation.mutual_information_from_histograms(joint_histograms)
+    self.assertAlmostEqual(mutual_infos[0], math.log(2) + 1 / 8)
+    self.assertAlmostEqual(mutual_infos[1], -1 / 8)
+    self.assertEqual(mutual_infos[2], 0.0)
+
+  def test_rating_codes(self):
+    # Movielens half star and Netflix full star rating ranges
+    self.assertEqual(MutualInformation.to_rating_codes([0.5, 1.0, 3.5, 5.0], 0.5, 0.5).tolist(), [0, 1, 6, 9])
+    self.assertEqual(MutualInformation.to_rating_codes(np.array([1, 2, 5]), 1, 1).tolist(), [0, 1, 4])
+    # Float noise of the ratings never moves a rating to a neighbouring code
+    self.assertEqual(MutualInformation.to_rating_codes([0.1 + 0.2 + 2.7, 4.999999], 0.5, 0.5).tolist(), [5, 9])
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 from internal.platform.datasets.movielens_dataset import MovielensDataset
 from internal.platform.neighbour_filters.k_nearest_neighbourhood import KNearestNeighbours
 from internal.platform.optimizer.dataset_optimizer import DatasetOptimizer
@@ -31,19 +33,34 @@ class TestSignificanceWeighting(unittest.TestCase):
     self.__assert_static_significance_weighting_exists(3, 10, 448)
     self.__assert_static_significance_weighting_exists(3, 10, 440)
 
+  def test_weight_correlations(self):
+    correlations = np.array([[1.0, 0.5, np.nan], [0.5, 1.0, -0.2], [np.nan, -0.2, 1.0]])
+    n_common = np.array([[40, 10, 0], [10, 20, 30], [0, 30, 60]])
+    self.assertTrue(np.allclose(
+      SignificanceWeighting.weight_correlations(correlations, n_common, SignificanceWeighting.common_rated_item_count),
+      n_common * correlations, equal_nan=True))
+    self.assertTrue(np.allclose(
+      SignificanceWeighting.weight_correlations(correlations, n_common, SignificanceWeighting.static, 20),
+      np.minimum(n_common / 20, 1) * correlations, equal_nan=True))
+    # Dynamic alphas of the users are 2 * 1/2 * (10, 20, 30), the n_common of a user with itself is not averaged
+    dynamic_alphas = np.array([[10.0], [20.0], [30.0]])
+    self.assertTrue(np.allclose(
+      SignificanceWeighting.weight_correlations(correlations, n_common, SignificanceWeighting.dynamic, 1 / 2),
+      np.minimum(n_common / dynamic_alphas, 1) * correlations, equal_nan=True))
+
   def __assert_static_significance_weighting_exists(self, item_id, k, user_id):
     neighbours = self.significance_weighting.get_neighbours_using_static_significance_weighting(user_id, item_id)
-    knn = KNearestNeighbours.get_k_nearest(neighbours, k)
+    knn = KNearestNeighbours.get_k_nearest(neighbours, k, user_id=user_id)
     self.assertTrue(len(knn) > 0)
 
   def __assert_dynamic_significance_weighting_exists(self, item_id, k, user_id):
     neighbours = self.significance_weighting.get_neighbours_using_dynamic_significance_weighting(user_id, item_id)
-    knn = KNearestNeighbours.get_k_nearest(neighbours, k)
+    knn = KNearestNeighbours.get_k_nearest(neighbours, k, user_id=user_id)
     self.assertTrue(len(knn) > 0)
 
   def __assert_common_rated_significance_weighting_exists(self, item_id, k, user_id):
     neighbours = self.significance_weighting.get_neighbours_using_common_rated_item_count(user_id, item_id)
-    knn = KNearestNeighbours.get_k_nearest(neighbours, k)
+    knn = KNearestNeighbours.get_k_nearest(neighbours, k, user_id=user_id)
     self.assertTrue(len(knn) > 0)
 
 
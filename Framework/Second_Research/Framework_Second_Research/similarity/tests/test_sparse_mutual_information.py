@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.similarity.mutual_information import MutualInformation
+from internal.platform.similarity.sparse_mutual_information import SparseMutualInformation
+from internal.platform.similarity.sparse_pearson import SparsePearson
+from internal.platform.similarity.tiled_pearson import TiledPearson
+
+
+class TestSparseMutualInformation(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestSparseMutualInformation, self).__init__(*args, **kwargs)
+    random = np.random.default_rng(11)
+    user_item_pairs = pd.DataFrame({'user_id': random.integers(1, 40, 1500), 'item_id': random.integers(1, 60, 1500)})
+    self.ratings = user_item_pairs.drop_duplicates().reset_index(drop=True)
+    self.ratings['rating'] = random.integers(1, 11, len(self.ratings)) / 2
+
+  def test_same_as_joint_histograms(self):
+    sparse_mutual_information = SparseMutualInformation(self.ratings, 0.5, 5.0, 0.5)
+    user_ids = sparse_mutual_information.get_user_mapping().get_ids()
+    rating_matrix = self.ratings.pivot_table(index='user_id', columns='item_id', values='rating')
+    codes = np.nan_to_num(np.rint(rating_matrix.to_numpy() * 2) - 1, nan=-1).astype(np.int64)
+    joint_histograms = np.zeros((len(user_ids), len(user_ids), 10, 10), dtype=np.int64)
+    for user1 in range(len(user_ids)):
+      for user2 in range(len(user_ids)):
+        is_common = (codes[user1] >= 0) & (codes[user2] >= 0)
+        np.add.at(joint_histograms[user1, user2], (codes[user1, is_common], codes[user2, is_common]), 1)
+    expected = MutualInformation.mutual_information_from_histograms(joint_histograms.reshape(-1, 10, 10))
+    expected = expected.reshape(len(user_ids), len(user_ids))
+    expected[joint_histograms.sum(axis=(2, 3)) == 0] = np.nan
+    actual = sparse_mutual_information.get_correlation_matrix()
+    self.assertTrue(np.array_equal(actual.index.to_numpy(), rating_matrix.index.to_numpy()))
+    self.assertTrue(np.allclose(actual.to_numpy(), expected, atol=1e-12, equal_nan=True))
+
+  def test_user_block(self):
+    sparse_mutual_information = SparseMutualInformation(self.ratings, 0.5, 5.0, 0.5)
+    user_positions = np.array([4, 0, 17])
+    self.assertTrue(np.allclose(sparse_mutual_information.get_correlations(user_positions),
+                                sparse_mutual_information.get_correlations()[user_positions], equal_nan=True))
+
+  def test_tile_size_follows_bytes_per_cell(self):
+    sparse_mutual_information = SparseMutualInformation(self.ratings, 0.5, 5.0, 0.5)
+    n_users = sparse_mutual_information.get_n_users()
+    self.assertTrue(sparse_mutual_information.get_bytes_per_cell() > SparsePearson.bytes_per_cell)
+    memory_budget = sparse_mutual_information.get_bytes_per_cell() * n_users * 6
+    self.assertEqual(TiledPearson(sparse_mutual_information, memory_budget).get_tile_size(), 6)
+
+
+if __name__ == '__main__':
+  unittest.main()
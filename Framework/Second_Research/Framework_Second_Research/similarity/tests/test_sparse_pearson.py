@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.similarity.sparse_pearson import SparsePearson
+
+
+class TestSparsePearson(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestSparsePearson, self).__init__(*args, **kwargs)
+    random = np.random.default_rng(7)
+    user_item_pairs = pd.DataFrame({'user_id': random.integers(1, 40, 1500), 'item_id': random.integers(1, 60, 1500)})
+    self.ratings = user_item_pairs.drop_duplicates().reset_index(drop=True)
+    self.ratings['rating'] = random.integers(1, 11, len(self.ratings)) / 2
+    self.ratings = self.ratings.set_index('item_id')
+
+  def test_same_as_dataframe_corr(self):
+    user_item_matrix = self.ratings.reset_index().pivot_table(index='item_id', columns='user_id', values='rating')
+    expected = user_item_matrix.corr(method='pearson', min_periods=5)
+    actual = SparsePearson(self.ratings, 5).get_correlation_matrix()
+    self.assertTrue(actual.index.equals(expected.index))
+    self.assertTrue(actual.columns.equals(expected.columns))
+    self.assertTrue(np.allclose(actual.to_numpy(), expected.to_numpy(), atol=1e-12, equal_nan=True))
+
+  def test_user_block(self):
+    sparse_pearson = SparsePearson(self.ratings, 3)
+    user_positions = np.array([4, 0, 17])
+    all_correlations = sparse_pearson.get_correlations()
+    self.assertTrue(np.allclose(sparse_pearson.get_correlations(user_positions), all_correlations[user_positions],
+                                equal_nan=True))
+    self.assertTrue(np.array_equal(sparse_pearson.get_co_rated_counts(user_positions),
+                                   sparse_pearson.get_co_rated_counts()[user_positions]))
+
+  def test_min_common_elements(self):
+    sparse_pearson = SparsePearson(self.ratings, 3)
+    correlations = sparse_pearson.get_correlations()
+    co_rated_counts = sparse_pearson.get_co_rated_counts()
+    self.assertTrue(np.isnan(correlations[co_rated_counts < 3]).all())
+    self.assertTrue((np.abs(correlations[~np.isnan(correlations)]) <= 1).all())
+
+
+if __name__ == '__main__':
+  unittest.main()
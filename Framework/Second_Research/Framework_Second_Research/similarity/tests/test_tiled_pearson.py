@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.similarity.sparse_pearson import SparsePearson
+from internal.platform.similarity.tiled_pearson import TiledPearson
+
+
+class TestTiledPearson(unittest.TestCase):
+  def __init__(self, *args, **kwargs):
+    super(TestTiledPearson, self).__init__(*args, **kwargs)
+    random = np.random.default_rng(11)
+    user_item_pairs = pd.DataFrame({'user_id': random.integers(1, 50, 2000), 'item_id': random.integers(1, 80, 2000)})
+    self.ratings = user_item_pairs.drop_duplicates().reset_index(drop=True)
+    self.ratings['rating'] = random.integers(1, 11, len(self.ratings)) / 2
+    self.sparse_pearson = SparsePearson(self.ratings, 3)
+    self.correlation_matrix = self.sparse_pearson.get_correlation_matrix()
+    # Small budget to force several tiles
+    self.tiled_pearson = TiledPearson(self.sparse_pearson, memory_budget=SparsePearson.bytes_per_cell * 49 * 7)
+
+  def test_tiles_cover_all_users(self):
+    self.assertEqual(self.tiled_pearson.get_tile_size(), 7)
+    tiles = list(self.tiled_pearson.iterate_tiles())
+    self.assertEqual(np.concatenate([user_positions for user_positions, _ in tiles]).tolist(), list(range(49)))
+    self.assertTrue(np.allclose(np.vstack([correlations for _, correlations in tiles]),
+                                self.correlation_matrix.to_numpy(), equal_nan=True))
+
+  def test_top_k(self):
+    with tempfile.TemporaryDirectory() as result_directory:
+      top_k_correlations = self.tiled_pearson.save_top_k(result_directory, 5)
+      for user_id in [1, 17, 49]:
+        expected = self.correlation_matrix.get(user_id).drop(user_id).dropna().sort_values(ascending=False).head(5)
+        actual = top_k_correlations.get(user_id)
+        self.assertEqual(len(actual), 5)
+        self.assertFalse(user_id in actual.index)
+        self.assertTrue(np.allclose(actual.to_numpy(), expected.to_numpy()))
+        self.assertEqual(actual.name, user_id)
+      self.assertIsNone(top_k_correlations.get(999))
+      del top_k_correlations
+
+  def test_thresholded(self):
+    with tempfile.TemporaryDirectory() as result_directory:
+      thresholded_correlations = self.tiled_pearson.save_thresholded(result_directory, 0.3)
+      for user_id in [1, 17, 49]:
+        expected = self.correlation_matrix.get(user_id).drop(user_id)
+        expected = expected[expected >= 0.3]
+        self.assertTrue(thresholded_correlations.get(user_id).equals(expected))
+      self.assertFalse(thresholded_correlations.empty)
+      del thresholded_correlations
+
+
+if __name__ == '__main__':
+  unittest.main()
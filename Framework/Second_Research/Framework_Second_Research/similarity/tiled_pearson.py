@@ -0,0 +1,181 @@
+import json
+import os
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from internal.platform.datasets.id_mapping import IdMapping
+from internal.platform.similarity.sparse_mutual_information import SparseMutualInformation
+from internal.platform.similarity.sparse_pearson import SparsePearson
+
+
+class TiledPearson:
+  """
+  Memory bounded user-user correlations, computed tile by tile over the users.
+
+  Only one tile of users x all users is held in memory at a time, the tile size follows from the memory budget.
+  Each tile is reduced to what the callers need, either the top k correlated users of every user or the
+  correlations above a threshold, and streamed to a result directory instead of building the full N x N frame.
+  """
+
+  meta_file_name = 'meta.json'
+
+  def __init__(self, sparse_pearson: Union[SparsePearson, SparseMutualInformation], memory_budget: int = 1 << 30):
+    self.__sparse_pearson = sparse_pearson
+    self.__memory_budget = memory_budget
+
+  def get_tile_size(self) -> int:
+    """ Users per tile, from the memory the correlation engine takes per user pair """
+    n_users = self.__sparse_pearson.get_n_users()
+    bytes_per_row = self.__sparse_pearson.get_bytes_per_cell() * max(n_users, 1)
+    return int(max(1, min(n_users, self.__memory_budget // bytes_per_row)))
+
+  def iterate_tiles(self):
+    """ Yields (user positions of the tile, correlations of the tile users with every user) """
+    n_users, tile_size = self.__sparse_pearson.get_n_users(), self.get_tile_size()
+    for tile_start in range(0, n_users, tile_size):
+      user_positions = np.arange(tile_start, min(tile_start + tile_size, n_users))
+      yield user_positions, self.__sparse_pearson.get_correlations(user_positions)
+
+  def save_top_k(self, result_directory, k: int):
+    n_users = self.__sparse_pearson.get_n_users()
+    k = min(k, n_users)
+    TiledPearson.__prepare_result_directory(result_directory)
+    neighbours = np.lib.format.open_memmap(os.path.join(result_directory, TopKCorrelations.neighbours_file_name),
+                                           mode='w+', dtype=np.int32, shape=(n_users, k))
+    correlations = np.lib.format.open_memmap(os.path.join(result_directory, TopKCorrelations.correlations_file_name),
+                                             mode='w+', dtype=np.float64, shape=(n_users, k))
+    for user_positions, tile_correlations in self.iterate_tiles():
+      TiledPearson.drop_self_correlations(user_positions, tile_correlations)
+      neighbours[user_positions], correlations[user_positions] = TiledPearson.select_top_k(tile_correlations, k)
+    neighbours.flush()
+    correlations.flush()
+    del neighbours, correlations
+    self.__save_meta(result_directory, {'reduction': 'top_k', 'k': k})
+    return TopKCorrelations(result_directory)
+
+  def save_thresholded(self, result_directory, min_correlation: float):
+    n_users = self.__sparse_pearson.get_n_users()
+    TiledPearson.__prepare_result_directory(result_directory)
+    row_pointers = np.zeros(n_users + 1, dtype=np.int64)
+    n_values = 0
+    with open(os.path.join(result_directory, ThresholdedCorrelations.neighbours_file_name), 'wb') as neighbours_file, \
+        open(os.path.join(result_directory, ThresholdedCorrelations.correlations_file_name), 'wb') as values_file:
+      for user_positions, tile_correlations in self.iterate_tiles():
+        TiledPearson.drop_self_correlations(user_positions, tile_correlations)
+        # NaN comparisons are False, so pairs without a correlation are never kept
+        tile_rows, tile_neighbours = np.nonzero(tile_correlations >= min_correlation)
+        tile_neighbours.astype(np.int32).tofile(neighbours_file)
+        tile_correlations[tile_rows, tile_neighbours].astype(np.float64).tofile(values_file)
+        row_pointers[user_positions + 1] = np.bincount(tile_rows, minlength=len(user_positions))
+        n_values += len(tile_rows)
+    np.cumsum(row_pointers, out=row_pointers)
+    np.save(os.path.join(result_directory, ThresholdedCorrelations.row_pointers_file_name), row_pointers)
+    self.__save_meta(result_directory, {'reduction': 'threshold', 'min_correlation': min_correlation,
+                                        'n_values': n_values})
+    return ThresholdedCorrelations(result_directory)
+
+  @staticmethod
+  def drop_self_correlations(user_positions, tile_correlations):
+    """ Correlation of every tile user to itself becomes NaN, so it never takes the place of a neighbour """
+    tile_correlations[np.arange(len(user_positions)), user_positions] = np.nan
+
+  @staticmethod
+  def select_top_k(correlations: np.ndarray, k: int):
+    """ Top k neighbour positions and correlations of each row in descending order, padded with -1 and NaN """
+    scores = np.where(np.isnan(correlations), -np.inf, correlations)
+    top_k = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+      np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    top_k_scores = np.take_along_axis(scores, top_k, axis=1)
+    order = np.argsort(-top_k_scores, axis=1, kind='stable')
+    top_k = np.take_along_axis(top_k, order, axis=1)
+    top_k_scores = np.take_along_axis(top_k_scores, order, axis=1)
+    is_missing = np.isneginf(top_k_scores)
+    top_k[is_missing] = -1
+    top_k_scores[is_missing] = np.nan
+    return top_k.astype(np.int32), top_k_scores
+
+  @staticmethod
+  def to_user_correlations(user_id, neighbour_ids, correlations) -> pd.Series:
+    """ Same layout as a column of the full user-user correlation matrix """
+    return pd.Series(np.array(correlations, dtype=np.float64), index=pd.Index(neighbour_ids, name='user_id'),
+                     name=user_id)
+
+  def __save_meta(self, result_directory, meta):
+    np.save(os.path.join(result_directory, TopKCorrelations.user_ids_file_name),
+            self.__sparse_pearson.get_user_mapping().get_ids())
+    with open(os.path.join(result_directory, TiledPearson.meta_file_name), 'w') as meta_file:
+      json.dump(meta, meta_file)
+
+  @staticmethod
+  def __prepare_result_directory(result_directory):
+    os.makedirs(result_directory, exist_ok=True)
+    meta_path = os.path.join(result_directory, TiledPearson.meta_file_name)
+    if os.path.isfile(meta_path):
+      os.remove(meta_path)  # The directory is only valid again once the new result is completely written
+
+
+class TopKCorrelations:
+  """ Top k correlated users of every user, memory mapped from the result directory of TiledPearson """
+
+  neighbours_file_name = 'neighbours.npy'
+  correlations_file_name = 'correlations.npy'
+  user_ids_file_name = 'user_ids.npy'
+
+  def __init__(self, result_directory):
+    self.user_mapping = IdMapping(np.load(os.path.join(result_directory, TopKCorrelations.user_ids_file_name)))
+    self.user_ids = self.user_mapping.get_ids()
+    self.neighbours = np.load(os.path.join(result_directory, TopKCorrelations.neighbours_file_name), mmap_mode='r')
+    self.correlations = np.load(os.path.join(result_directory, TopKCorrelations.correlations_file_name),
+                                mmap_mode='r')
+
+  def get(self, user_id, default=None):
+    user_position = self.user_mapping.get_position(user_id)
+    if user_position < 0:
+      return default
+    neighbours = self.neighbours[user_position]
+    is_found = neighbours >= 0
+    return TiledPearson.to_user_correlations(user_id, self.user_ids[neighbours[is_found]],
+                                             self.correlations[user_position][is_found])
+
+  @property
+  def empty(self):
+    return len(self.user_ids) == 0
+
+
+class ThresholdedCorrelations:
+  """ Correlations above a threshold in compressed sparse rows, memory mapped from the result of TiledPearson """
+
+  neighbours_file_name = 'neighbours.int32'
+  correlations_file_name = 'correlations.float64'
+  row_pointers_file_name = 'row_pointers.npy'
+
+  def __init__(self, result_directory):
+    self.user_mapping = IdMapping(np.load(os.path.join(result_directory, TopKCorrelations.user_ids_file_name)))
+    self.user_ids = self.user_mapping.get_ids()
+    self.row_pointers = np.load(os.path.join(result_directory, ThresholdedCorrelations.row_pointers_file_name))
+    self.neighbours = ThresholdedCorrelations.__map(result_directory, ThresholdedCorrelations.neighbours_file_name,
+                                                    np.int32)
+    self.correlations = ThresholdedCorrelations.__map(result_directory,
+                                                      ThresholdedCorrelations.correlations_file_name, np.float64)
+
+  def get(self, user_id, default=None):
+    user_position = self.user_mapping.get_position(user_id)
+    if user_position < 0:
+      return default
+    start, end = self.row_pointers[user_position], self.row_pointers[user_position + 1]
+    return TiledPearson.to_user_correlations(user_id, self.user_ids[self.neighbours[start:end]],
+                                             self.correlations[start:end])
+
+  @property
+  def empty(self):
+    return len(self.user_ids) == 0
+
+  @staticmethod
+  def __map(result_directory, file_name, dtype):
+    path = os.path.join(result_directory, file_name)
+    if os.path.getsize(path) == 0:
+      return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
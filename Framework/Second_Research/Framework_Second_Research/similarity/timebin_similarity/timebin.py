@@ -37,9 +37,10 @@ class Timebin:
 
   @staticmethod
   def find_movie_index_in_user_history(ratings_history, movie_id):
-    ratings_history.reset_index(inplace=True)
-    timebin_last_index = np.where(ratings_history["item_id"] == movie_id)[0][0]
-    return timebin_last_index
+    """ -1 if the movie is not in the history, see UserHistories.find_item_position for repeated lookups """
+    item_ids = ratings_history['item_id'] if 'item_id' in ratings_history.columns else ratings_history.index
+    movie_indices = np.flatnonzero(np.asarray(item_ids) == movie_id)
+    return int(movie_indices[0]) if len(movie_indices) > 0 else -1
 
   def get_timebin_range(self):
     return self.__timebin_starting_index, self.__timebin_size